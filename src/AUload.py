@@ -1,29 +1,20 @@
-import io, re
+import re
 from pathlib import Path
 import pandas as pd
-import requests
-from datetime import datetime, timezone
 import openpyxl
 from countrycode import country_to_iso2
 import logging
 from config import get_config
+from sourcefetch import fetch_source
 cfg = get_config()
 
 AU_URL = "https://www.dfat.gov.au/sites/default/files/regulation8_consolidated.xlsx"
+AU_SOURCE = ("AU", AU_URL, "AUlog.txt")
 AU_XML = "AU.1.10.25.xlsx"
 
-def AU_fetch():
+def AU_fetch(revalidate=True):
     try:
-        resp = requests.get(AU_URL, timeout=120)
-        resp.raise_for_status()
-        data = resp.content
-        if not data:
-            raise ValueError("empty body")
-        log_path = cfg.paths.DATA_DIR / "AUlog.txt"
-        log_path.parent.mkdir(parents=True, exist_ok=True)
-        with log_path.open("a", encoding="utf-8") as f:
-            f.write(datetime.now(timezone.utc).isoformat() + "\n")
-        return pd.read_excel(io.BytesIO(data), sheet_name=0)
+        return pd.read_excel(fetch_source(*AU_SOURCE, revalidate=revalidate).path, sheet_name=0)
     except Exception as e:
         local = Path(__file__).parent.parent / "data" / AU_XML
         if local.exists():
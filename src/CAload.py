@@ -1,30 +1,22 @@
 import xml.etree.ElementTree as ET
-import requests
 from pathlib import Path
 from countrycode import country_to_iso2
-from datetime import datetime, timezone
 import re
 import logging
 from config import get_config
+from sourcefetch import fetch_source
+from xmlstream import detached, iter_entries
 cfg = get_config()
 
 
 CA_URL = "https://www.international.gc.ca/world-monde/assets/office_docs/international_relations-relations_internationales/sanctions/sema-lmes.xml"
+CA_SOURCE = ("CA", CA_URL, "CAlog.txt")
 CA_XML = "CA.22.09.25.xml"
 
 
-def CA_fetch():
+def CA_fetch(revalidate=True):
     try:
-        resp = requests.get(CA_URL, timeout=120)
-        resp.raise_for_status()
-        xml_bytes = resp.content
-        if not xml_bytes:
-            raise ValueError("empty body")
-        log_path = cfg.paths.DATA_DIR / "CAlog.txt"
-        log_path.parent.mkdir(parents=True, exist_ok=True)
-        with log_path.open("a", encoding="utf-8") as f:
-            f.write(datetime.now(timezone.utc).isoformat() + "\n")
-        return ET.fromstring(xml_bytes)
+        return ET.parse(str(fetch_source(*CA_SOURCE, revalidate=revalidate).path)).getroot()
     except Exception as e:
         local = Path(__file__).parent.parent / "data" / CA_XML
         if local.exists():
@@ -32,6 +24,17 @@ def CA_fetch():
             return ET.parse(str(local)).getroot()
         raise RuntimeError(f"CA download failed and no backup found at {local}: {e}")
 
+def CA_fetch_path(revalidate=True):
+    """CA_fetch() without the parse: the downloaded (or backup) file, for streaming extraction."""
+    try:
+        return fetch_source(*CA_SOURCE, revalidate=revalidate).path
+    except Exception as e:
+        local = Path(__file__).parent.parent / "data" / CA_XML
+        if local.exists():
+            logging.error("CA download failed; using backup file %s", local, exc_info=True)
+            return local
+        raise RuntimeError(f"CA download failed and no backup found at {local}: {e}")
+
 def CA_extract(xml_root):
     records = []
     for record_element in xml_root.findall("record"):
@@ -167,3 +170,8 @@ def CA_extract(xml_root):
         }
         records.append(record)
     return records
+
+def CA_extract_stream(source):
+    """CA_extract() over a file path or binary file object, one record in memory at a time."""
+    for record_element, ancestors in iter_entries(source, ("record",)):
+        yield from CA_extract(detached(ancestors, record_element))
@@ -1,27 +1,19 @@
 import xml.etree.ElementTree as ET
-import requests
-from datetime import datetime, timezone
 from countrycode import country_to_iso2
 from pathlib import Path
 import logging
 from config import get_config
+from sourcefetch import fetch_source
+from xmlstream import detached, iter_entries
 cfg = get_config()
 
 EU_URL = "https://webgate.ec.europa.eu/fsd/fsf/public/files/xmlFullSanctionsList_1_1/content?token=n009sfr8"
+EU_SOURCE = ("EU", EU_URL, "EUlog.txt")
 EU_XML = "EU.26.10.25.xml"
 
-def EU_fetch():
+def EU_fetch(revalidate=True):
     try:
-        resp = requests.get(EU_URL, timeout=120)
-        resp.raise_for_status()
-        xml_bytes = resp.content
-        if not xml_bytes:
-            raise ValueError("empty body")
-        log_path = cfg.paths.DATA_DIR / "EUlog.txt"
-        log_path.parent.mkdir(parents=True, exist_ok=True)
-        with log_path.open("a", encoding="utf-8") as f:
-            f.write(datetime.now(timezone.utc).isoformat() + "\n")
-        return ET.fromstring(xml_bytes)
+        return ET.parse(str(fetch_source(*EU_SOURCE, revalidate=revalidate).path)).getroot()
     except Exception as e:
         local = Path(__file__).parent.parent / "data" / EU_XML
         if local.exists():
@@ -29,6 +21,17 @@ def EU_fetch():
             return ET.parse(str(local)).getroot()
         raise RuntimeError(f"EU download failed and no backup found at {local}: {e}")
 
+def EU_fetch_path(revalidate=True):
+    """EU_fetch() without the parse: the downloaded (or backup) file, for streaming extraction."""
+    try:
+        return fetch_source(*EU_SOURCE, revalidate=revalidate).path
+    except Exception as e:
+        local = Path(__file__).parent.parent / "data" / EU_XML
+        if local.exists():
+            logging.error("EU download failed; using backup file %s", local, exc_info=True)
+            return local
+        raise RuntimeError(f"EU download failed and no backup found at {local}: {e}")
+
 
 def EU_extract(xml_root):
     records = []
@@ -450,3 +453,8 @@ def EU_extract(xml_root):
 
         records.append(record)
     return records
+
+def EU_extract_stream(source):
+    """EU_extract() over a file path or binary file object, one sanctionEntity in memory at a time."""
+    for sanction_entity_element, ancestors in iter_entries(source, ("sanctionEntity",)):
+        yield from EU_extract(detached(ancestors, sanction_entity_element))
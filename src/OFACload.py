@@ -1,31 +1,25 @@
+import copy
 import xml.etree.ElementTree as ET
-import requests
 from countrycode import country_to_iso2
-from datetime import datetime, timezone
 import re
 from pathlib import Path
 import logging
 from config import get_config
+from sourcefetch import fetch_source
+from xmlstream import detached, iter_entries
 cfg = get_config()
 
 
 OFAC_CONS_URL = "https://sanctionslistservice.ofac.treas.gov/api/PublicationPreview/exports/CONSOLIDATED.XML"
+OFAC_CONS_SOURCE = ("OFACcons", OFAC_CONS_URL, "OFACconslog.txt")
 OFAC_SDN_URL = "https://sanctionslistservice.ofac.treas.gov/api/PublicationPreview/exports/SDN.XML"
+OFAC_SDN_SOURCE = ("OFACsdn", OFAC_SDN_URL, "OFACsdnlog.txt")
 OFAC_CONS_XML = "OFACCONS.30.06.25.xml"
 OFAC_SDN_XML = "OFACSDN.10.09.25.xml"
 
-def OFAC_fetch_cons():
+def OFAC_fetch_cons(revalidate=True):
     try:
-        resp = requests.get(OFAC_CONS_URL, timeout=120)
-        resp.raise_for_status()
-        xml_bytes = resp.content
-        if not xml_bytes:
-            raise ValueError("empty body")
-        log_path = cfg.paths.DATA_DIR / "OFACconslog.txt"
-        log_path.parent.mkdir(parents=True, exist_ok=True)
-        with log_path.open("a", encoding="utf-8") as f:
-            f.write(datetime.now(timezone.utc).isoformat() + "\n")
-        return ET.fromstring(xml_bytes)
+        return ET.parse(str(fetch_source(*OFAC_CONS_SOURCE, revalidate=revalidate).path)).getroot()
     except Exception as e:
         local = Path(__file__).parent.parent / "data" / OFAC_CONS_XML
         if local.exists():
@@ -33,18 +27,20 @@ def OFAC_fetch_cons():
             return ET.parse(str(local)).getroot()
         raise RuntimeError(f"OFAC consolidated download failed and no backup found at {local}: {e}")
 
-def OFAC_fetch_sdn():
+def OFAC_fetch_cons_path(revalidate=True):
+    """OFAC_fetch_cons() without the parse: the downloaded (or backup) file, for streaming extraction."""
     try:
-        resp = requests.get(OFAC_SDN_URL, timeout=120)
-        resp.raise_for_status()
-        xml_bytes = resp.content
-        if not xml_bytes:
-            raise ValueError("empty body")
-        log_path = cfg.paths.DATA_DIR / "OFACsdnlog.txt"
-        log_path.parent.mkdir(parents=True, exist_ok=True)
-        with log_path.open("a", encoding="utf-8") as f:
-            f.write(datetime.now(timezone.utc).isoformat() + "\n")
-        return ET.fromstring(xml_bytes)
+        return fetch_source(*OFAC_CONS_SOURCE, revalidate=revalidate).path
+    except Exception as e:
+        local = Path(__file__).parent.parent / "data" / OFAC_CONS_XML
+        if local.exists():
+            logging.error("OFAC consolidated download failed; using backup file %s", local, exc_info=True)
+            return local
+        raise RuntimeError(f"OFAC consolidated download failed and no backup found at {local}: {e}")
+
+def OFAC_fetch_sdn(revalidate=True):
+    try:
+        return ET.parse(str(fetch_source(*OFAC_SDN_SOURCE, revalidate=revalidate).path)).getroot()
     except Exception as e:
         local = Path(__file__).parent.parent / "data" / OFAC_SDN_XML
         if local.exists():
@@ -52,6 +48,17 @@ def OFAC_fetch_sdn():
             return ET.parse(str(local)).getroot()
         raise RuntimeError(f"OFAC SDN download failed and no backup found at {local}: {e}")
 
+def OFAC_fetch_sdn_path(revalidate=True):
+    """OFAC_fetch_sdn() without the parse: the downloaded (or backup) file, for streaming extraction."""
+    try:
+        return fetch_source(*OFAC_SDN_SOURCE, revalidate=revalidate).path
+    except Exception as e:
+        local = Path(__file__).parent.parent / "data" / OFAC_SDN_XML
+        if local.exists():
+            logging.error("OFAC SDN download failed; using backup file %s", local, exc_info=True)
+            return local
+        raise RuntimeError(f"OFAC SDN download failed and no backup found at {local}: {e}")
+
 def _j(x):
     return [s for s in x if isinstance(s, str) and s.strip()]
 
@@ -415,3 +422,16 @@ def OFAC_extract(xml_root):
         out.append(record)
 
     return out
+
+def OFAC_extract_stream(source):
+    """
+    OFAC_extract() over a file path or binary file object, one sdnEntry in
+    memory at a time. publshInformation comes before the entries in OFAC's
+    files and is kept for all of them.
+    """
+    publication = []
+    for element, ancestors in iter_entries(source, ("publshInformation", "sdnEntry")):
+        if element.tag.endswith("publshInformation"):
+            publication = [copy.deepcopy(element)]
+            continue
+        yield from OFAC_extract(detached(ancestors, *publication, element))
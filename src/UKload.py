@@ -1,27 +1,19 @@
 import xml.etree.ElementTree as ET
 from countrycode import country_to_iso2
-import requests
-from datetime import datetime, timezone
 from pathlib import Path
 import logging
 from config import get_config
+from sourcefetch import fetch_source
+from xmlstream import detached, iter_entries
 cfg = get_config()
 
 UK_URL = "https://sanctionslist.fcdo.gov.uk/docs/UK-Sanctions-List.xml"
+UK_SOURCE = ("UK", UK_URL, "UKlog.txt")
 UK_XML = "UK.08.10.25.xml"
 
-def UK_fetch():
+def UK_fetch(revalidate=True):
     try:
-        resp = requests.get(UK_URL, timeout=120)
-        resp.raise_for_status()
-        xml_bytes = resp.content
-        if not xml_bytes:
-            raise ValueError("empty body")
-        log_path = cfg.paths.DATA_DIR / "UKlog.txt"
-        log_path.parent.mkdir(parents=True, exist_ok=True)
-        with log_path.open("a", encoding="utf-8") as f:
-            f.write(datetime.now(timezone.utc).isoformat() + "\n")
-        return ET.fromstring(xml_bytes)
+        return ET.parse(str(fetch_source(*UK_SOURCE, revalidate=revalidate).path)).getroot()
     except Exception as e:
         local = Path(__file__).parent.parent / "data" / UK_XML
         if local.exists():
@@ -29,6 +21,17 @@ def UK_fetch():
             return ET.parse(str(local)).getroot()
         raise RuntimeError(f"UK download failed and no backup found at {local}: {e}")
 
+def UK_fetch_path(revalidate=True):
+    """UK_fetch() without the parse: the downloaded (or backup) file, for streaming extraction."""
+    try:
+        return fetch_source(*UK_SOURCE, revalidate=revalidate).path
+    except Exception as e:
+        local = Path(__file__).parent.parent / "data" / UK_XML
+        if local.exists():
+            logging.error("UK download failed; using backup file %s", local, exc_info=True)
+            return local
+        raise RuntimeError(f"UK download failed and no backup found at {local}: {e}")
+
 def UK_extract(xml_root):
     records = []
     for designation_element in xml_root.findall("Designation"):
@@ -355,3 +358,8 @@ def UK_extract(xml_root):
         }
         records.append(record_map)
     return records
+
+def UK_extract_stream(source):
+    """UK_extract() over a file path or binary file object, one Designation in memory at a time."""
+    for designation_element, ancestors in iter_entries(source, ("Designation",)):
+        yield from UK_extract(detached(ancestors, designation_element))
@@ -1,27 +1,19 @@
 import xml.etree.ElementTree as ET
 from countrycode import country_to_iso2
-import requests
-from datetime import datetime, timezone
 from pathlib import Path
 import logging
 from config import get_config
+from sourcefetch import fetch_source
+from xmlstream import detached, iter_entries
 cfg = get_config()
 
 UN_URL = "https://scsanctions.un.org/resources/xml/en/consolidated.xml"
+UN_SOURCE = ("UN", UN_URL, "UNlog.txt")
 UN_XML = "UN.06.10.25.xml"
 
-def UN_fetch():
+def UN_fetch(revalidate=True):
     try:
-        resp = requests.get(UN_URL, timeout=120)
-        resp.raise_for_status()
-        xml_bytes = resp.content
-        if not xml_bytes:
-            raise ValueError("empty body")
-        log_path = cfg.paths.DATA_DIR / "UNlog.txt"
-        log_path.parent.mkdir(parents=True, exist_ok=True)
-        with log_path.open("a", encoding="utf-8") as f:
-            f.write(datetime.now(timezone.utc).isoformat() + "\n")
-        return ET.fromstring(xml_bytes)
+        return ET.parse(str(fetch_source(*UN_SOURCE, revalidate=revalidate).path)).getroot()
     except Exception as e:
         local = Path(__file__).parent.parent / "data" / UN_XML
         if local.exists():
@@ -29,6 +21,17 @@ def UN_fetch():
             return ET.parse(str(local)).getroot()
         raise RuntimeError(f"UN download failed and no backup found at {local}: {e}")
 
+def UN_fetch_path(revalidate=True):
+    """UN_fetch() without the parse: the downloaded (or backup) file, for streaming extraction."""
+    try:
+        return fetch_source(*UN_SOURCE, revalidate=revalidate).path
+    except Exception as e:
+        local = Path(__file__).parent.parent / "data" / UN_XML
+        if local.exists():
+            logging.error("UN download failed; using backup file %s", local, exc_info=True)
+            return local
+        raise RuntimeError(f"UN download failed and no backup found at {local}: {e}")
+
 def UN_extract(xml_root):
     records = []
     if xml_root is None:
@@ -310,7 +313,7 @@ def UN_extract(xml_root):
             record["UN_citizenship_country"] = citizenship_country_value
             record["citizenship_country"] = citizenship_country_value
             record["UN_citizenship_country_iso"] = citizenship_country_iso_value
-            record["place_of_birth_text"] = place_of_birth_value
+            record["place_of_birth_text"] = None
             record["citizenship_country_iso"] = citizenship_country_iso_value
             record["UN_address_country"] = address_country_value
             record["address_country"] = address_country_value
@@ -341,3 +344,8 @@ def UN_extract(xml_root):
             record["UN_last_updated"] = last_updated_text_value or None
             records.append(record)
     return records
+
+def UN_extract_stream(source):
+    """UN_extract() over a file path or binary file object, one INDIVIDUAL or ENTITY in memory at a time."""
+    for element, ancestors in iter_entries(source, ("INDIVIDUAL", "ENTITY")):
+        yield from UN_extract(detached(ancestors, element))
@@ -1,12 +1,23 @@
+import json
 import os
+import signal
 import time
 from datetime import datetime, timezone
 import sqlite3
-from fastapi import FastAPI, File, UploadFile, Body, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, File, UploadFile, Body, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.formparsers import MultiPartException, MultiPartParser
 from pydantic import BaseModel
-from engine import screen_xml_bytes, refresh_lists, response_code_from_result
-from database import warm_database
+from engine import screen_xml_bytes, refresh_lists, refresh_stats, response_code_from_result
+from streamscreen import screen_stream_ndjson
+from batchscreen import screen_xml_batch
+from workpool import DeadlineExceeded, PoolSaturated, screening_pool, screening_pool_stats
+from database import warm_database, verify_index, prepared_cache_stats
+from snapshot import get_snapshot, load_snapshot, snapshot_status
+from decisioncache import decision_cache_stats
+from resultcache import result_cache_stats
+from audit import audit_stats
 from config import get_config
 
 try:
@@ -16,21 +27,54 @@ except Exception:
 
 #Maximum MB for incoming file.
 MAX_REQUEST_MB = int(os.getenv("AML_MAX_REQUEST_MB", 100))
+#Maximum MB for bulk files screened with /screen/stream (never held in memory whole).
+MAX_STREAM_MB = int(os.getenv("AML_MAX_STREAM_MB", 2048))
 
 app = FastAPI(title="AML Screening API")
 
 @app.on_event("startup")
 def startup_warm():
+    if os.getenv("AML_PREFORK_PARENT") and get_snapshot(load=False) is not None:
+        #Forked by prefork.py: the parent already verified, warmed and loaded the snapshot.
+        return
+    verify_index(force=True)
     warm_database()
+    load_snapshot()
 
 class ScreenRequest(BaseModel):
     xml: str
 
-def _enforce_size(n_bytes: int):
-    limit = MAX_REQUEST_MB * 1048576
+def _enforce_size(n_bytes: int, limit_mb: int = None):
+    limit = (MAX_REQUEST_MB if limit_mb is None else limit_mb) * 1048576
     if n_bytes > limit:
         raise HTTPException(status_code=413, detail="payload too large")
 
+def _limited_stream(request: Request, limit_mb: int = None):
+    """The request body's chunks, rejected with 413 as soon as it passes limit_mb (default MAX_REQUEST_MB) or declares it will."""
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit():
+        _enforce_size(int(declared), limit_mb)
+
+    async def chunks():
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            _enforce_size(received, limit_mb)
+            yield chunk
+    return chunks()
+
+async def _read_body(request: Request) -> bytes:
+    return b"".join([chunk async for chunk in _limited_stream(request)])
+
+async def _screen_in_pool(fn, payload):
+    """Run screening on the dedicated pool; saturation is a 429, a missed deadline a 503."""
+    try:
+        return await screening_pool.run(fn, payload)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=503, detail=f"screening deadline exceeded: {e}", headers={"Retry-After": "1"})
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
@@ -58,14 +102,37 @@ def ready():
 
 @app.get("/warm-status")
 def warm_status():
-    return warm_database()
+    return {**warm_database(), "snapshot": snapshot_status(), "recordCache": prepared_cache_stats(),
+            "decisionCache": decision_cache_stats(), "resultCache": result_cache_stats(),
+            "audit": audit_stats(), "screeningPool": screening_pool_stats()}
+
+@app.post("/verify-index")
+def verify_index_endpoint():
+    return verify_index(force=True)
 
 @app.post("/screen")
-def screen(req: ScreenRequest = Body(...)):
+async def screen(req: ScreenRequest = Body(...)):
     try:
         data = req.xml.encode("utf-8")
         _enforce_size(len(data))
-        result = screen_xml_bytes(data)
+        result = await _screen_in_pool(screen_xml_bytes, data)
+        code = response_code_from_result(result)
+        result.setdefault("engine", {})["responseCode"] = code
+        return JSONResponse(content=result, headers={"Response-Code": code})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/screen/xml")
+async def screen_xml(request: Request):
+    """The message as the raw request body (Content-Type: application/xml), no JSON wrapping."""
+    try:
+        content_type = request.headers.get("content-type", "")
+        if content_type and "xml" not in content_type:
+            raise HTTPException(status_code=415, detail="expected application/xml")
+        xml_bytes = await _read_body(request)
+        result = await _screen_in_pool(screen_xml_bytes, xml_bytes)
         code = response_code_from_result(result)
         result.setdefault("engine", {})["responseCode"] = code
         return JSONResponse(content=result, headers={"Response-Code": code})
@@ -77,9 +144,12 @@ def screen(req: ScreenRequest = Body(...)):
 @app.post("/screen/file")
 async def screen_file(file: UploadFile = File(...)):
     try:
+        if file.size is not None:
+            #Checked before the spooled upload is read into memory.
+            _enforce_size(file.size)
         xml_bytes = await file.read()
         _enforce_size(len(xml_bytes))
-        result = screen_xml_bytes(xml_bytes)
+        result = await _screen_in_pool(screen_xml_bytes, xml_bytes)
         code = response_code_from_result(result)
         result.setdefault("engine", {})["responseCode"] = code
         return JSONResponse(content=result, headers={"Response-Code": code})
@@ -88,7 +158,78 @@ async def screen_file(file: UploadFile = File(...)):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/screen/stream")
+async def screen_stream_file(request: Request):
+    """Bulk files: one NDJSON line per transaction as soon as it is screened, then a summary line."""
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        raise HTTPException(status_code=400, detail="expected a multipart upload with a file field")
+    #Parsed here rather than via UploadFile so MAX_STREAM_MB applies while the upload is spooled.
+    try:
+        form = await MultiPartParser(request.headers, _limited_stream(request, MAX_STREAM_MB)).parse()
+    except MultiPartException as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    file = form.get("file")
+    if not hasattr(file, "read"):
+        await form.close()
+        raise HTTPException(status_code=400, detail="expected a multipart upload with a file field")
+    return StreamingResponse(screen_stream_ndjson(file.file), media_type="application/x-ndjson",
+                             background=BackgroundTask(form.close))
+
+async def _batch_messages(request: Request):
+    """XML bytes from a JSON array (strings or {"xml": ...} objects) or from every file of a multipart form."""
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        #request.form() would spool the whole upload before any size check.
+        try:
+            form = await MultiPartParser(request.headers, _limited_stream(request)).parse()
+        except MultiPartException as e:
+            raise HTTPException(status_code=400, detail=e.message)
+        try:
+            return [await item.read() for _, item in form.multi_items() if hasattr(item, "read")]
+        finally:
+            await form.close()
+    payload = json.loads(await _read_body(request))
+    if isinstance(payload, dict):
+        payload = payload.get("messages")
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=400, detail="expected a JSON array of messages")
+    messages = []
+    for item in payload:
+        xml = item.get("xml") if isinstance(item, dict) else item
+        if not isinstance(xml, str):
+            raise HTTPException(status_code=400, detail="each message must be an XML string or {\"xml\": ...}")
+        messages.append(xml.encode("utf-8"))
+    return messages
+
+@app.post("/screen/batch")
+async def screen_batch(request: Request):
+    """Many messages per call; the response is a JSON array in request order."""
+    try:
+        messages = await _batch_messages(request)
+        if len(messages) > config.screening.BATCH_MAX_MESSAGES:
+            raise HTTPException(status_code=413, detail=f"at most {config.screening.BATCH_MAX_MESSAGES} messages per batch")
+        _enforce_size(sum(len(xml_bytes) for xml_bytes in messages))
+        results = await _screen_in_pool(screen_xml_batch, messages)
+        for result in results:
+            if "error" not in result:
+                result.setdefault("engine", {})["responseCode"] = response_code_from_result(result)
+        return JSONResponse(content=results)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/refresh-lists")
-def refresh_lists_endpoint():
-    n = refresh_lists()
-    return {"status": "rebuilt", "rows": n}
+def refresh_lists_endpoint(force: bool = False):
+    try:
+        n = refresh_lists(force)
+    except RuntimeError as e:
+        raise HTTPException(status_code=502, detail={"error": str(e), **refresh_stats()})
+    if not refresh_stats()["rebuilt"]:
+        #Every source was unchanged: the workers already serve this build.
+        return {"status": "unchanged", "rows": n, **refresh_stats()}
+    screening_pool.reset()
+    parent = os.getenv("AML_PREFORK_PARENT")
+    if parent:
+        #Under prefork.py every worker is replaced from a parent reloaded on the new build.
+        os.kill(int(parent), signal.SIGHUP)
+    return {"status": "rebuilt", "rows": n, **refresh_stats()}
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from config import get_config
+
+cfg = get_config()
+
+# How long the writer waits for more entries before committing a partial batch.
+FLUSH_INTERVAL_SECONDS = 0.2
+
+_AUDIT_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS screening_audit (
+        tx_id TEXT PRIMARY KEY,
+        timestamp TEXT DEFAULT (datetime('now')),
+        inputs_json TEXT,
+        matched_json TEXT,
+        decision_json TEXT
+    )
+"""
+
+
+def _utc(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(timestamp))
+
+
+def encode_audit_value(value: Any, compress_bytes: int):
+    """JSON text, or zlib-compressed JSON bytes (stored as a BLOB) once it reaches compress_bytes."""
+    text = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    if compress_bytes and len(text) >= compress_bytes:
+        return zlib.compress(text.encode("utf-8"), 6)
+    return text
+
+
+def decode_audit_value(value):
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        value = zlib.decompress(bytes(value)).decode("utf-8")
+    return json.loads(value)
+
+
+def audit_entry(ingest_hash: Optional[str], response: Dict[str, Any], tx_id: Optional[str] = None) -> Tuple:
+    """The queued form of one screening; serialization happens on the writer thread."""
+    # The API sets engine.responseCode after screening, so the writer gets its own top level.
+    response = {**response, "engine": dict(response.get("engine") or {})}
+    return (tx_id or uuid.uuid4().hex, time.time(), ingest_hash, response)
+
+
+class AuditWriter:
+    """
+    Records screenings in screening_audit without adding request latency.
+    enqueue() is a put on a bounded queue; one daemon thread drains it and
+    inserts batches of up to batch_size rows per transaction into a WAL
+    database. The table lives in its own file (AML_AUDIT_DB_PATH) because
+    createdatabase() rebuilds sanctions.db on every list refresh.
+
+    When the queue is full the caller waits up to block_ms for space, then the
+    entry is appended to <audit db>.overflow.jsonl instead of being lost.
+    """
+
+    def __init__(self, db_path: Path, queue_size: int, batch_size: int, compress_bytes: int, block_ms: int):
+        self.db_path = Path(db_path)
+        self.overflow_path = self.db_path.with_name(self.db_path.name + ".overflow.jsonl")
+        self.batch_size = max(1, int(batch_size))
+        self.compress_bytes = max(0, int(compress_bytes))
+        self.block_seconds = max(0, int(block_ms)) / 1000.0
+        self._queue: "queue.Queue[Tuple]" = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._overflow_lock = threading.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.overflowed = 0
+        self.errors = 0
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def enqueue(self, entry: Tuple) -> bool:
+        """Queue one audit_entry(). Returns False if it was spilled to the overflow file."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            try:
+                if not self.block_seconds:
+                    raise
+                self._queue.put(entry, timeout=self.block_seconds)
+            except queue.Full:
+                self._spill(entry)
+                return False
+        self.enqueued += 1
+        return True
+
+    def _row(self, entry: Tuple) -> Tuple:
+        tx_id, created, ingest_hash, response = entry
+        inputs = {
+            "ingestHash": ingest_hash,
+            "parties": response.get("parties"),
+            "transaction": response.get("transaction"),
+            "listsUsed": response.get("listsUsed"),
+        }
+        decision = {
+            "responseCode": response.get("responseCode"),
+            "riskSummary": response.get("riskSummary"),
+            "engine": response.get("engine"),
+        }
+        return (
+            tx_id,
+            _utc(created),
+            encode_audit_value(inputs, self.compress_bytes),
+            encode_audit_value(response.get("matches"), self.compress_bytes),
+            encode_audit_value(decision, self.compress_bytes),
+        )
+
+    def _spill(self, entry: Tuple) -> None:
+        tx_id, created, ingest_hash, response = entry
+        line = json.dumps(
+            {"tx_id": tx_id, "timestamp": _utc(created), "ingestHash": ingest_hash, "response": response},
+            ensure_ascii=False,
+        )
+        try:
+            with self._overflow_lock:
+                self.overflow_path.parent.mkdir(parents=True, exist_ok=True)
+                with self.overflow_path.open("a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+                self.overflowed += 1
+        except OSError:
+            self.errors += 1
+            logging.warning("audit overflow write failed", exc_info=True)
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), timeout=30.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(_AUDIT_SCHEMA)
+        conn.commit()
+        return conn
+
+    def _write(self, conn: sqlite3.Connection, batch) -> None:
+        rows = [self._row(entry) for entry in batch]
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO screening_audit(tx_id, timestamp, inputs_json, matched_json, decision_json) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+        self.written += len(rows)
+        self.batches += 1
+
+    def _run(self) -> None:
+        conn = None
+        while True:
+            try:
+                batch = [self._queue.get()]
+            except Exception:
+                continue
+            deadline = time.monotonic() + FLUSH_INTERVAL_SECONDS
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                if conn is None:
+                    conn = self._connect()
+                self._write(conn, batch)
+            except Exception:
+                self.errors += 1
+                logging.warning("audit batch write failed; spilling %d entries", len(batch), exc_info=True)
+                for entry in batch:
+                    self._spill(entry)
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+                    conn = None
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until every queued entry has been written (or spilled)."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.db_path),
+            "queued": self._queue.qsize(),
+            "queue_size": self._queue.maxsize,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "batches": self.batches,
+            "overflowed": self.overflowed,
+            "errors": self.errors,
+        }
+
+
+audit_writer = AuditWriter(
+    cfg.paths.AUDIT_DB_PATH,
+    cfg.screening.AUDIT_QUEUE_SIZE,
+    cfg.screening.AUDIT_BATCH_SIZE,
+    cfg.screening.AUDIT_COMPRESS_BYTES,
+    cfg.screening.AUDIT_BLOCK_MS,
+)
+
+
+def audit_stats() -> Dict[str, Any]:
+    return audit_writer.stats()
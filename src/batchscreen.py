@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config import get_config
+from engine import _cached_response, _ensure_db_ready, _finish_response, _party_key, _screen_parties
+from matcher import party_role
+from resultcache import ingest_hash
+from returnitems import parse_message
+from screening import _build_lists_used
+
+cfg = get_config()
+
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+
+
+def _parse_executor() -> Executor:
+    """Shared pool for parse_message(); processes by default since parsing holds the GIL."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = max(1, cfg.screening.BATCH_PARSE_WORKERS)
+                if cfg.screening.BATCH_PARSE_PROCESSES:
+                    # spawn: the API process has live threads (audit writer, snapshot loader) that fork would copy.
+                    _executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+                else:
+                    _executor = ThreadPoolExecutor(workers, thread_name_prefix="batch-parse")
+    return _executor
+
+
+def _parse_all(messages: Sequence[bytes]) -> List[Any]:
+    """parse_message() per message, in order; a failed message yields its exception."""
+    # Inside a screening worker process (AML_SCREEN_PROCESSES) the batch is already off the API process.
+    in_worker = multiprocessing.parent_process() is not None
+    if len(messages) < 2 or cfg.screening.BATCH_PARSE_WORKERS <= 1 or in_worker:
+        futures = None
+    else:
+        executor = _parse_executor()
+        futures = [executor.submit(parse_message, xml_bytes) for xml_bytes in messages]
+    parsed: List[Any] = []
+    for i, xml_bytes in enumerate(messages):
+        try:
+            parsed.append(futures[i].result() if futures else parse_message(xml_bytes))
+        except Exception as e:
+            parsed.append(e)
+    return parsed
+
+
+def screen_xml_batch(messages: Sequence[bytes]) -> List[Dict[str, Any]]:
+    """
+    screen_xml_bytes() for many messages at once, responses in input order.
+    Messages are parsed in parallel, then the distinct parties of the whole
+    batch go through _screen_parties() together: one decision-cache pass and
+    one candidate retrieval, so a correspondent bank that appears on every
+    message is screened once. A message that cannot be parsed gets
+    {"error": ...} in its slot instead of failing the batch.
+    """
+    responses: List[Optional[Dict[str, Any]]] = [None] * len(messages)
+    hashes = [ingest_hash(xml_bytes) for xml_bytes in messages]
+    cache_keys: List[Optional[Tuple[str, int]]] = [None] * len(messages)
+    pending = []
+    for i, message_hash in enumerate(hashes):
+        cache_keys[i], responses[i] = _cached_response(message_hash)
+        if responses[i] is None:
+            pending.append(i)
+    if not pending:
+        return responses
+
+    parsed = dict(zip(pending, _parse_all([messages[i] for i in pending])))
+    unique: Dict[str, Dict[str, Any]] = {}
+    party_keys: Dict[int, List[Optional[str]]] = {}
+    for i, item in parsed.items():
+        if isinstance(item, Exception):
+            responses[i] = {"error": str(item)}
+            continue
+        keys = []
+        for party in item[1] or []:
+            key = _party_key(party) if isinstance(party, dict) and party_role(party) is not None else None
+            if key is not None:
+                unique.setdefault(key, party)
+            keys.append(key)
+        party_keys[i] = keys
+    if not party_keys:
+        return responses
+
+    _ensure_db_ready()
+    results = dict(zip(unique, _screen_parties(list(unique.values()))))
+    lists_used = _build_lists_used()
+    for i, keys in party_keys.items():
+        base, party_infos, transaction_info = parsed[i]
+        party_results = [results.get(key) if key is not None else None for key in keys]
+        responses[i] = _finish_response(
+            hashes[i], cache_keys[i], base, party_infos, transaction_info, party_results, lists_used
+        )
+    return responses
@@ -0,0 +1,379 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Benchmarks build their own database from the bundled list files so they
+# never overwrite data/sanctions.db or data/match_cache.db.
+os.environ.setdefault("AML_DB_PATH", str(Path(tempfile.gettempdir()) / "aml_benchmark.db"))
+os.environ.setdefault("AML_MATCH_CACHE_DB_PATH", str(Path(tempfile.gettempdir()) / "aml_benchmark_match_cache.db"))
+
+import io
+import xml.etree.ElementTree as ET
+from OFACload import OFAC_extract, OFAC_extract_stream, OFAC_CONS_XML
+from UNload import UN_extract, UN_extract_stream
+from CAload import CA_extract, CA_extract_stream
+from isoparser import parse, buildbase
+from returnitems import returnitems
+from database import (
+    build_stats,
+    createdatabase,
+    get_read_connection,
+    returnDetails2_fts_batch,
+    _fts_document_count,
+    _fts_match_expression,
+    _min_should_match_candidates,
+    _name_postings,
+    _normalize_fts_queries,
+    NAME_STRATEGY_MIN_SHOULD_MATCH,
+    NAME_STRATEGY_PAIRWISE,
+)
+from matcher import matching
+from snapshot import load_snapshot
+from engine import screen_xml_bytes
+from streamscreen import screen_stream
+from config import get_config
+
+cfg = get_config()
+DATA_DIR = Path(__file__).parent.parent / "data"
+BUNDLED_LISTS = (
+    (OFAC_CONS_XML, OFAC_extract, OFAC_extract_stream),
+    ("UN.06.10.25.xml", UN_extract, UN_extract_stream),
+    ("CA.22.09.25.xml", CA_extract, CA_extract_stream),
+)
+
+LONG_NAMES = [
+    "Joint Stock Company Commercial Bank of Foreign Trade of the Russian Federation",
+    "Open Joint Stock Company Sberbank of Russia Moscow Branch",
+    "Islamic Revolutionary Guard Corps Cooperative Foundation Bank of Tehran",
+    "Public Joint Stock Company Rosneft Oil Trading and Shipping Company Limited",
+    "Korea Kwangson Banking Corporation Foreign Trade Bank of the Democratic People's Republic",
+    "Al Qaida in the Arabian Peninsula Charitable Relief Foundation International",
+]
+
+
+def bundled_records():
+    records = []
+    for filename, extract, _ in BUNDLED_LISTS:
+        records.extend(extract(ET.parse(str(DATA_DIR / filename)).getroot()))
+    return records
+
+
+def build_bench_db():
+    started = time.perf_counter()
+    records = bundled_records()
+    createdatabase(records)
+    print(f"built {cfg.paths.DB_PATH} from {len(records)} records in {time.perf_counter() - started:.2f}s")
+
+
+def iso_party_names():
+    names = []
+    for path in sorted((DATA_DIR / "iso").glob("*.xml")):
+        try:
+            parsed = parse(path.read_bytes())
+            party_infos, _ = returnitems(parsed, buildbase(parsed))
+        except Exception:
+            continue
+        for party in party_infos or []:
+            name = (party.get("Name") or "").strip()
+            if name and name not in names:
+                names.append(name)
+    return names
+
+
+def _generate_pairwise(cur, normalized):
+    docs = set()
+    for _, field, tokens in normalized:
+        cur.execute(
+            "SELECT rowid FROM sanctions_fts WHERE sanctions_fts MATCH ? LIMIT 500",
+            (_fts_match_expression(field, tokens),),
+        )
+        docs.update(row[0] for row in cur.fetchall())
+    return docs
+
+
+def _generate_min_should_match(cur, normalized):
+    postings, frequent = _name_postings(cur, [tokens for _, _, tokens in normalized], "", [])
+    total_docs = _fts_document_count(cur)
+    docs = set()
+    for _, _, tokens in normalized:
+        docs.update(rowid for rowid, _ in _min_should_match_candidates(tokens, postings, total_docs, 500, frequent=frequent))
+    return docs
+
+
+def _timed(fn, repeat):
+    result = fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - started) / repeat, result
+
+
+def bench_candidates(repeat=3):
+    """
+    Pairwise AND expansion vs min-should-match, per name length bucket.
+    "gen" times candidate generation alone (FTS documents), "e2e" the full
+    returnDetails2_fts_batch call including record resolution.
+    """
+    names = iso_party_names() + LONG_NAMES
+    buckets = {}
+    for name in names:
+        buckets.setdefault(min(len(name.split()), 8), []).append(name)
+
+    cur = get_read_connection().cursor()
+    print(
+        f"{'tokens':>6} {'names':>5} {'pair gen ms':>11} {'msm gen ms':>10} {'pair docs':>9} {'msm docs':>8} "
+        f"{'pair e2e ms':>11} {'msm e2e ms':>10} {'recall':>7}"
+    )
+    for size in sorted(buckets):
+        group = buckets[size]
+        normalized = _normalize_fts_queries(group)
+        pair_gen, pair_docs = _timed(lambda: _generate_pairwise(cur, normalized), repeat)
+        msm_gen, msm_docs = _timed(lambda: _generate_min_should_match(cur, normalized), repeat)
+        pair_e2e, pair_rows = _timed(lambda: returnDetails2_fts_batch(group, None, 500, NAME_STRATEGY_PAIRWISE), repeat)
+        msm_e2e, msm_rows = _timed(lambda: returnDetails2_fts_batch(group, None, 500, NAME_STRATEGY_MIN_SHOULD_MATCH), repeat)
+        pair_keys = {(record[0], record[1]) for record, _ in pair_rows}
+        msm_keys = {(record[0], record[1]) for record, _ in msm_rows}
+        recall = (len(pair_keys & msm_keys) / len(pair_keys)) if pair_keys else 1.0
+        label = f"{size}+" if size == 8 else str(size)
+        print(
+            f"{label:>6} {len(group):>5} {pair_gen * 1000:>11.1f} {msm_gen * 1000:>10.1f} {len(pair_docs):>9} {len(msm_docs):>8} "
+            f"{pair_e2e * 1000:>11.1f} {msm_e2e * 1000:>10.1f} {recall:>7.2%}"
+        )
+
+
+class _ScoringConfig:
+    SHOW_SLIGHT_MATCHES = True
+
+    def __init__(self, vector):
+        self.VECTOR_SCORING = vector
+
+
+def bench_scoring(repeat=3):
+    """
+    Per-pair evaluate_match vs RecordMatrix batch scoring for the ISO sample
+    parties, against the usual 500-per-query candidates and the full table.
+    """
+    snapshot = load_snapshot()
+    parties = []
+    for path in sorted((DATA_DIR / "iso").glob("*.xml")):
+        try:
+            parsed = parse(path.read_bytes())
+            party_infos, _ = returnitems(parsed, buildbase(parsed))
+        except Exception:
+            continue
+        parties.append(party_infos or [])
+    queries = [
+        [party.get("Name") for party in party_infos if party.get("Name")]
+        for party_infos in parties
+    ]
+    candidate_sets = [snapshot.candidates(message_queries, limit=500) for message_queries in queries]
+    print(f"{'mode':>10} {'pairs':>9} {'per-pair ms':>11} {'vector ms':>9} {'speedup':>7}")
+    for mode in ("candidates", "full"):
+        if mode == "full":
+            tables = [snapshot.matrix] * len(parties)
+            pairs = len(snapshot) * sum(len(p) for p in parties)
+            rounds = 1
+        else:
+            tables = candidate_sets
+            pairs = sum(len(table) * len(p) for table, p in zip(tables, parties))
+            rounds = repeat
+        timings = {}
+        for vector in (False, True):
+            config = _ScoringConfig(vector)
+            started = time.perf_counter()
+            for _ in range(rounds):
+                for message_parties, table in zip(parties, tables):
+                    matching(message_parties, {}, table, config)
+            timings[vector] = (time.perf_counter() - started) / rounds
+        print(
+            f"{mode:>10} {pairs:>9} {timings[False] * 1000:>11.1f} {timings[True] * 1000:>9.1f} "
+            f"{timings[False] / timings[True]:>6.1f}x"
+        )
+
+
+def bulk_message(sample, transactions):
+    """A sample message with its CdtTrfTxInf block repeated `transactions` times."""
+    xml = (DATA_DIR / "iso" / sample).read_bytes()
+    start = xml.index(b"<CdtTrfTxInf>")
+    end = xml.rindex(b"</CdtTrfTxInf>") + len(b"</CdtTrfTxInf>")
+    block = xml[start:end]
+    return xml[:start] + b"\n".join(block for _ in range(transactions)) + xml[end:]
+
+
+def _tree_walk(xml):
+    """
+    The floor of the removed tree-walking parser: build the tree and its
+    parent_map, then visit every element once. parse_tree did this and then
+    re-walked subtrees per field.
+    """
+    root = ET.fromstring(xml)
+    parent_map = {child: parent for parent in root.iter() for child in parent}
+    for element in root.iter():
+        element.tag.split("}")[-1]
+    return parent_map
+
+
+def bench_parse(repeat=3):
+    """
+    The single-pass indexed parse on bulk pain.001/pacs.008 files, against
+    _tree_walk as the baseline. Measured against the removed parse_tree on
+    the same inputs (ms, parse_tree -> parse):
+        pain.001 x10 5.4 -> 2.0, x100 76 -> 18, x1000 685 -> 304
+        full.xml x10 20 -> 8.2, x100 242 -> 107, x1000 3409 -> 2308
+    """
+    print(f"{'message':>28} {'txs':>5} {'KiB':>6} {'tree ms':>8} {'parse ms':>9} {'MiB/s':>7}")
+    for sample in ("pain.001.001.12-example.xml", "full.xml"):
+        for transactions in (10, 100, 1000):
+            xml = bulk_message(sample, transactions)
+            rounds = 1 if transactions >= 1000 else repeat
+            tree_time, _ = _timed(lambda: _tree_walk(xml), rounds)
+            parse_time, _ = _timed(lambda: parse(xml), rounds)
+            print(
+                f"{sample:>28} {transactions:>5} {len(xml) / 1024:>6.0f} {tree_time * 1000:>8.1f} "
+                f"{parse_time * 1000:>9.1f} {len(xml) / 2 ** 20 / parse_time:>7.1f}"
+            )
+
+
+def _traced(fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = fn()
+        return time.perf_counter() - started, tracemalloc.get_traced_memory()[1], result
+    finally:
+        tracemalloc.stop()
+
+
+def bench_stream():
+    """
+    Whole-message screen_xml_bytes vs the streaming screener on bulk pacs.008
+    files: total time, time to the first transaction line and peak Python memory
+    (tracemalloc, so both sides run slower than in production).
+    """
+    print(f"{'txs':>6} {'KiB':>6} {'whole s':>8} {'whole MiB':>9} {'stream s':>8} {'first ms':>8} {'stream MiB':>10}")
+    for blocks in (100, 1000, 3000):
+        xml = bulk_message("full.xml", blocks)
+        whole_time, whole_peak, _ = _traced(lambda: screen_xml_bytes(xml))
+        first = []
+
+        def consume():
+            started = time.perf_counter()
+            records = 0
+            for record in screen_stream(io.BytesIO(xml)):
+                if record["type"] == "transaction" and not first:
+                    first.append(time.perf_counter() - started)
+                records += 1
+            return records
+
+        stream_time, stream_peak, _ = _traced(consume)
+        print(
+            f"{blocks * 3:>6} {len(xml) / 1024:>6.0f} {whole_time:>8.2f} {whole_peak / 1048576:>9.1f} "
+            f"{stream_time:>8.2f} {first[0] * 1000:>8.1f} {stream_peak / 1048576:>10.1f}"
+        )
+
+
+def bench_extract():
+    """
+    Tree extraction (ET.parse + X_extract) vs streaming extraction
+    (X_extract_stream) of the bundled list files: time and peak Python memory.
+    "rows" keeps the extracted rows as a refresh does; "drain" only counts
+    them, which leaves the parsing itself: a whole tree against one entry.
+    """
+    print(f"{'list':<24} {'KiB':>6} {'rows':>6} {'tree s':>7} {'tree MiB':>8} "
+          f"{'stream s':>8} {'rows MiB':>8} {'drain MiB':>9}")
+    for filename, extract, extract_stream in BUNDLED_LISTS:
+        path = str(DATA_DIR / filename)
+        tree_time, tree_peak, rows = _traced(lambda: extract(ET.parse(path).getroot()))
+        stream_time, stream_peak, _ = _traced(lambda: list(extract_stream(path)))
+        _, drain_peak, _ = _traced(lambda: sum(1 for _ in extract_stream(path)))
+        print(
+            f"{filename:<24} {os.path.getsize(path) / 1024:>6.0f} {len(rows):>6} {tree_time:>7.2f} "
+            f"{tree_peak / 1048576:>8.1f} {stream_time:>8.2f} {stream_peak / 1048576:>8.1f} {drain_peak / 1048576:>9.1f}"
+        )
+
+
+def bench_rebuild(repeat=3):
+    """
+    createdatabase() over the bundled lists: rows and rows/second per table
+    and per step, from build_stats() of the fastest of `repeat` builds.
+    Rebuilds the benchmark database, never data/sanctions.db.
+    """
+    records = bundled_records()
+    best = None
+    for _ in range(repeat):
+        createdatabase(iter(records))
+        stats = build_stats()
+        if best is None or stats["seconds"] < best["seconds"]:
+            best = stats
+    print(f"{best['records']} records, {best['entities']} entities in {best['seconds']:.2f}s "
+          f"({best['records'] / best['seconds']:.0f} records/s)")
+    print(f"{'step':<20} {'rows':>8} {'seconds':>8} {'rows/s':>10}")
+    for name, step in best["steps"].items():
+        rows = step["rows"]
+        rate = f"{rows / step['seconds']:>10.0f}" if rows and step["seconds"] else f"{'':>10}"
+        print(f"{name:<20} {rows if rows is not None else '':>8} {step['seconds']:>8.3f} {rate}")
+
+
+def _refresh_peak_rss(mode):
+    """Runs in a fresh process: peak RSS (MiB) of a refresh of the bundled lists, loaded in-process."""
+    import resource
+    import listload
+
+    listload.LIST_LOADERS = {
+        filename: (None, lambda revalidate=True, path=str(DATA_DIR / filename): path, extract_stream)
+        for filename, _, extract_stream in BUNDLED_LISTS
+    }
+    if mode != "baseline":
+        rows_by_list, _ = listload.load_lists(1, force=True)
+        if mode == "collect":
+            # What refresh_lists held before spill files: every list's rows at once.
+            rows_by_list = {name: list(rows) for name, rows in rows_by_list.items()}
+        createdatabase(listload.drain_rows(rows_by_list))
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def bench_refresh():
+    """
+    Peak RSS of a whole list refresh (extract + createdatabase) over the bundled
+    lists, each mode in a fresh process: "collect" holds every list's rows
+    before the build, "spill" streams them from the workers' spill files.
+    Rebuilds the benchmark database, never data/sanctions.db.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    print(f"{'mode':<10} {'peak MiB':>9}")
+    for mode in ("baseline", "collect", "spill"):
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            peak = executor.submit(_refresh_peak_rss, mode).result()
+        print(f"{mode:<10} {peak:>9.1f}")
+
+
+BENCHMARKS = {
+    "candidates": bench_candidates,
+    "scoring": bench_scoring,
+    "parse": bench_parse,
+    "stream": bench_stream,
+    "extract": bench_extract,
+    "rebuild": bench_rebuild,
+    "refresh": bench_refresh,
+}
+
+
+def main(argv):
+    names = argv or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise SystemExit(f"unknown benchmark(s): {', '.join(unknown)}; choose from {', '.join(BENCHMARKS)}")
+    if not cfg.paths.DB_PATH.exists() or os.getenv("AML_BENCH_REBUILD") == "1":
+        build_bench_db()
+    for name in names:
+        print(f"== {name}")
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -21,11 +21,15 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = Path(_env("AML_DATA_DIR", str(BASE_DIR / "data")))
 DB_PATH  = Path(_env("AML_DB_PATH",   str(DATA_DIR / "sanctions.db")))
 GUI_PATH = Path(_env("AML_GUI_PATH",  str(BASE_DIR / "iso-viewer" / "public")))
+AUDIT_DB_PATH = Path(_env("AML_AUDIT_DB_PATH", str(DATA_DIR / "audit.db")))
+MATCH_CACHE_DB_PATH = Path(_env("AML_MATCH_CACHE_DB_PATH", str(DATA_DIR / "match_cache.db")))
+SOURCE_CACHE_DIR = Path(_env("AML_SOURCE_CACHE_DIR", str(DATA_DIR / "sources")))
 
 @dataclass(frozen=True)
 class ApiConfig:
     host: str = _env("AML_API_HOST", "0.0.0.0")
     port: int = _env("AML_API_PORT", 8000, int)
+    workers: int = _env("AML_API_WORKERS", os.cpu_count() or 1, int)
     debug: bool = _env("AML_DEBUG", False, bool)
 
 
@@ -35,10 +39,38 @@ class PathsConfig:
     DATA_DIR: Path = DATA_DIR
     DB_PATH: Path = DB_PATH
     GUI_PATH: Path = GUI_PATH 
+    AUDIT_DB_PATH: Path = AUDIT_DB_PATH
+    MATCH_CACHE_DB_PATH: Path = MATCH_CACHE_DB_PATH
+    SOURCE_CACHE_DIR: Path = SOURCE_CACHE_DIR
 
 @dataclass
 class ScreeningConfig:
     SHOW_SLIGHT_MATCHES: bool = _env("SHOW_SLIGHT_MATCHES", True, cast=bool)
+    USE_SNAPSHOT: bool = _env("AML_USE_SNAPSHOT", True, cast=bool)
+    VECTOR_SCORING: bool = _env("AML_VECTOR_SCORING", True, cast=bool)
+    FULL_TABLE_SCAN: bool = _env("AML_FULL_TABLE_SCAN", False, cast=bool)
+    RECORD_CACHE_SIZE: int = _env("AML_RECORD_CACHE_SIZE", 20000, int)
+    DECISION_CACHE: bool = _env("AML_DECISION_CACHE", True, cast=bool)
+    DECISION_CACHE_TTL: int = _env("AML_DECISION_CACHE_TTL", 86400, int)
+    DECISION_CACHE_L1_SIZE: int = _env("AML_DECISION_CACHE_L1_SIZE", 50000, int)
+    DECISION_CACHE_MAX_ROWS: int = _env("AML_DECISION_CACHE_MAX_ROWS", 500000, int)
+    RESULT_CACHE: bool = _env("AML_RESULT_CACHE", False, cast=bool)
+    RESULT_CACHE_MB: int = _env("AML_RESULT_CACHE_MB", 64, int)
+    RESULT_CACHE_DIR: str = _env("AML_RESULT_CACHE_DIR", "")
+    RESULT_CACHE_MAX_FILES: int = _env("AML_RESULT_CACHE_MAX_FILES", 100000, int)
+    AUDIT: bool = _env("AML_AUDIT", True, cast=bool)
+    AUDIT_QUEUE_SIZE: int = _env("AML_AUDIT_QUEUE_SIZE", 10000, int)
+    AUDIT_BATCH_SIZE: int = _env("AML_AUDIT_BATCH_SIZE", 500, int)
+    AUDIT_COMPRESS_BYTES: int = _env("AML_AUDIT_COMPRESS_BYTES", 4096, int)
+    AUDIT_BLOCK_MS: int = _env("AML_AUDIT_BLOCK_MS", 50, int)
+    BATCH_MAX_MESSAGES: int = _env("AML_BATCH_MAX_MESSAGES", 1000, int)
+    BATCH_PARSE_WORKERS: int = _env("AML_BATCH_PARSE_WORKERS", min(8, os.cpu_count() or 1), int)
+    BATCH_PARSE_PROCESSES: bool = _env("AML_BATCH_PARSE_PROCESSES", True, cast=bool)
+    SCREEN_WORKERS: int = _env("AML_SCREEN_WORKERS", min(32, (os.cpu_count() or 1) + 4), int)
+    SCREEN_QUEUE_SIZE: int = _env("AML_SCREEN_QUEUE_SIZE", 64, int)
+    SCREEN_TIMEOUT_MS: int = _env("AML_SCREEN_TIMEOUT_MS", 30000, int)
+    SCREEN_PROCESSES: bool = _env("AML_SCREEN_PROCESSES", False, cast=bool)
+    REFRESH_WORKERS: int = _env("AML_REFRESH_WORKERS", 8, int)
 
 @dataclass(frozen=True)
 class AppConfig:
@@ -0,0 +1,18 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# Modules in src import each other by bare name (e.g. "from database import ...").
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# config reads the database paths when it is imported, so point them at a
+# scratch directory before any test module imports the engine or the api:
+# tests must never rebuild, refresh or write audit or cache rows into data/.
+_RUNTIME_DIR = tempfile.mkdtemp(prefix="aml-test-")
+os.environ["AML_DB_PATH"] = str(Path(_RUNTIME_DIR) / "sanctions.db")
+os.environ["AML_AUDIT_DB_PATH"] = str(Path(_RUNTIME_DIR) / "audit.db")
+os.environ["AML_MATCH_CACHE_DB_PATH"] = str(Path(_RUNTIME_DIR) / "match_cache.db")
+atexit.register(shutil.rmtree, _RUNTIME_DIR, ignore_errors=True)
@@ -1,11 +1,31 @@
 import json
+import math
+import pickle
 import re
 import sqlite3
+import tempfile
+import threading
+import time
 import unicodedata
+from array import array
+from collections import OrderedDict
 from functools import lru_cache
+from itertools import islice
 from pathlib import Path
 
+from config import get_config
 from countrycode import country_to_iso2
+from matcher import (
+    FEATURES_VERSION,
+    TokenDictionary,
+    encode_prepared,
+    prepare_record,
+    prepared_from_json,
+    prepared_to_json,
+    prepared_token_vocabulary,
+)
+
+cfg = get_config()
 
 
 _WHITESPACE_RE = re.compile(r"\s+")
@@ -1022,10 +1042,19 @@ def _create_fts5(cur: sqlite3.Cursor) -> None:
 
 
 
+# sanctions_fts rows share their rowid with sanctionslist.entry_id, and
+# sanctionsdetails.entry_id carries the same key, so each FTS hit resolves by
+# INTEGER PRIMARY KEY lookups instead of (list_name, list_id) text joins.
+FTS_LINKAGE = "rowid"
+
+
 def _rebuild_fts_from_source(cur: sqlite3.Cursor) -> None:
     cur.execute("DELETE FROM sanctions_fts")
-    cur.execute("""
+    # Streamed BUILD_CHUNK_SIZE rows at a time, so the rebuild holds one chunk whatever the list size.
+    source = cur.connection.cursor()
+    source.execute("""
         SELECT
+            rowid,
             list_name,
             list_id,
             full_name,
@@ -1042,105 +1071,107 @@ def _rebuild_fts_from_source(cur: sqlite3.Cursor) -> None:
             alternative_addresses
         FROM sanctionslist
     """)
-    rows = cur.fetchall()
 
-    insert_sql = "INSERT INTO sanctions_fts(list_name, list_id, name, aliases, addresses) VALUES (?,?,?,?,?)"
-    fts_rows = []
-
-    for (
-        list_name,
-        list_id,
-        full_name,
-        first_name,
-        middle_name,
-        last_name,
-        other_first_name,
-        aliases,
-        primary_address,
-        address_city,
-        address_state,
-        address_postal_code,
-        address_country,
-        alternative_addresses,
-    ) in rows:
-        parts = []
-        if full_name:
-            parts.append(str(full_name))
-        combined_name = " ".join(filter(None, (first_name, middle_name, last_name, other_first_name)))
-        if combined_name:
-            parts.append(combined_name)
-        name_text = " ".join(parts).strip()
-
-        alias_text = ""
-        if aliases:
-            try:
-                parsed = json.loads(aliases)
-                if isinstance(parsed, dict):
-                    parsed = list(parsed.values())
-                if isinstance(parsed, list):
-                    alias_parts = []
-                    for item in parsed:
-                        if isinstance(item, (str, int, float)):
-                            cleaned = str(item).strip()
-                            if cleaned:
-                                alias_parts.append(cleaned)
-                    alias_text = " ".join(alias_parts)
-                else:
-                    alias_text = str(aliases)
-            except Exception:
-                alias_text = str(aliases)
-
-        address_values = []
-        for candidate in (
+    insert_sql = "INSERT INTO sanctions_fts(rowid, list_name, list_id, name, aliases, addresses) VALUES (?,?,?,?,?,?)"
+    while True:
+        rows = source.fetchmany(BUILD_CHUNK_SIZE)
+        if not rows:
+            break
+        fts_rows = []
+        for (
+            entry_id,
+            list_name,
+            list_id,
+            full_name,
+            first_name,
+            middle_name,
+            last_name,
+            other_first_name,
+            aliases,
             primary_address,
             address_city,
             address_state,
             address_postal_code,
             address_country,
-        ):
-            if candidate:
-                text = str(candidate).strip()
-                if text:
-                    address_values.append(text)
-        if alternative_addresses:
-            try:
-                parsed_alt = json.loads(alternative_addresses)
-                if isinstance(parsed_alt, dict):
-                    parsed_alt = list(parsed_alt.values())
-                if isinstance(parsed_alt, list):
-                    for item in parsed_alt:
-                        if isinstance(item, (str, int, float)):
-                            cleaned = str(item).strip()
-                            if cleaned:
-                                address_values.append(cleaned)
-                else:
+            alternative_addresses,
+        ) in rows:
+            parts = []
+            if full_name:
+                parts.append(str(full_name))
+            combined_name = " ".join(filter(None, (first_name, middle_name, last_name, other_first_name)))
+            if combined_name:
+                parts.append(combined_name)
+            name_text = " ".join(parts).strip()
+
+            alias_text = ""
+            if aliases:
+                try:
+                    parsed = json.loads(aliases)
+                    if isinstance(parsed, dict):
+                        parsed = list(parsed.values())
+                    if isinstance(parsed, list):
+                        alias_parts = []
+                        for item in parsed:
+                            if isinstance(item, (str, int, float)):
+                                cleaned = str(item).strip()
+                                if cleaned:
+                                    alias_parts.append(cleaned)
+                        alias_text = " ".join(alias_parts)
+                    else:
+                        alias_text = str(aliases)
+                except Exception:
+                    alias_text = str(aliases)
+
+            address_values = []
+            for candidate in (
+                primary_address,
+                address_city,
+                address_state,
+                address_postal_code,
+                address_country,
+            ):
+                if candidate:
+                    text = str(candidate).strip()
+                    if text:
+                        address_values.append(text)
+            if alternative_addresses:
+                try:
+                    parsed_alt = json.loads(alternative_addresses)
+                    if isinstance(parsed_alt, dict):
+                        parsed_alt = list(parsed_alt.values())
+                    if isinstance(parsed_alt, list):
+                        for item in parsed_alt:
+                            if isinstance(item, (str, int, float)):
+                                cleaned = str(item).strip()
+                                if cleaned:
+                                    address_values.append(cleaned)
+                    else:
+                        cleaned = str(alternative_addresses).strip()
+                        if cleaned:
+                            address_values.append(cleaned)
+                except Exception:
                     cleaned = str(alternative_addresses).strip()
                     if cleaned:
                         address_values.append(cleaned)
-            except Exception:
-                cleaned = str(alternative_addresses).strip()
-                if cleaned:
-                    address_values.append(cleaned)
-
-        seen_addresses = set()
-        ordered_addresses = []
-        for value in address_values:
-            if value not in seen_addresses:
-                seen_addresses.add(value)
-                ordered_addresses.append(value)
-        addresses_text = " ".join(ordered_addresses).strip()
 
-        fts_rows.append(
-            (
-                str(list_name or ""),
-                str(list_id or ""),
-                str(name_text or ""),
-                str(alias_text or ""),
-                str(addresses_text or ""),
+            seen_addresses = set()
+            ordered_addresses = []
+            for value in address_values:
+                if value not in seen_addresses:
+                    seen_addresses.add(value)
+                    ordered_addresses.append(value)
+            addresses_text = " ".join(ordered_addresses).strip()
+
+            fts_rows.append(
+                (
+                    entry_id,
+                    str(list_name or ""),
+                    str(list_id or ""),
+                    str(name_text or ""),
+                    str(alias_text or ""),
+                    str(addresses_text or ""),
+                )
             )
-        )
-
-    if fts_rows:
         cur.executemany(insert_sql, fts_rows)
 
 
@@ -1162,6 +1193,9 @@ def _ensure_fts5(conn: sqlite3.Connection) -> None:
         )
 
     cur.execute("CREATE TABLE IF NOT EXISTS sanctions_meta (key TEXT PRIMARY KEY, value TEXT)")
+    # Read-only view of the index's terms (see returnFtsPostings); stores nothing itself.
+    cur.execute("CREATE VIRTUAL TABLE IF NOT EXISTS sanctions_fts_terms USING fts5vocab(sanctions_fts, 'instance')")
+    conn.commit()
 
     cur.execute("""
         SELECT
@@ -1198,6 +1232,8 @@ def _ensure_fts5(conn: sqlite3.Connection) -> None:
         _rebuild_fts_from_source(cur)
         cur.execute("INSERT OR REPLACE INTO sanctions_meta(key, value) VALUES(?,?)",
                     ("sanctions_fts_fingerprint", current_fp))
+        cur.execute("INSERT OR REPLACE INTO sanctions_meta(key, value) VALUES(?,?)",
+                    ("sanctions_fts_linkage", FTS_LINKAGE))
         conn.commit()
         return
 
@@ -1210,34 +1246,310 @@ def _ensure_fts5(conn: sqlite3.Connection) -> None:
         _rebuild_fts_from_source(cur)
         cur.execute("INSERT OR REPLACE INTO sanctions_meta(key, value) VALUES(?,?)",
                     ("sanctions_fts_fingerprint", current_fp))
+        cur.execute("INSERT OR REPLACE INTO sanctions_meta(key, value) VALUES(?,?)",
+                    ("sanctions_fts_linkage", FTS_LINKAGE))
         conn.commit()
         return
 
     cur.execute("SELECT value FROM sanctions_meta WHERE key='sanctions_fts_fingerprint'")
     prev_fp_row = cur.fetchone()
     prev_fp = prev_fp_row[0] if prev_fp_row else None
+    cur.execute("SELECT value FROM sanctions_meta WHERE key='sanctions_fts_linkage'")
+    linkage_row = cur.fetchone()
+    linked = bool(linkage_row and linkage_row[0] == FTS_LINKAGE)
 
-    if fts_count == total_rows and prev_fp == current_fp and total_rows > 0:
+    if fts_count == total_rows and prev_fp == current_fp and linked and total_rows > 0:
         return  
 
     _rebuild_fts_from_source(cur)
     cur.execute("INSERT OR REPLACE INTO sanctions_meta(key, value) VALUES(?,?)",
                 ("sanctions_fts_fingerprint", current_fp))
+    cur.execute("INSERT OR REPLACE INTO sanctions_meta(key, value) VALUES(?,?)",
+                ("sanctions_fts_linkage", FTS_LINKAGE))
     conn.commit()
 
 
+# Match features (normalized record + name/alias/address tokens) are computed
+# once per build and stored as JSON keyed by the sanctionslist rowid, so the
+# request path and the snapshot loader never re-run normalize_record/tokenize.
+# Token lists are stored only as id sequences against sanctions_tokens, the
+# build's global token dictionary.
+def _features_source_sql():
+    columns = ", ".join(f"s.{c}" for c in FTS_RECORD_COLUMNS[:20])
+    return f"""
+        SELECT
+            s.rowid,
+            {columns},
+            COALESCE(d.justification_text, ''),
+            COALESCE(d.other_information_text, '')
+        FROM sanctionslist AS s
+        LEFT JOIN sanctionsdetails AS d
+          ON d.rowid = s.rowid
+        ORDER BY s.rowid
+    """
+
+
+def _spill_prepared_records(cur: sqlite3.Cursor, spill):
+    """
+    prepare_record() over the features source, BUILD_CHUNK_SIZE rows at a
+    time, pickling each chunk of (entry_id, unencoded record) to `spill` as
+    it goes and yielding the records for the vocabulary pass.
+    """
+    source = cur.connection.cursor()
+    source.execute(_features_source_sql())
+    while True:
+        rows = source.fetchmany(BUILD_CHUNK_SIZE)
+        if not rows:
+            return
+        chunk = [(row[0], prepare_record(row[1:])) for row in rows]
+        pickle.dump(chunk, spill, pickle.HIGHEST_PROTOCOL)
+        for _, prepared in chunk:
+            yield prepared
+
+
+def _rebuild_features_from_source(cur: sqlite3.Cursor) -> None:
+    """
+    Two passes, so memory holds the vocabulary and one chunk of records
+    rather than every prepared record: the first prepares the records into a
+    temporary file while collecting the vocabulary for the TokenDictionary,
+    the second reads them back, encodes and inserts them chunk by chunk.
+    """
+    cur.execute("DROP TABLE IF EXISTS sanctions_features")
+    cur.execute("DROP TABLE IF EXISTS sanctions_tokens")
+    cur.execute("CREATE TABLE sanctions_features (entry_id INTEGER PRIMARY KEY, features TEXT NOT NULL)")
+    cur.execute("CREATE TABLE sanctions_tokens (token_id INTEGER PRIMARY KEY, token TEXT NOT NULL UNIQUE)")
+    with tempfile.TemporaryFile() as spill:
+        tokens = TokenDictionary(prepared_token_vocabulary(_spill_prepared_records(cur, spill)))
+        cur.executemany(
+            "INSERT INTO sanctions_tokens(token_id, token) VALUES (?, ?)",
+            ((token_id, token) for token, token_id in tokens.ids.items()),
+        )
+        spill.seek(0)
+        while True:
+            try:
+                chunk = pickle.load(spill)
+            except EOFError:
+                break
+            cur.executemany(
+                "INSERT INTO sanctions_features(entry_id, features) VALUES (?, ?)",
+                [(entry_id, prepared_to_json(encode_prepared(prepared, tokens))) for entry_id, prepared in chunk],
+            )
+
+
+def _ensure_features(conn: sqlite3.Connection) -> None:
+    """Rebuild sanctions_features when missing, stale or from another FEATURES_VERSION."""
+    cur = conn.cursor()
+    cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='sanctionslist'")
+    if not cur.fetchone():
+        return
+    cur.execute("CREATE TABLE IF NOT EXISTS sanctions_meta (key TEXT PRIMARY KEY, value TEXT)")
+    cur.execute("SELECT value FROM sanctions_meta WHERE key='sanctions_features_version'")
+    version_row = cur.fetchone()
+    cur.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name IN ('sanctions_features', 'sanctions_tokens')"
+    )
+    if cur.fetchone()[0] == 2 and version_row and version_row[0] == FEATURES_VERSION:
+        cur.execute("SELECT COUNT(*) FROM sanctionslist")
+        list_count = int((cur.fetchone() or (0,))[0] or 0)
+        cur.execute("SELECT COUNT(*) FROM sanctions_features")
+        feature_count = int((cur.fetchone() or (0,))[0] or 0)
+        if list_count == feature_count:
+            return
+    _rebuild_features_from_source(cur)
+    cur.execute("INSERT OR REPLACE INTO sanctions_meta(key, value) VALUES(?,?)",
+                ("sanctions_features_version", FEATURES_VERSION))
+    conn.commit()
+
+
+# Build version of the sanctions database and the version whose FTS index has
+# been verified by this process. The request path only compares these two
+# integers; the fingerprint scan in _ensure_fts5 runs at startup, after a
+# refresh, or through verify_index(force=True).
+_index_state = {"build_version": None, "verified_version": None}
+_index_lock = threading.Lock()
+
+
+def _read_build_version(cur: sqlite3.Cursor) -> int:
+    try:
+        cur.execute("SELECT value FROM sanctions_meta WHERE key='build_version'")
+    except sqlite3.OperationalError:
+        return 0
+    row = cur.fetchone()
+    try:
+        return int(row[0]) if row and row[0] is not None else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+def _write_build_version(cur: sqlite3.Cursor, version: int) -> None:
+    cur.execute("CREATE TABLE IF NOT EXISTS sanctions_meta (key TEXT PRIMARY KEY, value TEXT)")
+    cur.execute(
+        "INSERT OR REPLACE INTO sanctions_meta(key, value) VALUES(?, ?)",
+        ("build_version", str(int(version))),
+    )
+
+
+def get_build_version() -> int:
+    version = _index_state["build_version"]
+    if version is None:
+        verify_index()
+        version = _index_state["build_version"]
+    return int(version or 0)
+
+
+def verify_index(force=False):
+    dbpath = cfg.paths.DB_PATH
+    with _index_lock:
+        if not force and _index_state["build_version"] is not None \
+                and _index_state["build_version"] == _index_state["verified_version"]:
+            return {"verified": True, "build_version": _index_state["build_version"], "seconds": 0.0}
+        if not dbpath.exists():
+            return {"verified": False, "reason": "db_missing", "build_version": None}
+        started = time.perf_counter()
+        conn = sqlite3.connect(dbpath)
+        try:
+            cur = conn.cursor()
+            _ensure_fts5(conn)
+            _ensure_features(conn)
+            version = _read_build_version(cur)
+            if not version:
+                cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='sanctionslist'")
+                if cur.fetchone():
+                    version = 1
+                    _write_build_version(cur, version)
+                    conn.commit()
+        finally:
+            conn.close()
+        _index_state["build_version"] = version
+        _index_state["verified_version"] = version
+        return {"verified": True, "build_version": version, "seconds": round(time.perf_counter() - started, 4)}
+
+
+def _ensure_index_verified() -> None:
+    version = _index_state["build_version"]
+    if version is not None and version == _index_state["verified_version"]:
+        return
+    verify_index()
+
+
+def _rank_from_matchinfo(matchinfo_blob):
+    if matchinfo_blob is None:
+        return 0.0
+    if isinstance(matchinfo_blob, memoryview):
+        matchinfo_blob = matchinfo_blob.tobytes()
+    data = array("I")
+    try:
+        data.frombytes(matchinfo_blob)
+    except (TypeError, AttributeError):
+        data = array("I", matchinfo_blob)
+    if len(data) < 2:
+        return 0.0
+    phrase_count = data[0]
+    column_count = data[1]
+    index = 2
+    score = 0.0
+    for _ in range(phrase_count):
+        for _ in range(column_count):
+            if index + 2 >= len(data):
+                return score
+            term_hits = data[index]
+            total_hits = data[index + 1]
+            doc_hits = data[index + 2]
+            index += 3
+            if term_hits == 0:
+                continue
+            freq_norm = total_hits if total_hits else 1
+            doc_norm = doc_hits if doc_hits else 1
+            score += float(term_hits) / float(freq_norm) + 1.0 / float(doc_norm)
+    return score
+
+
+READ_PRAGMAS = (
+    "PRAGMA query_only = ON",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+class ReadConnectionPool:
+    """
+    One long-lived, read-only SQLite connection per worker thread.
+
+    Connections are opened with mode=ro, tuned with READ_PRAGMAS and get the
+    rank_match UDF registered once. sqlite3 keeps compiled statements per
+    connection (cached_statements), so repeated SQL text is prepared once.
+    recycle() bumps the generation; each thread reopens on its next get().
+    """
+
+    def __init__(self, cached_statements=256):
+        self._local = threading.local()
+        self._generation = 0
+        self._cached_statements = cached_statements
+
+    def _open(self, dbpath):
+        uri = Path(dbpath).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(
+            uri,
+            uri=True,
+            check_same_thread=False,
+            cached_statements=self._cached_statements,
+        )
+        for pragma in READ_PRAGMAS:
+            conn.execute(pragma)
+        conn.create_function("rank_match", 1, _rank_from_matchinfo, deterministic=True)
+        return conn
+
+    def get(self):
+        dbpath = cfg.paths.DB_PATH
+        local = self._local
+        conn = getattr(local, "conn", None)
+        if conn is not None and local.generation == self._generation and local.path == dbpath:
+            return conn
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+            local.conn = None
+        conn = self._open(dbpath)
+        local.conn = conn
+        local.generation = self._generation
+        local.path = dbpath
+        return conn
+
+    def recycle(self):
+        self._generation += 1
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+            self._local.conn = None
+
+
+read_pool = ReadConnectionPool()
+
+
+def get_read_connection() -> sqlite3.Connection:
+    return read_pool.get()
+
+
+def reset_read_connections() -> None:
+    read_pool.recycle()
+
+
 def returnDetails2_fts(name, country_iso=None, limit=1000):
-    dbpath = Path(__file__).parent.parent / "data" / "sanctions.db"
-    conn = sqlite3.connect(dbpath)
+    _ensure_index_verified()
+    conn = get_read_connection()
     cur = conn.cursor()
-    _ensure_fts5(conn)
     cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='sanctions_fts'")
     has_fts = bool(cur.fetchone())
 
     name = (name or "").strip().lower()
     tokens = [t for t in re.split(r"[^0-9a-zA-Z]+", name) if t]
     if not tokens:
-        conn.close()
         return []
 
     if has_fts:
@@ -1247,7 +1559,6 @@ def returnDetails2_fts(name, country_iso=None, limit=1000):
                 terms.append(f"name:{t}*")
                 terms.append(f"aliases:{t}*")
         if not terms:
-            conn.close()
             return []
         fts_query = " OR ".join(terms)
 
@@ -1283,14 +1594,12 @@ def returnDetails2_fts(name, country_iso=None, limit=1000):
                 s.global_id
             FROM sanctions_fts
             JOIN sanctionslist AS s
-              ON s.list_id = sanctions_fts.list_id AND s.list_name = sanctions_fts.list_name
+              ON s.rowid = sanctions_fts.rowid
             WHERE sanctions_fts MATCH ? {where_country}
             LIMIT ?
         """
         cur.execute(sql, params)
-        rows = cur.fetchall()
-        conn.close()
-        return rows
+        return cur.fetchall()
     else:
         like_clauses = []
         params = []
@@ -1300,7 +1609,6 @@ def returnDetails2_fts(name, country_iso=None, limit=1000):
                 patt = f"%{t}%"
                 params.extend([patt, patt, patt, patt, patt])
         if not like_clauses:
-            conn.close()
             return []
 
         where_country = ""
@@ -1337,21 +1645,257 @@ def returnDetails2_fts(name, country_iso=None, limit=1000):
             LIMIT ?
         """
         cur.execute(sql, params)
-        rows = cur.fetchall()
-        conn.close()
-        return rows
+        return cur.fetchall()
+
+
+# Records createdatabase() normalizes and inserts per step; bounds the rows it holds at once.
+BUILD_CHUNK_SIZE = 500
+
+# Aux-table inserts, in the order _EntityClusters.flush() runs them: parents before the rows that reference them.
+_AUX_INSERT_SQL = {
+    "entities": (
+        "INSERT INTO entities(entity_id, canonical_name, classification, birth_year, birth_month, birth_day, birth_date, place_of_birth, sex, nationality, citizenship_country, citizenship_country_iso, countries_json, names_ascii, name_tokens, aliases_json) "
+        "VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)"
+    ),
+    # rowid = entity_id, so merges can read and update an entity's keys before the indexes exist.
+    "entity_match_keys": (
+        "INSERT INTO entity_match_keys(rowid, entity_id, primary_name_ascii, primary_name_tokens, primary_name_soundex, aliases_ascii_json, aliases_tokens_json, aliases_soundex_json) "
+        "VALUES (?,?,?,?,?,?,?,?)"
+    ),
+    "entity_aliases": "INSERT INTO entity_aliases(entity_id, alias) VALUES (?,?)",
+    "provenance": (
+        "INSERT OR REPLACE INTO provenance(list_name, list_id, source_url, source_etag, valid_from, valid_to, record_status) "
+        "VALUES (?,?,?,?,?,?,?)"
+    ),
+    "list_entity_map": "INSERT OR REPLACE INTO list_entity_map(list_name, list_id, global_id, entity_id) VALUES (?,?,?,?)",
+    "entity_identifiers": (
+        "INSERT INTO entity_identifiers(entity_id, id_type, id_value, country_iso, issuer, normalized_value) "
+        "VALUES (?,?,?,?,?,?)"
+    ),
+}
+
+_ID_FIELDS = (
+    ("BIC", "bic_codes_list", False),
+    ("IBAN", "iban_numbers_list", False),
+    ("SSN", "ssn_numbers_list", True),
+    ("PASSPORT", "passport_numbers_list", False),
+    ("NATIONAL_ID", "national_id_numbers_list", True),
+    ("TAX_ID", "tax_id_numbers_list", False),
+    ("OTHER_ID", "other_id_numbers_list", False),
+)
+
+_build_stats = {}
+
+
+def build_stats():
+    """Timings of the last createdatabase() in this process: rows and seconds per table and step."""
+    return {
+        key: ({name: dict(step) for name, step in value.items()} if isinstance(value, dict) else value)
+        for key, value in _build_stats.items()
+    }
+
+
+def _timed_step(steps, name, started, rows=None):
+    step = steps.setdefault(name, {"rows": 0 if rows is not None else None, "seconds": 0.0})
+    if rows is not None:
+        step["rows"] += rows
+    step["seconds"] += time.perf_counter() - started
+
+
+def _insert_many(cur, steps, table, sql, rows):
+    started = time.perf_counter()
+    cur.executemany(sql, rows)
+    _timed_step(steps, table, started, len(rows))
+
+
+def _entity_countries(a):
+    return [c for c in [a.get("citizenship_country_iso"), a.get("address_country_iso")] if c]
+
+
+def _entity_aggregate(a):
+    """The parts of an entity that later records of the same cluster can add to."""
+    return {
+        "canonical_name": a.get("primary_name"),
+        "countries": set(_entity_countries(a)),
+        "aliases": set(a.get("aliases_list") or []),
+        "aliases_ascii": set(a.get("aliases_ascii") or []),
+        "aliases_tokens": set(a.get("aliases_tokens") or []),
+        "aliases_soundex": set(a.get("aliases_soundex") or []),
+        "primary_name_soundex": a.get("primary_name_soundex"),
+    }
+
+
+def _sorted_json(values):
+    return json.dumps(sorted(values), ensure_ascii=False)
+
+
+class _EntityClusters:
+    """
+    Groups records into entities while createdatabase() streams them: by
+    global_id, else by (ascii primary name, birth year, citizenship). An
+    entity's rows are written with the chunk its first record arrives in, so
+    only the key map is kept for every entity. The name/alias/country
+    aggregates are held just for entities that a later record joins; finish()
+    writes those back. Rows are buffered per table and written by flush()
+    with one executemany each.
+    """
+
+    def __init__(self, cur, steps):
+        self.cur = cur
+        self.steps = steps
+        self.key_to_id = {}
+        self.merged = {}
+        # First record of each entity whose rows are still buffered.
+        self._pending = {}
+        self._rows = {table: [] for table in _AUX_INSERT_SQL}
+
+    @staticmethod
+    def _key(a):
+        gid = (a.get("global_id") or "").strip()
+        if gid:
+            return ("G", gid)
+        return ("H", a.get("primary_name_ascii") or "", a.get("birth_year") or "", a.get("citizenship_country_iso") or "")
+
+    def add(self, a):
+        k = self._key(a)
+        eid = self.key_to_id.get(k)
+        if eid is None:
+            eid = len(self.key_to_id) + 1
+            self.key_to_id[k] = eid
+            self._pending[eid] = a
+            self._add_entity(eid, a)
+        else:
+            agg = self.merged.get(eid)
+            if agg is None:
+                agg = self.merged[eid] = self._load(eid)
+            pn = a.get("primary_name")
+            if pn and (not agg["canonical_name"] or len(pn) > len(agg["canonical_name"])):
+                agg["canonical_name"] = pn
+            agg["countries"].update(_entity_countries(a))
+            for key, field in (("aliases", "aliases_list"), ("aliases_ascii", "aliases_ascii"),
+                               ("aliases_tokens", "aliases_tokens"), ("aliases_soundex", "aliases_soundex")):
+                vals = a.get(field) or []
+                if isinstance(vals, (list, set)):
+                    agg[key].update([x for x in vals if x])
+            if not agg["primary_name_soundex"] and a.get("primary_name_soundex"):
+                agg["primary_name_soundex"] = a.get("primary_name_soundex")
+
+        self._rows["provenance"].append(
+            (a.get("list_name"), a.get("list_id"), a.get("source_url"), a.get("source_etag"), a.get("valid_from"), a.get("valid_to"), a.get("record_status"))
+        )
+        self._rows["list_entity_map"].append((a.get("list_name"), a.get("list_id"), a.get("global_id"), eid))
+        identifiers = self._rows["entity_identifiers"]
+        for id_type, field, with_country in _ID_FIELDS:
+            country = a.get("citizenship_country_iso") if with_country else None
+            for v in a.get(field) or []:
+                if not v:
+                    continue
+                nv = re.sub(r"[^A-Za-z0-9]", "", v).upper()
+                identifiers.append((eid, id_type, v, country, None, nv))
+
+    def _add_entity(self, eid, a):
+        agg = _entity_aggregate(a)
+        self._rows["entities"].append((
+            eid,
+            agg["canonical_name"],
+            a.get("classification"),
+            a.get("birth_year"),
+            a.get("birth_month"),
+            a.get("birth_day"),
+            a.get("birth_date"),
+            a.get("place_of_birth"),
+            a.get("sex"),
+            a.get("nationality"),
+            a.get("citizenship_country"),
+            a.get("citizenship_country_iso"),
+            _sorted_json(agg["countries"]),
+            a.get("primary_name_ascii"),
+            a.get("primary_name_tokens"),
+            _sorted_json(agg["aliases"]),
+        ))
+        self._rows["entity_match_keys"].append((
+            eid,
+            eid,
+            a.get("primary_name_ascii"),
+            a.get("primary_name_tokens"),
+            agg["primary_name_soundex"],
+            _sorted_json(agg["aliases_ascii"]),
+            _sorted_json(agg["aliases_tokens"]),
+            _sorted_json(agg["aliases_soundex"]),
+        ))
+        self._rows["entity_aliases"].extend((eid, al) for al in sorted(agg["aliases"]))
+
+    def _load(self, eid):
+        """The aggregates of an entity as buffered or written so far."""
+        first = self._pending.get(eid)
+        if first is not None:
+            return _entity_aggregate(first)
+        canonical_name, countries_json, aliases_json = self.cur.execute(
+            "SELECT canonical_name, countries_json, aliases_json FROM entities WHERE entity_id=?", (eid,)
+        ).fetchone()
+        primary_name_soundex, aliases_ascii_json, aliases_tokens_json, aliases_soundex_json = self.cur.execute(
+            "SELECT primary_name_soundex, aliases_ascii_json, aliases_tokens_json, aliases_soundex_json FROM entity_match_keys WHERE rowid=?", (eid,)
+        ).fetchone()
+        return {
+            "canonical_name": canonical_name,
+            "countries": set(json.loads(countries_json)),
+            "aliases": set(json.loads(aliases_json)),
+            "aliases_ascii": set(json.loads(aliases_ascii_json)),
+            "aliases_tokens": set(json.loads(aliases_tokens_json)),
+            "aliases_soundex": set(json.loads(aliases_soundex_json)),
+            "primary_name_soundex": primary_name_soundex,
+        }
+
+    def flush(self):
+        for table, sql in _AUX_INSERT_SQL.items():
+            rows = self._rows[table]
+            if rows:
+                _insert_many(self.cur, self.steps, table, sql, rows)
+                rows.clear()
+        self._pending.clear()
+
+    def finish(self):
+        """Write back the entities later records joined. Runs after the indexes are built."""
+        self.flush()
+        if not self.merged:
+            return
+        started = time.perf_counter()
+        merged = sorted(self.merged.items())
+        self.cur.executemany(
+            "UPDATE entities SET canonical_name=?, countries_json=?, aliases_json=? WHERE entity_id=?",
+            [(agg["canonical_name"], _sorted_json(agg["countries"]), _sorted_json(agg["aliases"]), eid) for eid, agg in merged],
+        )
+        self.cur.executemany(
+            "UPDATE entity_match_keys SET primary_name_soundex=?, aliases_ascii_json=?, aliases_tokens_json=?, aliases_soundex_json=? WHERE rowid=?",
+            [
+                (agg["primary_name_soundex"], _sorted_json(agg["aliases_ascii"]), _sorted_json(agg["aliases_tokens"]),
+                 _sorted_json(agg["aliases_soundex"]), eid)
+                for eid, agg in merged
+            ],
+        )
+        self.cur.executemany("DELETE FROM entity_aliases WHERE entity_id=?", [(eid,) for eid, _ in merged])
+        self.cur.executemany(
+            _AUX_INSERT_SQL["entity_aliases"], [(eid, al) for eid, agg in merged for al in sorted(agg["aliases"])]
+        )
+        _timed_step(self.steps, "merged entities", started, len(merged))
+        self.merged.clear()
 
 
-def createdatabase(detailslist):
-    dbpath = Path(__file__).parent.parent / "data" / "sanctions.db"
+def createdatabase(detailslist, list_metadata=None):
+    build_started = time.perf_counter()
+    steps = {}
+    dbpath = cfg.paths.DB_PATH
     dbpath.parent.mkdir(parents=True, exist_ok=True)
     conn = sqlite3.connect(dbpath)
     cur = conn.cursor()
+    previous_version = _read_build_version(cur)
     cur.execute("PRAGMA foreign_keys = ON")
     cur.execute("PRAGMA journal_mode=OFF")
     cur.execute("PRAGMA synchronous=OFF")
     cur.execute("PRAGMA temp_store=MEMORY")
     cur.execute("PRAGMA cache_size=-100000")
+    # One explicit transaction for the schema, every row and the indexes; FTS and features commit their own.
+    cur.execute("BEGIN")
     cur.execute("DROP TABLE IF EXISTS sanctionslist")
     cur.execute("DROP TABLE IF EXISTS sanctionsdetails")
     cur.execute("DROP TABLE IF EXISTS sanctions_fts")
@@ -1366,6 +1910,8 @@ def createdatabase(detailslist):
     cur.execute("DROP TABLE IF EXISTS entity_relations")
     cur.execute("DROP TABLE IF EXISTS match_cache")
     cur.execute("DROP TABLE IF EXISTS screening_audit")
+    cur.execute("DROP TABLE IF EXISTS sanctions_features")
+    cur.execute("DROP TABLE IF EXISTS sanctions_tokens")
     cur.execute("DROP TABLE IF EXISTS sanctions_meta")
 
     cur.execute("""
@@ -1395,7 +1941,8 @@ def createdatabase(detailslist):
             alternative_postal_codes TEXT,
             alternative_countries TEXT,
             alternative_country_isos TEXT,
-            global_id TEXT
+            global_id TEXT,
+            entry_id INTEGER PRIMARY KEY
         )
     """)
     cur.execute("""
@@ -1446,7 +1993,8 @@ def createdatabase(detailslist):
             passport_numbers TEXT,
             national_id_numbers TEXT,
             tax_id_numbers TEXT,
-            other_id_numbers TEXT
+            other_id_numbers TEXT,
+            entry_id INTEGER PRIMARY KEY
         )
     """)
 
@@ -1531,14 +2079,6 @@ def createdatabase(detailslist):
             FOREIGN KEY(entity_id) REFERENCES entities(entity_id) ON DELETE CASCADE
         )
     """)
-    cur.execute("""
-        CREATE TABLE match_cache (
-            key_hash TEXT PRIMARY KEY,
-            decision TEXT,
-            ttl_expires_at TEXT,
-            payload_hash TEXT
-        )
-    """)
     cur.execute("""
         CREATE TABLE screening_audit (
             tx_id TEXT PRIMARY KEY,
@@ -1550,28 +2090,18 @@ def createdatabase(detailslist):
     """)
     cur.execute("CREATE TABLE sanctions_meta (key TEXT PRIMARY KEY, value TEXT)")
 
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_list_country ON sanctionslist(citizenship_country_iso, address_country_iso)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_list_fullname ON sanctionslist(full_name)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_list_lastname ON sanctionslist(last_name)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_list_aliases ON sanctionslist(aliases)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_details_birth ON sanctionsdetails(birth_year, birth_month, birth_day)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_details_country ON sanctionsdetails(citizenship_country_iso, address_country_iso)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_details_global ON sanctionsdetails(global_id)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_map_entity ON list_entity_map(entity_id)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_entities_name ON entities(canonical_name)")
-
     skipped = 0
-    aux_rows = []
-    list_rows_batch = []
-    detail_rows_batch = []
+    entry_id = 0
+    clusters = _EntityClusters(cur, steps)
 
     insert_list_sql = """
         INSERT INTO sanctionslist (
             list_name, list_id, classification, full_name, first_name, middle_name, last_name, other_first_name,
             nationality, citizenship_country, citizenship_country_iso,
             primary_address, address_city, address_state, address_postal_code, address_country, address_country_iso,
-            alternative_addresses, aliases, alternative_location_bundle, alternative_cities, alternative_states, alternative_postal_codes, alternative_countries, alternative_country_isos, global_id
-        ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+            alternative_addresses, aliases, alternative_location_bundle, alternative_cities, alternative_states, alternative_postal_codes, alternative_countries, alternative_country_isos, global_id,
+            entry_id
+        ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
     """
 
     insert_details_sql = """
@@ -1585,161 +2115,70 @@ def createdatabase(detailslist):
             alternative_cities, alternative_states, alternative_postal_codes, alternative_countries, alternative_country_isos,
             global_id,
             classification, contact_emails, contact_phone_numbers, contact_fax_numbers, contact_websites,
-            bic_codes, iban_numbers, ssn_numbers, passport_numbers, national_id_numbers, tax_id_numbers, other_id_numbers
-        ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+            bic_codes, iban_numbers, ssn_numbers, passport_numbers, national_id_numbers, tax_id_numbers, other_id_numbers,
+            entry_id
+        ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
     """
 
-    def flush_batches():
-        if list_rows_batch:
-            cur.executemany(insert_list_sql, list_rows_batch)
-            list_rows_batch.clear()
-        if detail_rows_batch:
-            cur.executemany(insert_details_sql, detail_rows_batch)
-            detail_rows_batch.clear()
-
-    for rec in detailslist:
-        norm = normalize_sanctions_record(rec)
-        if not norm:
-            skipped += 1
-            continue
-        list_rows_batch.append(norm["list_row"])
-        detail_rows_batch.append(norm["details_row"])
-        aux_rows.append(norm.get("aux", {}))
-        if len(list_rows_batch) >= 500:
-            flush_batches()
-
-    flush_batches()
-
-    entity_key_to_id = {}
-    entities_acc = {}
-    next_eid = 1
-
-    def make_key(a):
-        gid = (a.get("global_id") or "").strip()
-        if gid:
-            return ("G", gid)
-        return ("H", a.get("primary_name_ascii") or "", a.get("birth_year") or "", a.get("citizenship_country_iso") or "")
-
-    for a in aux_rows:
-        if not a:
-            continue
-        k = make_key(a)
-        eid = entity_key_to_id.get(k)
-        if not eid:
-            eid = next_eid
-            next_eid += 1
-            entity_key_to_id[k] = eid
-            entities_acc[eid] = {
-                "canonical_name": a.get("primary_name"),
-                "classification": a.get("classification"),
-                "birth_year": a.get("birth_year"),
-                "birth_month": a.get("birth_month"),
-                "birth_day": a.get("birth_day"),
-                "birth_date": a.get("birth_date"),
-                "place_of_birth": a.get("place_of_birth"),
-                "sex": a.get("sex"),
-                "nationality": a.get("nationality"),
-                "citizenship_country": a.get("citizenship_country"),
-                "citizenship_country_iso": a.get("citizenship_country_iso"),
-                "countries": set([c for c in [a.get("citizenship_country_iso"), a.get("address_country_iso")] if c]),
-                "names_ascii": a.get("primary_name_ascii"),
-                "name_tokens": a.get("primary_name_tokens"),
-                "aliases": set(a.get("aliases_list") or []),
-                "aliases_ascii": set(a.get("aliases_ascii") or []),
-                "aliases_tokens": set(a.get("aliases_tokens") or []),
-                "aliases_soundex": set(a.get("aliases_soundex") or []),
-                "primary_name_soundex": a.get("primary_name_soundex"),
-                "ids": []
-            }
-        else:
-            agg = entities_acc[eid]
-            pn = a.get("primary_name")
-            if pn and (not agg["canonical_name"] or len(pn) > len(agg["canonical_name"])):
-                agg["canonical_name"] = pn
-            agg["countries"].update([c for c in [a.get("citizenship_country_iso"), a.get("address_country_iso")] if c])
-            for key in ["aliases","aliases_ascii","aliases_tokens","aliases_soundex"]:
-                vals = a.get(key) or []
-                if isinstance(vals, (list,set)):
-                    agg[key].update([x for x in vals if x])
-            if not agg["primary_name_soundex"] and a.get("primary_name_soundex"):
-                agg["primary_name_soundex"] = a.get("primary_name_soundex")
-
-        cur.execute(
-            "INSERT OR REPLACE INTO provenance(list_name, list_id, source_url, source_etag, valid_from, valid_to, record_status) VALUES (?,?,?,?,?,?,?)",
-            (a.get("list_name"), a.get("list_id"), a.get("source_url"), a.get("source_etag"), a.get("valid_from"), a.get("valid_to"), a.get("record_status"))
-        )
-
-    for k, eid in entity_key_to_id.items():
-        agg = entities_acc[eid]
-        cur.execute(
-            """
-            INSERT INTO entities(entity_id, canonical_name, classification, birth_year, birth_month, birth_day, birth_date, place_of_birth, sex, nationality, citizenship_country, citizenship_country_iso, countries_json, names_ascii, name_tokens, aliases_json)
-            VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-            """,
-            (
-                eid,
-                agg.get("canonical_name"),
-                agg.get("classification"),
-                agg.get("birth_year"),
-                agg.get("birth_month"),
-                agg.get("birth_day"),
-                agg.get("birth_date"),
-                agg.get("place_of_birth"),
-                agg.get("sex"),
-                agg.get("nationality"),
-                agg.get("citizenship_country"),
-                agg.get("citizenship_country_iso"),
-                json.dumps(sorted(list(agg.get("countries") or [])), ensure_ascii=False),
-                agg.get("names_ascii"),
-                agg.get("name_tokens"),
-                json.dumps(sorted(list(agg.get("aliases") or [])), ensure_ascii=False)
-            )
-        )
-        cur.execute(
-            """
-            INSERT INTO entity_match_keys(entity_id, primary_name_ascii, primary_name_tokens, primary_name_soundex, aliases_ascii_json, aliases_tokens_json, aliases_soundex_json)
-            VALUES (?,?,?,?,?,?,?)
-            """,
-            (
-                eid,
-                agg.get("names_ascii"),
-                agg.get("name_tokens"),
-                agg.get("primary_name_soundex"),
-                json.dumps(sorted(list(agg.get("aliases_ascii") or [])), ensure_ascii=False),
-                json.dumps(sorted(list(agg.get("aliases_tokens") or [])), ensure_ascii=False),
-                json.dumps(sorted(list(agg.get("aliases_soundex") or [])), ensure_ascii=False)
-            )
-        )
-        for al in sorted(list(agg.get("aliases") or [])):
-            cur.execute("INSERT INTO entity_aliases(entity_id, alias) VALUES (?,?)", (eid, al))
-
-    for a in aux_rows:
-        if not a:
-            continue
-        k = ("G", a.get("global_id")) if (a.get("global_id") or "").strip() else ("H", a.get("primary_name_ascii") or "", a.get("birth_year") or "", a.get("citizenship_country_iso") or "")
-        eid = entity_key_to_id.get(k)
-        cur.execute("INSERT OR REPLACE INTO list_entity_map(list_name, list_id, global_id, entity_id) VALUES (?,?,?,?)", (a.get("list_name"), a.get("list_id"), a.get("global_id"), eid))
-        def add_ids(id_type, values, country=None):
-            if values:
-                for v in values:
-                    if not v:
-                        continue
-                    nv = re.sub(r"[^A-Za-z0-9]", "", v).upper()
-                    cur.execute("INSERT INTO entity_identifiers(entity_id, id_type, id_value, country_iso, issuer, normalized_value) VALUES (?,?,?,?,?,?)", (eid, id_type, v, country, None, nv))
-        add_ids("BIC", a.get("bic_codes_list"))
-        add_ids("IBAN", a.get("iban_numbers_list"))
-        add_ids("SSN", a.get("ssn_numbers_list"), a.get("citizenship_country_iso"))
-        add_ids("PASSPORT", a.get("passport_numbers_list"))
-        add_ids("NATIONAL_ID", a.get("national_id_numbers_list"), a.get("citizenship_country_iso"))
-        add_ids("TAX_ID", a.get("tax_id_numbers_list"))
-        add_ids("OTHER_ID", a.get("other_id_numbers_list"))
-
+    records = iter(detailslist)
+    while True:
+        chunk = list(islice(records, BUILD_CHUNK_SIZE))
+        if not chunk:
+            break
+        list_rows = []
+        detail_rows = []
+        aux_rows = []
+        started = time.perf_counter()
+        for rec in chunk:
+            norm = normalize_sanctions_record(rec)
+            if not norm:
+                skipped += 1
+                continue
+            entry_id += 1
+            list_rows.append(norm["list_row"] + (entry_id,))
+            detail_rows.append(norm["details_row"] + (entry_id,))
+            aux_rows.append(norm.get("aux", {}))
+        for a in aux_rows:
+            if a:
+                clusters.add(a)
+        _timed_step(steps, "normalize+cluster", started, len(chunk))
+        _insert_many(cur, steps, "sanctionslist", insert_list_sql, list_rows)
+        _insert_many(cur, steps, "sanctionsdetails", insert_details_sql, detail_rows)
+        clusters.flush()
+
+    # Built once over the loaded rows instead of being updated on every insert.
+    started = time.perf_counter()
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_list_key ON sanctionslist(list_name, list_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_details_key ON sanctionsdetails(list_name, list_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_list_country ON sanctionslist(citizenship_country_iso, address_country_iso)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_list_fullname ON sanctionslist(full_name)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_list_lastname ON sanctionslist(last_name)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_list_aliases ON sanctionslist(aliases)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_details_birth ON sanctionsdetails(birth_year, birth_month, birth_day)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_details_country ON sanctionsdetails(citizenship_country_iso, address_country_iso)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_details_global ON sanctionsdetails(global_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_map_entity ON list_entity_map(entity_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_aliases_entity ON entity_aliases(entity_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_entities_name ON entities(canonical_name)")
+    _timed_step(steps, "indexes", started)
+    clusters.finish()
     conn.commit()
+
+    started = time.perf_counter()
     _ensure_fts5(conn)
+    _timed_step(steps, "sanctions_fts", started, entry_id)
+    started = time.perf_counter()
+    _ensure_features(conn)
+    _timed_step(steps, "sanctions_features", started, entry_id)
     conn.close()
+    build_version = previous_version + 1
     try:
         conn = sqlite3.connect(dbpath)
         cur = conn.cursor()
+        # Same commit as the version bump: a reader that sees the new build sees its lists' metadata.
+        if list_metadata:
+            _write_list_metadata(cur, list_metadata)
+        _write_build_version(cur, build_version)
         if skipped:
             cur.execute(
                 "INSERT OR REPLACE INTO sanctions_meta(key, value) VALUES(?, ?)",
@@ -1753,11 +2192,24 @@ def createdatabase(detailslist):
             conn.close()
         except Exception:
             pass
+    with _index_lock:
+        _index_state["build_version"] = build_version
+        _index_state["verified_version"] = build_version
+    prepared_cache.clear()
+    reset_read_connections()
+    _build_stats.clear()
+    _build_stats.update(
+        build_version=build_version,
+        records=entry_id,
+        skipped=skipped,
+        entities=len(clusters.key_to_id),
+        seconds=round(time.perf_counter() - build_started, 3),
+        steps=steps,
+    )
 
 
 def returnDetails2():
-    dbpath = Path(__file__).parent.parent / "data" / "sanctions.db"
-    conn = sqlite3.connect(dbpath)
+    conn = get_read_connection()
     cur = conn.cursor()
     cur.execute(
         """
@@ -1786,78 +2238,65 @@ def returnDetails2():
             COALESCE(d.other_information_text, '')
         FROM sanctionslist AS l
         LEFT JOIN sanctionsdetails AS d
-          ON d.list_name = l.list_name
-         AND d.list_id = l.list_id
+          ON d.rowid = l.rowid
     """
     )
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    return cur.fetchall()
 
 
-def returnDetails2_fts_multi(queries, list_filter, limit):
-    import re
-    import sqlite3
-    from array import array
-    from pathlib import Path
+_FTS_TOKEN_RE = re.compile(r"[0-9A-Za-z]+")
 
-    dbpath = Path(__file__).parent.parent / "data" / "sanctions.db"
-    conn = sqlite3.connect(dbpath)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
+FTS_BATCH_MAX_QUERIES = 200
 
-    _ensure_fts5(conn)
-    cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='sanctions_fts'")
-    if not cur.fetchone():
-        conn.close()
-        return []
+FTS_RECORD_COLUMNS = (
+    "list_name",
+    "list_id",
+    "classification",
+    "full_name",
+    "first_name",
+    "middle_name",
+    "last_name",
+    "other_first_name",
+    "nationality",
+    "citizenship_country",
+    "citizenship_country_iso",
+    "primary_address",
+    "address_city",
+    "address_state",
+    "address_postal_code",
+    "address_country",
+    "address_country_iso",
+    "alternative_addresses",
+    "aliases",
+    "global_id",
+    "justification_text",
+    "other_information_text",
+)
 
-    def _rank_from_matchinfo(matchinfo_blob):
-        if matchinfo_blob is None:
-            return 0.0
-        if isinstance(matchinfo_blob, memoryview):
-            matchinfo_blob = matchinfo_blob.tobytes()
-        data = array("I")
-        try:
-            data.frombytes(matchinfo_blob)
-        except (TypeError, AttributeError):
-            data = array("I", matchinfo_blob)
-        if len(data) < 2:
-            return 0.0
-        phrase_count = data[0]
-        column_count = data[1]
-        index = 2
-        score = 0.0
-        for _ in range(phrase_count):
-            for _ in range(column_count):
-                if index + 2 >= len(data):
-                    return score
-                term_hits = data[index]
-                total_hits = data[index + 1]
-                doc_hits = data[index + 2]
-                index += 3
-                if term_hits == 0:
-                    continue
-                freq_norm = total_hits if total_hits else 1
-                doc_norm = doc_hits if doc_hits else 1
-                score += float(term_hits) / float(freq_norm) + 1.0 / float(doc_norm)
-        return score
 
-    conn.create_function("rank_match", 1, _rank_from_matchinfo)
+def _flatten_query_value(value):
+    if isinstance(value, (list, tuple)):
+        parts = [str(item).strip() for item in value if str(item or "").strip()]
+        return " ".join(parts)
+    if isinstance(value, dict):
+        parts = [str(item).strip() for item in value.values() if str(item or "").strip()]
+        return " ".join(parts)
+    return str(value or "").strip()
+
 
-    token_re = re.compile(r"[0-9A-Za-z]+")
+def _fts_query_tokens(text):
+    tokens = []
+    for token in _FTS_TOKEN_RE.findall(text):
+        token = token.lower()
+        if token and token not in tokens:
+            tokens.append(token)
+    return tokens
 
-    def _flatten(value):
-        if isinstance(value, (list, tuple)):
-            parts = [str(item).strip() for item in value if str(item or "").strip()]
-            return " ".join(parts)
-        if isinstance(value, dict):
-            parts = [str(item).strip() for item in value.values() if str(item or "").strip()]
-            return " ".join(parts)
-        return str(value or "").strip()
 
+def _normalize_fts_queries(queries, tokenizer=_fts_query_tokens):
+    """Return (input_index, field, tokens) for every usable query entry."""
     normalized_queries = []
-    for entry in queries or []:
+    for position, entry in enumerate(queries or []):
         field = "name"
         value = None
         if isinstance(entry, dict):
@@ -1877,159 +2316,530 @@ def returnDetails2_fts_multi(queries, list_filter, limit):
         else:
             value = entry
 
-        text = _flatten(value)
+        text = _flatten_query_value(value)
         if not text:
             continue
         if field not in {"name", "address"}:
             field = "name"
-        tokens = []
-        for token in token_re.findall(text):
-            token = token.lower()
-            if token and token not in tokens:
-                tokens.append(token)
+        tokens = tokenizer(text)
         if not tokens:
             continue
-        normalized_queries.append((field, tokens))
+        normalized_queries.append((position, field, tokens))
+    return normalized_queries
+
+
+def _fts_match_expression(field, tokens):
+    if field == "address":
+        return " AND ".join(f"addresses:{token}*" for token in tokens)
+    clauses = [f"(name:{t}* OR aliases:{t}*)" for t in tokens]
+    if len(clauses) >= 2:
+        pairs = []
+        for i in range(len(clauses)):
+            for j in range(i + 1, len(clauses)):
+                pairs.append(f"({clauses[i]} AND {clauses[j]})")
+        return " OR ".join(pairs)
+    return clauses[0]
+
+
+def _list_filter_clause(list_filter, column):
+    if not list_filter:
+        return "", []
+    norms = [str(x).strip().upper() for x in list_filter if str(x).strip()]
+    if not norms:
+        return "", []
+    like_placeholders = " OR ".join([f"UPPER({column}) LIKE ?"] * len(norms))
+    return f" AND ({like_placeholders})", [f"{code}%" for code in norms]
+
+
+# Every variant is "higher is better"; rows are normalized per query before merging.
+_FTS_SCORE_EXPRESSIONS = (
+    "rank_match(matchinfo(sanctions_fts, 'pcx'))",
+    "-bm25(sanctions_fts)",
+    "0.0",
+)
+_fts_score_variant = {"index": 0}
+_fts_score_variant_lock = threading.Lock()
 
-    if not normalized_queries:
-        conn.close()
-        return []
 
-    list_clause_sql = ""
-    list_clause_params = []
-    if list_filter:
-        norms = [str(x).strip().upper() for x in list_filter if str(x).strip()]
-        if norms:
-            like_placeholders = " OR ".join(["UPPER(s.list_name) LIKE ?"] * len(norms))
-            list_clause_sql = f" AND ({like_placeholders})"
-            list_clause_params = [f"{code}%" for code in norms]
+def _current_fts_score_variant():
+    with _fts_score_variant_lock:
+        return _fts_score_variant["index"]
 
-    limit_per_query = int(limit) if isinstance(limit, int) or (isinstance(limit, str) and str(limit).isdigit()) else 0
-    if limit_per_query <= 0:
-        limit_per_query = 100
 
-    score_expr_options = (
-        "rank_match(matchinfo(sanctions_fts, 'pcx'))",
-        "bm25(sanctions_fts)",
-        "0.0",
+def _skip_fts_score_variant(variant):
+    """Fall back past `variant`. Only ever moves forward, whichever thread fails last."""
+    with _fts_score_variant_lock:
+        _fts_score_variant["index"] = max(_fts_score_variant["index"], variant + 1)
+
+
+def _batched_candidate_sql(query_count, score_expr, list_clause_sql):
+    """
+    One statement for a whole batch of FTS queries. Every query keeps its own
+    ORDER BY/LIMIT inside a sub-select and tags its rows with its batch slot,
+    so the caller merges all parties' candidates from a single result set.
+    """
+    columns = ",\n                ".join(f"s.{c}" for c in FTS_RECORD_COLUMNS[:20])
+    member = f"""
+        SELECT * FROM (
+            SELECT
+                {{slot}} AS qslot,
+                s.rowid AS entry_id,
+                {columns},
+                COALESCE(d.justification_text, '') AS justification_text,
+                COALESCE(d.other_information_text, '') AS other_information_text,
+                {score_expr} AS score
+            FROM sanctions_fts AS sanctions_fts
+            JOIN sanctionslist AS s
+              ON s.rowid = sanctions_fts.rowid
+            LEFT JOIN sanctionsdetails AS d
+              ON d.rowid = s.rowid
+            WHERE sanctions_fts MATCH ?{list_clause_sql}
+            ORDER BY score DESC, s.list_name, s.list_id
+            LIMIT ?
+        )"""
+    return "\n        UNION ALL".join(member.format(slot=slot) for slot in range(query_count))
+
+
+# Name candidates are generated with an "at least k of n tokens" rule: one
+# posting-list scan per distinct token, hits counted in Python and ranked by
+# the summed rarity (idf) of the matched tokens. The previous pairwise
+# "(a AND b) OR (a AND c) ..." expansion is kept as NAME_STRATEGY_PAIRWISE.
+NAME_STRATEGY_MIN_SHOULD_MATCH = "min_should_match"
+NAME_STRATEGY_PAIRWISE = "pairwise"
+NAME_MIN_SHOULD_MATCH = 2
+FTS_ROWID_CHUNK = 500
+# A prefix with more postings than this ("a*", "al*") is never scanned into
+# Python: it does not generate candidates, it is only checked on the
+# documents the query's other tokens reach.
+NAME_TOKEN_MAX_POSTINGS = 1000
+
+
+def _token_postings(cur, tokens, list_clause_sql, list_clause_params, max_postings=NAME_TOKEN_MAX_POSTINGS):
+    """
+    Return (postings, frequent): {token: [fts rowid, ...]} with one bounded
+    posting scan per token, and {token: document count} for the tokens over
+    max_postings, which get no postings.
+    """
+    postings = {}
+    frequent = {}
+    sql = (
+        "SELECT rowid FROM sanctions_fts "
+        f"WHERE sanctions_fts MATCH ?{list_clause_sql} LIMIT ?"
     )
-    base_sql_template = """
+    count_sql = f"SELECT COUNT(*) FROM sanctions_fts WHERE sanctions_fts MATCH ?{list_clause_sql}"
+    for token in tokens:
+        params = [f"{{name aliases}} : {token}*"] + list_clause_params
+        cur.execute(sql, params + [max_postings + 1])
+        rows = [row[0] for row in cur.fetchall()]
+        if len(rows) <= max_postings:
+            postings[token] = rows
+            continue
+        cur.execute(count_sql, params)
+        frequent[token] = int(cur.fetchone()[0] or 0)
+    return postings, frequent
+
+
+def _frequent_token_postings(cur, partners, list_clause_sql, list_clause_params):
+    """
+    {token: [fts rowid, ...]} for each frequent token, restricted to the
+    documents that also hold one of its partner tokens: FTS5 intersects the
+    posting lists, so only those rows reach Python.
+    """
+    postings = {}
+    sql = f"SELECT rowid FROM sanctions_fts WHERE sanctions_fts MATCH ?{list_clause_sql}"
+    for token, others in partners.items():
+        postings[token] = []
+        if not others:
+            continue
+        expression = " OR ".join(f"{other}*" for other in others)
+        cur.execute(sql, [f"{{name aliases}} : ({token}* AND ({expression}))"] + list_clause_params)
+        postings[token] = [row[0] for row in cur.fetchall()]
+    return postings
+
+
+def _name_postings(cur, token_lists, list_clause_sql, list_clause_params, max_postings=NAME_TOKEN_MAX_POSTINGS):
+    """
+    Postings for every token of the name queries in `token_lists`, ready for
+    _min_should_match_candidates: (postings, frequent document counts).
+    """
+    distinct = []
+    for tokens in token_lists:
+        for token in tokens:
+            if token not in distinct:
+                distinct.append(token)
+    postings, frequent = _token_postings(cur, distinct, list_clause_sql, list_clause_params, max_postings)
+    if frequent:
+        partners = {token: [] for token in frequent}
+        for tokens in token_lists:
+            for token in tokens:
+                if token in frequent:
+                    partners[token].extend(
+                        other for other in tokens
+                        if other not in frequent and postings.get(other) and other not in partners[token]
+                    )
+        postings.update(_frequent_token_postings(cur, partners, list_clause_sql, list_clause_params))
+    return postings, frequent
+
+
+def _fts_document_count(cur):
+    cur.execute("SELECT COUNT(*) FROM sanctions_fts")
+    row = cur.fetchone()
+    return int(row[0] or 0) if row else 0
+
+
+def _min_should_match_candidates(tokens, postings, total_docs, limit, min_should_match=NAME_MIN_SHOULD_MATCH, frequent=None):
+    """
+    Rank documents containing at least min(k, n) of the query tokens by the
+    share of the query's idf weight they match. Returns [(fts_rowid, score)]
+    with scores from -1.0 (every token) to 0, lower being better like bm25,
+    so they merge with normalized address scores. Tokens in `frequent`
+    ({token: document count}) do not generate candidates; their postings
+    only need to cover the documents the other tokens reach.
+    """
+    frequent = frequent or {}
+    required = min(max(1, int(min_should_match)), len(tokens))
+    token_weights = {}
+    for token in tokens:
+        docs = frequent[token] if token in frequent else len(postings.get(token) or ())
+        if docs:
+            token_weights[token] = math.log((total_docs + 1.0) / (docs + 0.5))
+    total_weight = sum(token_weights.values())
+    generated = set()
+    for token in token_weights:
+        if token not in frequent:
+            generated.update(postings[token])
+    if not generated or total_weight <= 0:
+        return []
+    hits = {}
+    weights = {}
+    for token, weight in token_weights.items():
+        for rowid in postings.get(token) or ():
+            if rowid in generated:
+                hits[rowid] = hits.get(rowid, 0) + 1
+                weights[rowid] = weights.get(rowid, 0.0) + weight
+    ranked = sorted(
+        (rowid for rowid, count in hits.items() if count >= required),
+        key=lambda rowid: (-weights[rowid], rowid),
+    )
+    return [(rowid, -weights[rowid] / total_weight) for rowid in ranked[:limit]]
+
+
+def _normalized_scores(scores):
+    """
+    FTS scores (higher is better) of one query's rows mapped onto the
+    candidate scale: -1.0 for the best row, towards 0 for weaker ones.
+    """
+    best = max(scores, default=0.0)
+    if best <= 0:
+        return [-1.0 for _ in scores]
+    return [-(max(score, 0.0) / best) for score in scores]
+
+
+def _records_by_rowid_sql(count):
+    columns = ", ".join(f"s.{c}" for c in FTS_RECORD_COLUMNS[:20])
+    placeholders = ",".join("?" * count)
+    return f"""
         SELECT
-            s.list_name,
-            s.list_id,
-            s.classification,
-            s.full_name,
-            s.first_name,
-            s.middle_name,
-            s.last_name,
-            s.other_first_name,
-            s.nationality,
-            s.citizenship_country,
-            s.citizenship_country_iso,
-            s.primary_address,
-            s.address_city,
-            s.address_state,
-            s.address_postal_code,
-            s.address_country,
-            s.address_country_iso,
-            s.alternative_addresses,
-            s.aliases,
-            s.global_id,
+            s.rowid AS entry_id,
+            {columns},
             COALESCE(d.justification_text, '') AS justification_text,
-            COALESCE(d.other_information_text, '') AS other_information_text,
-            {score_expr} AS score
-        FROM sanctions_fts AS sanctions_fts
-        JOIN sanctionslist AS s
-          ON s.list_id = sanctions_fts.list_id AND s.list_name = sanctions_fts.list_name
+            COALESCE(d.other_information_text, '') AS other_information_text
+        FROM sanctionslist AS s
         LEFT JOIN sanctionsdetails AS d
-          ON d.list_id = s.list_id AND d.list_name = s.list_name
-        WHERE sanctions_fts MATCH ?{list_clause_sql}
-        ORDER BY score DESC, s.list_name, s.list_id
-        LIMIT ?
+          ON d.rowid = s.rowid
+        WHERE s.rowid IN ({placeholders})
     """
 
-    sql_variants = [
-        base_sql_template.format(score_expr=expr, list_clause_sql=list_clause_sql)
-        for expr in score_expr_options
-    ]
-    active_variant_index = 0
 
-    def _execute_with_fallback(params):
-        nonlocal active_variant_index
-        while active_variant_index < len(sql_variants):
-            sql_statement = sql_variants[active_variant_index]
+def _records_for_fts_rowids(cur, rowids):
+    """Return {fts_rowid: record_tuple}; FTS rowids are sanctionslist rowids."""
+    found = {}
+    ordered = sorted(set(rowids))
+    for start in range(0, len(ordered), FTS_ROWID_CHUNK):
+        chunk = ordered[start:start + FTS_ROWID_CHUNK]
+        cur.execute(_records_by_rowid_sql(len(chunk)), chunk)
+        for row in cur.fetchall():
+            found[row["entry_id"]] = tuple(row[column] for column in FTS_RECORD_COLUMNS)
+    return found
+
+
+_token_state = {"build_version": None, "dictionary": None}
+
+
+def get_token_dictionary():
+    """The TokenDictionary of the current build, reloaded when the build version changes."""
+    build_version = get_build_version()
+    with _index_lock:
+        if _token_state["dictionary"] is not None and _token_state["build_version"] == build_version:
+            return _token_state["dictionary"]
+    cur = get_read_connection().cursor()
+    cur.execute("SELECT token FROM sanctions_tokens ORDER BY token_id")
+    dictionary = TokenDictionary(row[0] for row in cur.fetchall())
+    with _index_lock:
+        _token_state["build_version"] = build_version
+        _token_state["dictionary"] = dictionary
+    return dictionary
+
+
+class PreparedRecordCache:
+    """
+    Process-wide LRU of PreparedRecords decoded from sanctions_features, keyed
+    by (list_name, list_id, entry_id). entry_id keeps regime duplicates that
+    share a list key apart. The whole cache is dropped when the build version
+    changes, so entries never outlive the database they were read from.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = max(0, int(maxsize))
+        self.build_version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_version(self, build_version):
+        if build_version != self.build_version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.build_version = build_version
+
+    def get_many(self, keys, build_version):
+        found = {}
+        with self._lock:
+            self._check_version(build_version)
+            for key in keys:
+                prepared = self._entries.get(key)
+                if prepared is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                found[key] = prepared
+        return found
+
+    def put_many(self, items, build_version):
+        if not self.maxsize:
+            return
+        with self._lock:
+            if build_version != self.build_version:
+                return
+            for key, prepared in items:
+                self._entries[key] = prepared
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.build_version = None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "build_version": self.build_version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+prepared_cache = PreparedRecordCache(cfg.screening.RECORD_CACHE_SIZE)
+
+
+def prepared_cache_stats():
+    return prepared_cache.stats()
+
+
+def _prepared_for_rows(cur, rows):
+    """
+    Return {entry_id: PreparedRecord} for [(entry_id, record_tuple)], served
+    from prepared_cache where possible and from sanctions_features otherwise.
+    """
+    build_version = get_build_version()
+    keys = {entry_id: (record[0], record[1], entry_id) for entry_id, record in rows}
+    cached = prepared_cache.get_many(list(keys.values()), build_version)
+    found = {entry_id: cached[key] for entry_id, key in keys.items() if key in cached}
+    missing = sorted(entry_id for entry_id in keys if entry_id not in found)
+    if not missing:
+        return found
+    tokens = get_token_dictionary()
+    loaded = []
+    for start in range(0, len(missing), FTS_ROWID_CHUNK):
+        chunk = missing[start:start + FTS_ROWID_CHUNK]
+        cur.execute(
+            f"SELECT entry_id, features FROM sanctions_features WHERE entry_id IN ({','.join('?' * len(chunk))})",
+            chunk,
+        )
+        for row in cur.fetchall():
+            prepared = prepared_from_json(row[1], tokens)
+            found[row[0]] = prepared
+            loaded.append((keys[row[0]], prepared))
+    prepared_cache.put_many(loaded, build_version)
+    return found
+
+
+def returnPreparedRecords(entry_ids=False):
+    """
+    Every sanctions record as a PreparedRecord, read from sanctions_features
+    in entry_id order. With entry_ids=True returns (entry ids, records).
+    """
+    _ensure_index_verified()
+    tokens = get_token_dictionary()
+    cur = get_read_connection().cursor()
+    cur.execute("SELECT entry_id, features FROM sanctions_features ORDER BY entry_id")
+    rows = cur.fetchall()
+    records = [prepared_from_json(row[1], tokens) for row in rows]
+    if entry_ids:
+        return array("I", (row[0] for row in rows)), records
+    return records
+
+
+def returnFtsPostings():
+    """
+    The FTS index's own postings, read through sanctions_fts_terms: (name
+    postings, address postings), each {term: array of fts rowids}. Name
+    postings cover the name and aliases columns. Terms are exactly what the
+    index tokenizer produced, so prefix lookups on them find the documents
+    a "term*" MATCH finds.
+    """
+    _ensure_index_verified()
+    cur = get_read_connection().cursor()
+    cur.execute("SELECT term, doc, col FROM sanctions_fts_terms WHERE col IN ('name', 'aliases', 'addresses')")
+    name_postings = {}
+    address_postings = {}
+    for term, doc, col in cur:
+        postings = address_postings if col == "addresses" else name_postings
+        docs = postings.get(term)
+        if docs is None:
+            postings[term] = array("I", (doc,))
+        elif docs[-1] != doc:
+            # Instances arrive in (term, rowid) order; repeats of a document are adjacent.
+            docs.append(doc)
+    return name_postings, address_postings
+
+
+def returnDetails2_fts_batch(queries, list_filter, limit, name_strategy=NAME_STRATEGY_MIN_SHOULD_MATCH, prepared=False):
+    """
+    Candidate retrieval for every party query of a message in one round-trip
+    (per FTS_BATCH_MAX_QUERIES queries). Returns (record_tuple, matched) pairs
+    where matched holds the positions in `queries` that produced the record,
+    ordered the same way as returnDetails2_fts_multi. Name queries use the
+    min-should-match generator unless name_strategy is NAME_STRATEGY_PAIRWISE.
+    With prepared=True the records are PreparedRecords loaded from
+    sanctions_features instead of raw tuples.
+    """
+    _ensure_index_verified()
+    conn = get_read_connection()
+    cur = conn.cursor()
+    cur.row_factory = sqlite3.Row
+
+    cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='sanctions_fts'")
+    if not cur.fetchone():
+        return []
+
+    normalized_queries = _normalize_fts_queries(queries)
+    if not normalized_queries:
+        return []
+
+    list_clause_sql, list_clause_params = _list_filter_clause(list_filter, "s.list_name")
+
+    if name_strategy == NAME_STRATEGY_PAIRWISE:
+        fts_queries = normalized_queries
+        name_queries = []
+    else:
+        fts_queries = [q for q in normalized_queries if q[1] == "address"]
+        name_queries = [q for q in normalized_queries if q[1] != "address"]
+
+    limit_per_query = int(limit) if isinstance(limit, int) or (isinstance(limit, str) and str(limit).isdigit()) else 0
+    if limit_per_query <= 0:
+        limit_per_query = 100
+
+    def _execute_with_fallback(query_count, params):
+        variant = _current_fts_score_variant()
+        while variant < len(_FTS_SCORE_EXPRESSIONS):
+            sql_statement = _batched_candidate_sql(query_count, _FTS_SCORE_EXPRESSIONS[variant], list_clause_sql)
             try:
                 cur.execute(sql_statement, params)
                 return cur.fetchall()
             except sqlite3.OperationalError as exc:
                 message = str(exc).lower()
-                if "matchinfo" in message and active_variant_index == 0:
-                    active_variant_index += 1
-                    continue
-                if "bm25" in message and active_variant_index == 1:
-                    active_variant_index += 1
+                if ("matchinfo" in message and variant == 0) or ("bm25" in message and variant == 1):
+                    _skip_fts_score_variant(variant)
+                    variant = _current_fts_score_variant()
                     continue
                 raise
         return []
 
-    data_columns = [
-        "list_name",
-        "list_id",
-        "classification",
-        "full_name",
-        "first_name",
-        "middle_name",
-        "last_name",
-        "other_first_name",
-        "nationality",
-        "citizenship_country",
-        "citizenship_country_iso",
-        "primary_address",
-        "address_city",
-        "address_state",
-        "address_postal_code",
-        "address_country",
-        "address_country_iso",
-        "alternative_addresses",
-        "aliases",
-        "global_id",
-        "justification_text",
-        "other_information_text",
-    ]
-
     results = {}
 
-    for field, tokens in normalized_queries:
-        if field == "address":
-            match_parts = [f"addresses:{token}*" for token in tokens]
-            match_expression = " AND ".join(match_parts)
-        else:
-            clauses = [f"(name:{t}* OR aliases:{t}*)" for t in tokens]
-            if len(clauses) >= 2:
-                pairs = []
-                for i in range(len(clauses)):
-                    for j in range(i + 1, len(clauses)):
-                        pairs.append(f"({clauses[i]} AND {clauses[j]})")
-                match_expression = " OR ".join(pairs)
-            else:
-                match_expression = clauses[0]
-        if not match_expression:
-            continue
-
-        params = [match_expression] + list_clause_params + [limit_per_query]
-        rows = _execute_with_fallback(params)
-        if not rows:
-            continue
-
-        for row in rows:
-            key = (row["list_name"], row["list_id"])
-            score_value = float(row["score"]) if "score" in row.keys() else 0.0
-            existing = results.get(key)
-            if existing is None or score_value < existing[0]:
-                record_tuple = tuple(row[column] for column in data_columns)
-                results[key] = (score_value, record_tuple)
-
-    conn.close()
+    def _merge(position, score_value, record, entry_id):
+        key = (record[0], record[1])
+        existing = results.get(key)
+        if existing is None:
+            results[key] = [score_value, record, {position}, entry_id]
+            return
+        existing[2].add(position)
+        if score_value < existing[0]:
+            existing[0] = score_value
+            existing[1] = record
+            existing[3] = entry_id
+
+    if name_queries:
+        fts_clause_sql, fts_clause_params = _list_filter_clause(list_filter, "list_name")
+        postings, frequent = _name_postings(
+            cur, [tokens for _, _, tokens in name_queries], fts_clause_sql, fts_clause_params, NAME_TOKEN_MAX_POSTINGS
+        )
+        total_docs = _fts_document_count(cur)
+        per_query = [
+            (
+                position,
+                _min_should_match_candidates(
+                    tokens, postings, total_docs, limit_per_query, frequent=frequent
+                ),
+            )
+            for position, _, tokens in name_queries
+        ]
+        records = _records_for_fts_rowids(cur, [rowid for _, ranked in per_query for rowid, _ in ranked])
+        for position, ranked in per_query:
+            for rowid, score_value in ranked:
+                record = records.get(rowid)
+                if record is not None:
+                    _merge(position, score_value, record, rowid)
+
+    for start in range(0, len(fts_queries), FTS_BATCH_MAX_QUERIES):
+        chunk = fts_queries[start:start + FTS_BATCH_MAX_QUERIES]
+        params = []
+        for _, field, tokens in chunk:
+            params.append(_fts_match_expression(field, tokens))
+            params.extend(list_clause_params)
+            params.append(limit_per_query)
+
+        rows_by_slot = {}
+        for row in _execute_with_fallback(len(chunk), params):
+            rows_by_slot.setdefault(row["qslot"], []).append(row)
+        for slot, slot_rows in rows_by_slot.items():
+            scores = _normalized_scores(
+                [float(row["score"]) if row["score"] is not None else 0.0 for row in slot_rows]
+            )
+            for row, score_value in zip(slot_rows, scores):
+                _merge(
+                    chunk[slot][0],
+                    score_value,
+                    tuple(row[column] for column in FTS_RECORD_COLUMNS),
+                    row["entry_id"],
+                )
 
     if not results:
         return []
@@ -2038,19 +2848,84 @@ def returnDetails2_fts_multi(queries, list_filter, limit):
         results.values(),
         key=lambda item: (item[0], item[1][0], item[1][1])
     )
-    return [record for _, record in sorted_rows]
+    if prepared:
+        features = _prepared_for_rows(cur, [(entry_id, record) for _, record, _, entry_id in sorted_rows])
+        return [
+            (features.get(entry_id) or prepare_record(record), tuple(sorted(matched)))
+            for _, record, matched, entry_id in sorted_rows
+        ]
+    return [(record, tuple(sorted(matched))) for _, record, matched, _ in sorted_rows]
 
 
+def returnDetails2_fts_multi(queries, list_filter, limit, name_strategy=NAME_STRATEGY_MIN_SHOULD_MATCH, prepared=False):
+    return [record for record, _ in returnDetails2_fts_batch(queries, list_filter, limit, name_strategy, prepared)]
+
+
+
+# sanctions_meta keys holding one JSON object per source list, written by refresh_lists().
+LIST_META_PREFIX = "list:"
+# Bumped with every list metadata write, so each process can tell its copy is stale.
+LIST_META_VERSION_KEY = "list_meta_version"
+
+
+def _write_list_metadata(cur: sqlite3.Cursor, entries) -> None:
+    cur.execute("CREATE TABLE IF NOT EXISTS sanctions_meta (key TEXT PRIMARY KEY, value TEXT)")
+    cur.executemany(
+        "INSERT OR REPLACE INTO sanctions_meta(key, value) VALUES(?, ?)",
+        [(LIST_META_PREFIX + name, json.dumps(meta, ensure_ascii=False)) for name, meta in entries.items()],
+    )
+    cur.execute(
+        "INSERT INTO sanctions_meta(key, value) VALUES(?, '1') "
+        "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+        (LIST_META_VERSION_KEY,),
+    )
+
+
+def set_list_metadata(entries):
+    """Store {list name: metadata dict} in sanctions_meta in one transaction."""
+    conn = sqlite3.connect(str(cfg.paths.DB_PATH), timeout=30.0)
+    try:
+        _write_list_metadata(conn.cursor(), entries)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def get_list_metadata_version() -> int:
+    """The LIST_META_VERSION_KEY stamp; 0 for a database whose list metadata was never written."""
+    try:
+        cur = get_read_connection().cursor()
+        cur.execute("SELECT value FROM sanctions_meta WHERE key = ?", (LIST_META_VERSION_KEY,))
+        row = cur.fetchone()
+    except sqlite3.Error:
+        return 0
+    return int(row[0]) if row else 0
+
+
+def get_list_metadata():
+    """{list name: metadata dict} from sanctions_meta; empty for a database built before refresh metadata."""
+    try:
+        cur = get_read_connection().cursor()
+        cur.execute("SELECT key, value FROM sanctions_meta WHERE key LIKE ?", (LIST_META_PREFIX + "%",))
+        rows = cur.fetchall()
+    except sqlite3.Error:
+        return {}
+    entries = {}
+    for key, value in rows:
+        try:
+            entries[key[len(LIST_META_PREFIX):]] = json.loads(value)
+        except (TypeError, ValueError):
+            continue
+    return entries
+
 
 def warm_database():
-    import sqlite3
-    from pathlib import Path
-    db_path = Path(__file__).parent.parent / "data" / "sanctions.db"
+    db_path = cfg.paths.DB_PATH
     if not db_path.exists():
         return {"warmed": False, "reason": "db_missing", "path": str(db_path)}
 
     try:
-        conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        conn = get_read_connection()
         cur = conn.cursor()
         cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='sanctionslist'")
         if cur.fetchone() is None:
@@ -2069,12 +2944,11 @@ def warm_database():
             except sqlite3.OperationalError as exc:
                 return {"warmed": False, "reason": "fts5_missing", "error": str(exc), "path": str(db_path)}
 
-        cur.execute("PRAGMA optimize")
+        optimize_conn = sqlite3.connect(str(db_path))
+        try:
+            optimize_conn.execute("PRAGMA optimize")
+        finally:
+            optimize_conn.close()
         return {"warmed": bool(row_count and fts_exists), "rows": row_count, "fts": fts_exists, "path": str(db_path)}
     except sqlite3.OperationalError as e:
         return {"warmed": False, "reason": "operational_error", "error": str(e), "path": str(db_path)}
-    finally:
-        try:
-            conn.close()
-        except Exception:
-            pass
@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import calendar
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config import get_config
+from matcher import FEATURES_VERSION, normalize_party, party_role, to_text
+from rules import rules_version
+
+cfg = get_config()
+
+# Bump when screen_party/evaluate_match change so stored decisions are ignored.
+DECISION_CACHE_VERSION = "1"
+# Expired and surplus match_cache rows are swept after this many writes.
+SWEEP_EVERY_WRITES = 1000
+
+
+def _utc(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(timestamp))
+
+
+def _payload_hash(decision: str) -> str:
+    return hashlib.sha256(decision.encode("utf-8")).hexdigest()
+
+
+_MATCH_CACHE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS match_cache (
+        key_hash TEXT PRIMARY KEY,
+        decision TEXT,
+        ttl_expires_at TEXT,
+        payload_hash TEXT
+    )
+"""
+
+
+class MatchCacheStore:
+    """
+    The match_cache table, in its own WAL database (AML_MATCH_CACHE_DB_PATH)
+    so decision writes never take a lock on sanctions.db, which the read pool
+    serves from and createdatabase() rebuilds. Each thread keeps its own
+    connection; WAL lets lookups proceed while another thread commits, and
+    synchronous=NORMAL skips the per-commit fsync, since a lost row only
+    costs a re-screen.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        local = self._local
+        conn = getattr(local, "conn", None)
+        # A prefork child must not reuse a connection inherited from its parent.
+        if conn is not None and local.pid == os.getpid():
+            return conn
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(_MATCH_CACHE_SCHEMA)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_match_cache_expiry ON match_cache(ttl_expires_at)")
+        conn.commit()
+        local.conn = conn
+        local.pid = os.getpid()
+        return conn
+
+    def get(self, key_hash: str, now: str) -> Optional[Tuple[str, str, str]]:
+        """Return (decision, payload_hash, ttl_expires_at) for an unexpired row, else None."""
+        return self._connection().execute(
+            "SELECT decision, payload_hash, ttl_expires_at FROM match_cache WHERE key_hash = ? AND ttl_expires_at > ?",
+            (key_hash, now),
+        ).fetchone()
+
+    def put(self, rows: Sequence[Tuple[str, str, str, str]]) -> None:
+        """Upsert [(key_hash, decision, ttl_expires_at, payload_hash)] in one transaction."""
+        if not rows:
+            return
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO match_cache(key_hash, decision, ttl_expires_at, payload_hash) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def evict(self, now: str, max_rows: int) -> int:
+        """Delete expired rows, then the soonest-expiring rows beyond max_rows. Returns rows deleted."""
+        with self._connection() as conn:
+            deleted = conn.execute("DELETE FROM match_cache WHERE ttl_expires_at <= ?", (now,)).rowcount
+            (count,) = conn.execute("SELECT COUNT(*) FROM match_cache").fetchone()
+            excess = int(count) - int(max_rows)
+            if excess > 0:
+                deleted += conn.execute(
+                    "DELETE FROM match_cache WHERE key_hash IN "
+                    "(SELECT key_hash FROM match_cache ORDER BY ttl_expires_at LIMIT ?)",
+                    (excess,),
+                ).rowcount
+        return deleted
+
+
+class DecisionCache:
+    """
+    Per-party screening decisions (screen_party() results) keyed by a hash of
+    the normalized party, its candidate queries, the sanctions build version
+    and the rules version. L1 is an in-process LRU; L2 is a MatchCacheStore,
+    shared by every worker on the same host. Both honour the TTL; L2 is also
+    capped at max_rows. A list refresh changes the build version, so stale
+    decisions are never served and age out of L2 with the sweep.
+    """
+
+    def __init__(self, l1_size: int, ttl_seconds: int, max_rows: int, db_path: Optional[Path] = None):
+        self.l1_size = max(0, int(l1_size))
+        self.ttl_seconds = max(1, int(ttl_seconds))
+        self.max_rows = max(1, int(max_rows))
+        self.store = MatchCacheStore(db_path or cfg.paths.MATCH_CACHE_DB_PATH)
+        self._l1: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_sweep = 0
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.l1_evictions = 0
+        self.l2_evictions = 0
+        self.errors = 0
+
+    def key(self, party: Dict[str, Any], build_version: int) -> Optional[str]:
+        role = party_role(party)
+        if role is None:
+            return None
+        payload = json.dumps(
+            [
+                DECISION_CACHE_VERSION,
+                FEATURES_VERSION,
+                rules_version(),
+                build_version,
+                role,
+                to_text(party.get("Street") or "").strip(),
+                normalize_party(party),
+            ],
+            sort_keys=True,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is not None:
+                expires_at, decision = entry
+                if expires_at > now:
+                    self._l1.move_to_end(key)
+                    self.l1_hits += 1
+                    return json.loads(decision)
+                del self._l1[key]
+        try:
+            row = self.store.get(key, _utc(now))
+        except Exception:
+            self.errors += 1
+            logging.warning("match_cache lookup failed", exc_info=True)
+            row = None
+        if row is None or row[1] != _payload_hash(row[0]):
+            with self._lock:
+                self.misses += 1
+            return None
+        decision, _, expires_at = row
+        expires = calendar.timegm(time.strptime(expires_at, "%Y-%m-%dT%H:%M:%SZ"))
+        with self._lock:
+            self.l2_hits += 1
+            self._remember(key, expires, decision)
+        return json.loads(decision)
+
+    def _remember(self, key: str, expires_at: float, decision: str) -> None:
+        if not self.l1_size:
+            return
+        self._l1[key] = (expires_at, decision)
+        self._l1.move_to_end(key)
+        while len(self._l1) > self.l1_size:
+            self._l1.popitem(last=False)
+            self.l1_evictions += 1
+
+    def put_many(self, items: Sequence[Tuple[str, Dict[str, Any]]]) -> None:
+        if not items:
+            return
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        rows: List[Tuple[str, str, str, str]] = []
+        with self._lock:
+            for key, result in items:
+                decision = json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+                self._remember(key, expires_at, decision)
+                rows.append((key, decision, _utc(expires_at), _payload_hash(decision)))
+            self.writes += len(rows)
+            self._writes_since_sweep += len(rows)
+            sweep = self._writes_since_sweep >= SWEEP_EVERY_WRITES
+            if sweep:
+                self._writes_since_sweep = 0
+        try:
+            self.store.put(rows)
+            if sweep:
+                deleted = self.store.evict(_utc(now), self.max_rows)
+                with self._lock:
+                    self.l2_evictions += deleted
+        except Exception:
+            self.errors += 1
+            logging.warning("match_cache write failed", exc_info=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._l1.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.l1_hits + self.l2_hits + self.misses
+            return {
+                "path": str(self.store.db_path),
+                "l1_size": len(self._l1),
+                "l1_maxsize": self.l1_size,
+                "ttl_seconds": self.ttl_seconds,
+                "max_rows": self.max_rows,
+                "l1_hits": self.l1_hits,
+                "l2_hits": self.l2_hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "l1_evictions": self.l1_evictions,
+                "l2_evictions": self.l2_evictions,
+                "errors": self.errors,
+                "hit_rate": round((self.l1_hits + self.l2_hits) / lookups, 4) if lookups else None,
+            }
+
+
+decision_cache = DecisionCache(
+    cfg.screening.DECISION_CACHE_L1_SIZE,
+    cfg.screening.DECISION_CACHE_TTL,
+    cfg.screening.DECISION_CACHE_MAX_ROWS,
+)
+
+
+def decision_cache_stats() -> Dict[str, Any]:
+    return decision_cache.stats()
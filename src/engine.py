@@ -1,20 +1,18 @@
 from pathlib import Path
+import os
 import sqlite3
 import time
 from turtle import Screen
 from typing import List
-from isoparser import parse, buildbase
-from returnitems import returnitems
-from database import createdatabase, returnDetails2_fts_multi, returnDetails2
-from OFACload import OFAC_fetch_cons, OFAC_fetch_sdn, OFAC_extract
-from UKload import UK_fetch, UK_extract
-from UNload import UN_fetch, UN_extract
-from EUCFSLload import EU_fetch, EU_extract
-from AUload import AU_fetch, AU_extract
-from CAload import CA_fetch, CA_extract
-from SECOload import SECO_fetch, SECO_extract
-from matcher import matching
-from screening import submitresponse
+from returnitems import parse_message
+from database import build_stats, createdatabase, get_build_version, returnDetails2_fts_batch, returnDetails2
+from listload import discard_rows, drain_rows, load_lists
+from matcher import min_risk_final_score, party_role, prepare_table, screen_party, summarize_parties
+from decisioncache import decision_cache
+from resultcache import ingest_hash, result_cache
+from audit import audit_entry, audit_writer
+from snapshot import get_snapshot, refresh_snapshot_async
+from screening import list_refresh_entries, submitresponse, touch_list_refresh
 from config import get_config, ScreeningConfig
 import json
 
@@ -26,48 +24,169 @@ def _ensure_db_ready() -> None:
         return
     refresh_lists()
 
+def _party_queries(party) -> List[object]:
+    queries: List[object] = []
+    nm = (party.get("Name") or "").strip()
+    if nm:
+        queries.append(nm)
+    addr = (party.get("Street") or "").strip()
+    if addr:
+        queries.append({"field": "address", "value": addr})
+    return queries
+
+def _screening_snapshot():
+    return get_snapshot() if cfg.screening.USE_SNAPSHOT else None
+
+def _screening_version(snapshot) -> int:
+    """Build version of the lists a screen runs against: the snapshot's, which lags the database until the swap."""
+    return snapshot.build_version if snapshot is not None else get_build_version()
+
+def _screen_uncached(parties, snapshot=None):
+    """Screen each party against the candidates retrieved for its own queries (from `snapshot` when given)."""
+    use_vector = cfg.screening.VECTOR_SCORING
+    min_final_score = min_risk_final_score()
+    if snapshot is not None and cfg.screening.FULL_TABLE_SCAN:
+        #Full-table mode: every party is scored against every record.
+        records, matrix = prepare_table(snapshot.matrix, use_vector)
+        return [screen_party(p, records, matrix, min_final_score) for p in parties]
+    party_queries = [_party_queries(p) for p in parties]
+    if snapshot is not None:
+        candidate_sets = [snapshot.candidates(q, limit=500) if q else [] for q in party_queries]
+    else:
+        #One batched FTS round-trip for all parties, split back by query position.
+        queries: List[object] = []
+        owners: List[int] = []
+        for i, q in enumerate(party_queries):
+            queries.extend(q)
+            owners.extend([i] * len(q))
+        candidate_sets = [[] for _ in parties]
+        if queries:
+            for record, matched in returnDetails2_fts_batch(queries, None, 500, prepared=True):
+                for i in sorted({owners[position] for position in matched}):
+                    candidate_sets[i].append(record)
+    return [
+        screen_party(p, *prepare_table(candidates, use_vector), min_final_score)
+        for p, candidates in zip(parties, candidate_sets)
+    ]
+
+def _screen_parties(party_infos):
+    """screen_party() result per party, served from the decision cache where possible."""
+    parties = list(party_infos or [])
+    results = [None] * len(parties)
+    keys = [None] * len(parties)
+    use_cache = cfg.screening.DECISION_CACHE
+    snapshot = _screening_snapshot()
+    #Keyed on the lists actually screened against, not the newest build on disk.
+    build_version = _screening_version(snapshot) if use_cache else None
+    pending = []
+    for i, party in enumerate(parties):
+        if not isinstance(party, dict) or party_role(party) is None:
+            continue
+        if use_cache:
+            keys[i] = decision_cache.key(party, build_version)
+            cached = decision_cache.get(keys[i])
+            if cached is not None:
+                results[i] = cached
+                continue
+        pending.append(i)
+    if pending:
+        for i, result in zip(pending, _screen_uncached([parties[i] for i in pending], snapshot)):
+            results[i] = result
+        if use_cache:
+            decision_cache.put_many([(keys[i], results[i]) for i in pending if results[i] is not None])
+    return results
+
+def _party_key(party) -> str:
+    """Identity of a party record within one request, for screening repeated parties once."""
+    return json.dumps(party, sort_keys=True, ensure_ascii=False, default=str)
+
+def _cached_response(message_hash: str):
+    """((result cache key, build version), cached response or None); the first is None with the cache off."""
+    if not cfg.screening.RESULT_CACHE:
+        return None, None
+    #Retried/duplicated messages: same bytes, same lists, same rules -> same decision.
+    build_version = _screening_version(_screening_snapshot())
+    cache_key = result_cache.key(message_hash, build_version)
+    cached = result_cache.get(cache_key)
+    if cached is not None and cfg.screening.AUDIT:
+        audit_writer.enqueue(audit_entry(message_hash, cached))
+    return (cache_key, build_version), cached
+
+def _finish_response(message_hash, cache_key, base, party_infos, transaction_info, party_results, lists_used=None):
+    engine_result = summarize_parties(party_results, ScreeningConfig)
+    response = submitresponse(base, party_infos, transaction_info, engine_result, lists_used)
+    if cache_key is not None:
+        key, build_version = cache_key
+        #Snapshots only move forward: the same version now means the screen ran on it too.
+        if _screening_version(_screening_snapshot()) == build_version:
+            result_cache.put(key, response)
+    if cfg.screening.AUDIT:
+        audit_writer.enqueue(audit_entry(message_hash, response, base["metadata"].get("responseId")))
+    return response
+
 def screen_xml_bytes(xml_bytes: bytes):
     # GUI_PATH = cfg.paths.GUI_PATH
-    parsed = parse(xml_bytes)
-    base = buildbase(parsed)
-    party_infos, transaction_info = returnitems(parsed, base)
+    message_hash = ingest_hash(xml_bytes)
+    cache_key, cached = _cached_response(message_hash)
+    if cached is not None:
+        return cached
+    base, party_infos, transaction_info = parse_message(xml_bytes)
     _ensure_db_ready()
-    queries: List[str] = []
-    queries: List[object] = []
-    for p in (party_infos or []):
-        nm = (p.get("Name") or "").strip()
-        if nm:
-            queries.append(nm)
-        addr = (p.get("Street") or "").strip()
-        if addr:
-            queries.append({"field": "address", "value": addr})
-    table_data = returnDetails2_fts_multi(queries, list_filter=None, limit=500)
     #returndetails2 Will return every single row and do a thorough search; Takes a lot longer
    #table_data = returnDetails2()
-    engine_result = matching(party_infos, transaction_info, table_data, ScreeningConfig)
-    response = submitresponse(base, party_infos, transaction_info, engine_result)
-    formattedresponse = json.dumps(response, indent=2, ensure_ascii=False)
-    # (GUI_PATH / "latest.json").write_text(formattedresponse, encoding="utf-8")
+    # (GUI_PATH / "latest.json").write_text(json.dumps(response, indent=2, ensure_ascii=False), encoding="utf-8")
     # with (GUI_PATH / "history.jsonl").open("a", encoding="utf-8") as f:
     #     f.write(json.dumps(response, ensure_ascii=False) + "\n")
-    return response
+    return _finish_response(
+        message_hash, cache_key, base, party_infos, transaction_info, _screen_parties(party_infos)
+    )
 
 def response_code_from_result(result: dict) -> str:
     code = (((result or {}).get("engine") or {}).get("responseCode") or "").strip()
     if code:
         return code
 
-def refresh_lists() -> int:
-    details: List[dict] = []
-    details.extend(OFAC_extract(OFAC_fetch_cons()))
-    details.extend(OFAC_extract(OFAC_fetch_sdn()))
-    details.extend(UK_extract(UK_fetch()))
-    details.extend(UN_extract(UN_fetch()))
-    details.extend(EU_extract(EU_fetch()))
-    details.extend(AU_extract(AU_fetch()))
-    details.extend(CA_extract(CA_fetch()))
-    details.extend(SECO_extract(SECO_fetch()))
-    createdatabase(details)
+#Per-list fetch/extract timings and errors of the last refresh_lists() call.
+_last_refresh = {"seconds": None, "loadSeconds": None, "rebuilt": None, "unchanged": None, "lists": {}, "build": None}
+
+def refresh_stats() -> dict:
+    return dict(_last_refresh)
+
+def _count_rows() -> int:
+    conn = sqlite3.connect(cfg.paths.DB_PATH)
+    try:
+        return int(conn.execute("SELECT COUNT(*) FROM sanctionslist").fetchone()[0] or 0)
+    finally:
+        conn.close()
+
+def refresh_lists(force: bool = False) -> int:
+    started = time.perf_counter()
+    rows_by_list, report = load_lists(cfg.screening.REFRESH_WORKERS, force)
+    if rows_by_list is None:
+        #Every source matched the current build: no extract, no rebuild, caches stay valid.
+        touch_list_refresh(report)
+        result_cache.clear()
+        elapsed = round(time.perf_counter() - started, 3)
+        _last_refresh.update(loadSeconds=elapsed, seconds=elapsed, rebuilt=False, unchanged=True, lists=report)
+        return _count_rows()
+    failed = [name for name in report if name not in rows_by_list]
+    _last_refresh.update(loadSeconds=round(time.perf_counter() - started, 3), rebuilt=not failed, unchanged=False, lists=report)
+    if failed:
+        #Rebuilding without them would silently stop screening against those lists.
+        discard_rows(rows_by_list)
+        _last_refresh["seconds"] = round(time.perf_counter() - started, 3)
+        raise RuntimeError(f"list refresh failed for {', '.join(failed)}; the sanctions database was not rebuilt")
+    #Rows stream from each list's spill file, which is deleted once createdatabase() has consumed it.
+    try:
+        createdatabase(drain_rows(rows_by_list), list_metadata=list_refresh_entries(report))
+    finally:
+        discard_rows(rows_by_list)
+    _last_refresh["build"] = build_stats()
+    decision_cache.clear()
+    result_cache.clear()
+    if not os.getenv("AML_PREFORK_PARENT"):
+        #Under prefork.py the parent reloads the snapshot and replaces this worker.
+        refresh_snapshot_async()
     conn = sqlite3.connect(cfg.paths.DB_PATH)
     try:
         cur = conn.cursor()
@@ -80,6 +199,7 @@ def refresh_lists() -> int:
             ("last_built_epoch", str(int(time.time())))
         )
         conn.commit()
+        _last_refresh["seconds"] = round(time.perf_counter() - started, 3)
         return n
     finally:
         conn.close()
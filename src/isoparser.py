@@ -3,18 +3,7 @@ import hashlib
 import uuid
 import io
 import re
-
-
-def _tag_name(element):
-    tag = element.tag
-    return tag.split("}")[-1] if isinstance(tag, str) else tag
-
-
-def _text(element):
-    if element is None or element.text is None:
-        return None
-    value = element.text.strip()
-    return value or None
+from bisect import bisect_left
 
 
 def _empty_address():
@@ -45,147 +34,918 @@ def _address_has_core_fields(address):
     return bool(address.get("street") or address.get("city") or address.get("postalCode") or address.get("country"))
 
 
-def _populate_address_from_node(address, node):
-    for child in list(node):
-        child_name = _tag_name(child)
-        child_value = _text(child)
-        lower_name = child_name.lower() if isinstance(child_name, str) else child_name
+_LOCAL_NAMES = {}
+
+
+def _local_name(tag):
+    name = _LOCAL_NAMES.get(tag)
+    if name is None:
+        name = tag.split("}")[-1] if isinstance(tag, str) else tag
+        if len(_LOCAL_NAMES) < 4096:
+            _LOCAL_NAMES[tag] = name
+    return name
+
+
+class _DocumentIndex:
+    """
+    Every element of a message in document order, built in one iterparse pass:
+    local name, stripped text, parent and the end of its subtree, plus the
+    positions of each local name. A subtree is positions [p, ends[p]), so
+    "first/all descendants named X" is a bisect into positions[X] instead of
+    another walk of the tree.
+    """
+
+    __slots__ = ("elements", "names", "texts", "parents", "ends", "positions", "_text_positions")
+
+    def __init__(self, events):
+        elements = []
+        names = []
+        texts = []
+        parents = []
+        ends = []
+        positions = {}
+        stack = []
+        for event, element in events:
+            if event == "start":
+                position = len(elements)
+                name = _local_name(element.tag)
+                elements.append(element)
+                names.append(name)
+                texts.append(None)
+                parents.append(stack[-1] if stack else -1)
+                ends.append(position + 1)
+                found = positions.get(name)
+                if found is None:
+                    positions[name] = [position]
+                else:
+                    found.append(position)
+                stack.append(position)
+            else:
+                position = stack.pop()
+                ends[position] = len(elements)
+                text = element.text
+                if text:
+                    texts[position] = text.strip() or None
+        self.elements = elements
+        self.names = names
+        self.texts = texts
+        self.parents = parents
+        self.ends = ends
+        self.positions = positions
+        self._text_positions = {}
+
+    def _slice(self, found, position):
+        lo = bisect_left(found, position)
+        return found[lo:bisect_left(found, self.ends[position], lo)]
+
+    def within(self, position, name):
+        """Positions named `name` in the subtree of `position`, itself included."""
+        found = self.positions.get(name)
+        return self._slice(found, position) if found else []
+
+    def select(self, position, names):
+        """Positions with any of `names` in the subtree of `position`, in document order."""
+        selected = []
+        for name in names:
+            selected.extend(self.within(position, name))
+        selected.sort()
+        return selected
+
+    def first(self, position, names):
+        best = None
+        end = self.ends[position]
+        for name in names:
+            found = self.positions.get(name)
+            if not found:
+                continue
+            lo = bisect_left(found, position)
+            if lo < len(found) and found[lo] < end and (best is None or found[lo] < best):
+                best = found[lo]
+        return best
+
+    def _with_text(self, name):
+        found = self._text_positions.get(name)
+        if found is None:
+            texts = self.texts
+            found = [p for p in self.positions.get(name, ()) if texts[p]]
+            self._text_positions[name] = found
+        return found
+
+    def first_text(self, position, names):
+        """Text of the first element in the subtree with one of `names` and non-empty text."""
+        best = None
+        end = self.ends[position]
+        for name in names:
+            found = self._with_text(name)
+            lo = bisect_left(found, position)
+            if lo < len(found) and found[lo] < end and (best is None or found[lo] < best):
+                best = found[lo]
+        return None if best is None else self.texts[best]
+
+    def last_text(self, position, name):
+        found = self._with_text(name)
+        hi = bisect_left(found, self.ends[position])
+        if hi and found[hi - 1] >= position:
+            return self.texts[found[hi - 1]]
+        return None
+
+    def children(self, position):
+        ends = self.ends
+        child = position + 1
+        end = ends[position]
+        while child < end:
+            yield child
+            child = ends[child]
+
+    def child_text(self, position, name):
+        """Text of the last direct child named `name` that has text."""
+        value = None
+        for child in self.children(position):
+            if self.names[child] == name and self.texts[child]:
+                value = self.texts[child]
+        return value
+
+
+def _iterparse_events(source: bytes):
+    return ET.iterparse(io.BytesIO(source), events=("start", "end"))
+
+
+def _element_events(root):
+    """The (event, element) pairs iterparse would produce for an already built tree."""
+    stack = [(root, False)]
+    while stack:
+        element, done = stack.pop()
+        if done:
+            yield "end", element
+            continue
+        yield "start", element
+        stack.append((element, True))
+        stack.extend((child, False) for child in reversed(element))
+
+
+def _index_document(iso20022xml: bytes) -> _DocumentIndex:
+    try:
+        return _DocumentIndex(_iterparse_events(iso20022xml))
+    except ET.ParseError:
+        return _DocumentIndex(_iterparse_events(_sanitize_xml(iso20022xml)))
+
+
+def _empty_contact():
+    return {
+        "countryOfResidence": None,
+        "residencyStatus": None,
+        "placeOfBirth": None,
+        "dateOfBirth": None,
+        "provinceOfBirth": None,
+        "cityOfBirth": None,
+        "countryOfBirth": None,
+        "prefix": None,
+        "contactName": None,
+        "phone": None,
+        "mobile": None,
+        "fax": None,
+        "url": None,
+        "email": None,
+        "emailPurpose": None,
+        "jobTitle": None,
+        "responsibility": None,
+        "department": None,
+        "channelType": None,
+        "channelId": None,
+        "preferredMethod": None
+    }
+
+
+_ADDRESS_CHILD_FIELDS = {
+    "Dept": "department", "SubDept": "subDepartment", "StrtNm": "street", "BldgNb": "buildingNumber",
+    "BldgNm": "buildingName", "Flr": "floor", "UnitNb": "unitNumber", "PstBx": "postBox", "Room": "room",
+    "TwnLctnNm": "townLocationName", "DstrctNm": "districtName", "CtrySubDvsn": "state",
+    "Ctry": "country", "CtryCd": "country",
+}
+_ADDRESS_CHILD_FIELDS_LOWER = {"careof": "careOf", "pstcd": "postalCode", "postcd": "postalCode",
+                               "twnnm": "city", "townnm": "city"}
+
+
+def _index_populate_address(ix, address, node, scheme_from_prtry=False):
+    """Fill `address` from the children of `node`. scheme_from_prtry reads AdrTp/Prtry/SchmeNm/Prtry."""
+    names = ix.names
+    texts = ix.texts
+    for child in ix.children(node):
+        child_name = names[child]
+        child_value = texts[child]
         if child_name == "AdrTp":
-            for descendant in child.iter():
-                descendant_name = _tag_name(descendant)
-                descendant_value = _text(descendant)
-                if descendant_name == "Prtry":
-                    for proprietary in list(descendant):
-                        proprietary_name = _tag_name(proprietary)
-                        proprietary_value = _text(proprietary)
-                        if proprietary_name == "Id" and proprietary_value:
-                            address["type"]["id"] = proprietary_value
-                        elif proprietary_name == "Issr" and proprietary_value:
-                            address["type"]["issuer"] = proprietary_value
-                        elif proprietary_name == "SchmeNm" and proprietary_value:
+            for proprietary_node in ix.within(child, "Prtry"):
+                for proprietary in ix.children(proprietary_node):
+                    proprietary_name = names[proprietary]
+                    proprietary_value = texts[proprietary]
+                    if proprietary_name == "Id" and proprietary_value:
+                        address["type"]["id"] = proprietary_value
+                    elif proprietary_name == "Issr" and proprietary_value:
+                        address["type"]["issuer"] = proprietary_value
+                    elif proprietary_name == "SchmeNm":
+                        if scheme_from_prtry:
+                            for scheme in ix.children(proprietary):
+                                if names[scheme] == "Prtry" and texts[scheme]:
+                                    address["type"]["schemeName"] = texts[scheme]
+                        elif proprietary_value:
                             address["type"]["schemeName"] = proprietary_value
-        elif lower_name == "careof" and child_value:
-            address["careOf"] = child_value
-        elif child_name == "Dept" and child_value:
-            address["department"] = child_value
-        elif child_name == "SubDept" and child_value:
-            address["subDepartment"] = child_value
-        elif child_name == "StrtNm" and child_value:
-            address["street"] = child_value
-        elif child_name == "BldgNb" and child_value:
-            address["buildingNumber"] = child_value
-        elif child_name == "BldgNm" and child_value:
-            address["buildingName"] = child_value
-        elif child_name == "Flr" and child_value:
-            address["floor"] = child_value
-        elif child_name == "UnitNb" and child_value:
-            address["unitNumber"] = child_value
-        elif child_name == "PstBx" and child_value:
-            address["postBox"] = child_value
-        elif child_name == "Room" and child_value:
-            address["room"] = child_value
-        elif lower_name in ("pstcd", "postcd") and child_value:
-            address["postalCode"] = child_value
-        elif lower_name in ("twnnm", "townnm") and child_value:
-            address["city"] = child_value
-        elif child_name == "TwnLctnNm" and child_value:
-            address["townLocationName"] = child_value
-        elif child_name == "DstrctNm" and child_value:
-            address["districtName"] = child_value
-        elif child_name == "CtrySubDvsn" and child_value:
-            address["state"] = child_value
-        elif child_name in ("Ctry", "CtryCd") and child_value:
-            address["country"] = child_value
-        elif child_name == "AdrLine" and child_value:
+        elif not child_value:
+            continue
+        elif child_name == "AdrLine":
             address["addressLines"].append(child_value)
+        else:
+            field = _ADDRESS_CHILD_FIELDS.get(child_name) or _ADDRESS_CHILD_FIELDS_LOWER.get(child_name.lower())
+            if field:
+                address[field] = child_value
 
 
-def _extract_address(element):
+def _index_extract_address(ix, position):
     address = _empty_address()
-    descendants = list(element.iter())
-    address_node = None
-
-    for candidate in descendants:
-        candidate_name = _tag_name(candidate)
-        if candidate_name == "PstlAdr":
-            address_node = candidate
-            break
+    address_node = ix.first(position, ("PstlAdr",))
     if address_node is None:
-        for candidate in descendants:
-            candidate_name = _tag_name(candidate)
-            if candidate_name == "Adr":
-                address_node = candidate
-                break
+        address_node = ix.first(position, ("Adr",))
     if address_node is None:
-        for candidate in descendants:
-            candidate_name = _tag_name(candidate)
-            if candidate_name == "Lctn":
-                address_node = candidate
-                break
+        address_node = ix.first(position, ("Lctn",))
 
     if address_node is not None:
-        _populate_address_from_node(address, address_node)
+        _index_populate_address(ix, address, address_node)
         if address["addressLines"] and not address.get("addressLine"):
             address["addressLine"] = address["addressLines"][0]
 
     if not _address_has_core_fields(address):
-        nm_and_adr_node = None
-        for candidate in descendants:
-            if _tag_name(candidate) == "NmAndAdr":
-                nm_and_adr_node = candidate
-                break
+        nm_and_adr_node = ix.first(position, ("NmAndAdr",))
         if nm_and_adr_node is not None:
-            for child in list(nm_and_adr_node):
-                if _tag_name(child) == "Adr":
-                    _populate_address_from_node(address, child)
+            for child in ix.children(nm_and_adr_node):
+                if ix.names[child] == "Adr":
+                    _index_populate_address(ix, address, child)
                     break
             if address["addressLines"] and not address.get("addressLine"):
                 address["addressLine"] = address["addressLines"][0]
 
-    if not _address_has_core_fields(address):
-        direct_address = None
-        for candidate in descendants:
-            if _tag_name(candidate) == "Adr":
-                direct_address = candidate
-                break
-        if direct_address is not None:
-            _populate_address_from_node(address, direct_address)
-            if address["addressLines"] and not address.get("addressLine"):
-                address["addressLine"] = address["addressLines"][0]
-
-    if not _address_has_core_fields(address):
-        location_node = None
-        for candidate in descendants:
-            if _tag_name(candidate) == "Lctn":
-                location_node = candidate
-                break
-        if location_node is not None:
-            _populate_address_from_node(address, location_node)
+    for fallback in ("Adr", "Lctn"):
+        if _address_has_core_fields(address):
+            break
+        node = ix.first(position, (fallback,))
+        if node is not None:
+            _index_populate_address(ix, address, node)
             if address["addressLines"] and not address.get("addressLine"):
                 address["addressLine"] = address["addressLines"][0]
 
     return address
 
 
-def parse(iso20022xml: bytes):
-    try:
-        tree = ET.parse(io.BytesIO(iso20022xml))
-    except ET.ParseError:
-        b = iso20022xml[3:] if iso20022xml.startswith(b'\xef\xbb\xbf') else iso20022xml
-        b = re.sub(rb'[\x00-\x08\x0B\x0C\x0E-\x1F]', b'', b)
-        b = re.sub(rb'&(?!amp;|lt;|gt;|quot;|apos;|#\d+;|#x[0-9A-Fa-f]+;)', b'&amp;', b)
-        tree = ET.parse(io.BytesIO(b))
+CANONICAL_ROLE_MAP = {
+    "MsgRcpt": "messageReceiver",
+    "Svcr": "accountServicer",
+    "RltdPties": "relatedParty",
+    "RltdAgts": "relatedAgent",
+    "RcptPty": "messageReceiver",
+    "InitgPty": "initiatingParty",
+    "Acqrr": "acquirer",
+    "ATMMgr": "atmManager",
+    "HstgNtty": "hostingEntity",
+    "ATM": "atm",
+    "Dbtr": "debtor",
+    "Cdtr": "creditor",
+    "DbtrAgt": "debtorAgent",
+    "CdtrAgt": "creditorAgent",
+    "UltmtDbtr": "ultimateDebtor",
+    "UltmtCdtr": "ultimateCreditor",
+    "InstgAgt": "instructingAgent",
+    "InstdAgt": "instructedAgent",
+    "IntrmyAgt1": "intermediaryAgent",
+    "IntrmyAgt2": "intermediaryAgent",
+    "IntrmyAgt3": "intermediaryAgent",
+    "Bnfcry": "beneficiary",
+    "BnfcryDtls": "beneficiary",
+    "OrgnlRcvr": "originalReceiver",
+    "AcctOwnr": "accountOwner",
+    "Ownr": "accountOwner",
+    "PmryOwnr": "accountOwner",
+    "ScndryOwnr": "accountOwner",
+    "PrncplAcctPty": "accountOwner",
+    "OwnrId": "accountOwner",
+    "AcctSvcr": "accountServicer",
+    "SttlmPlc": "settlementPlace",
+    "SfkpgPlc": "safekeepingPlace",
+    "RcvgAgt": "receivingAgent",
+    "RcvgAgtDtls": "receivingAgent",
+    "RcvgSd": "receivingAgent",
+    "RcvgSdDtls": "receivingAgent",
+    "DlvrgAgt": "deliveringAgent",
+    "DlvrgAgtDtls": "deliveringAgent",
+    "DlvrgSd": "deliveringAgent",
+    "DlvrgSdDtls": "deliveringAgent",
+    "Dpstry": "depository",
+    "Ctdn": "custodian",
+    "Custodian": "custodian",
+    "Brkr": "broker",
+    "ClrMmb": "clearingMember",
+    "CCP": "centralCounterparty",
+    "Regar": "registrar",
+    "TrfAgt": "transferAgent",
+    "Issr": "issuer",
+    "PngAgt": "payingAgent",
+    "WhldgAgt": "withholdingAgent",
+    "TaxAgt": "taxAgent",
+    "InfAgt": "informationAgent",
+    "TndrAgt": "tenderAgent",
+    "XchgAgt": "exchangeAgent",
+    "CltrlTkr": "collateralTaker",
+    "CltrlGv": "collateralGiver",
+    "TrptyAgt": "tripartyAgent",
+    "Crdhldr": "cardholder",
+    "CardHldr": "cardholder",
+    "Mrchnt": "merchant",
+    "Accptr": "merchant",
+    "AccptrAgt": "acceptorAgent",
+    "POI": "pointOfInteraction",
+    "PointOfInteraction": "pointOfInteraction",
+    "TermnlMgrId": "pointOfInteraction",
+    "IssrBk": "issuerBank",
+    "CardSchme": "cardScheme",
+    "ATMOp": "atmOperator",
+    "ATMOpr": "atmOperator",
+    "Buyr": "buyer",
+    "Sellr": "seller",
+    "BuyrCsdn": "buyerCustodian",
+    "SellrCsdn": "sellerCustodian",
+    "BuyrBkr": "buyerBroker",
+    "SellrBkr": "sellerBroker",
+    "BuyrBk": "buyerBank",
+    "SellrBk": "sellerBank",
+    "BuyrAgt": "buyerAgent",
+    "SellrAgt": "sellerAgent",
+    "FXSttlmAgt": "fxSettlementAgent",
+    "MsgSndr": "messageSender",
+    "Sndr": "messageSender",
+    "Fr": "messageSender",
+    "MsgRcvr": "messageReceiver",
+    "Rcvr": "messageReceiver",
+    "To": "messageReceiver",
+    "Rqstr": "requestor",
+    "Rspndr": "responder",
+    "Authrty": "authority",
+    "MandateHldr": "mandateHolder",
+    "MndtHldr": "mandateHolder",
+    "Prxy": "mandateHolder",
+    "BkCtct": "bankContact",
+    "RptgPty": "reportingParty",
+    "InstgPty": "instructingParty",
+    "InstdPty": "instructedParty",
+    "Initr": "initiator",
+    "AgtId": "agent",
+    "Pty": "party"
+}
+
+
+def _sanitize_xml(iso20022xml: bytes) -> bytes:
+    b = iso20022xml[3:] if iso20022xml.startswith(b'\xef\xbb\xbf') else iso20022xml
+    b = re.sub(rb'[\x00-\x08\x0B\x0C\x0E-\x1F]', b'', b)
+    b = re.sub(rb'&(?!amp;|lt;|gt;|quot;|apos;|#\d+;|#x[0-9A-Fa-f]+;)', b'&amp;', b)
+    return b
+
+
+def _is_currency_role(role):
+    return isinstance(role, str) and (role == "Ccy" or role.endswith("Ccy"))
+
+
+_PARTY_LIKE_TAGS = ("Nm", "PstlAdr", "Adr", "NmAndAdr", "OrgId", "PrvtId", "Id", "FinInstnId", "BICFI", "AnyBIC",
+                    "LEI", "IBAN", "Lctn", "PrtryId")
+_UNMAPPED_TRIGGER_TAGS = ("Nm", "Adr", "PstlAdr", "NmAndAdr", "Lctn")
+_UNMAPPED_ADDRESS_BITS = ("AdrLine", "StrtNm", "BldgNb", "TwnNm", "TownNm", "PstCd", "PostCd", "Ctry", "CtryCd")
+_ACCOUNT_ROLE_TO_PARTY_ROLE = {
+    "DbtrAcct": "debtor",
+    "CdtrAcct": "creditor",
+    "UltmtDbtrAcct": "ultimateDebtor",
+    "UltmtCdtrAcct": "ultimateCreditor"
+}
+_SAFEGUARD_ADDRESS_FIELDS = {
+    "StrtNm": "street", "BldgNb": "buildingNumber", "TwnNm": "city", "TownNm": "city", "PstCd": "postalCode",
+    "PostCd": "postalCode", "CtrySubDvsn": "state", "Ctry": "country", "CtryCd": "country",
+}
+_TRANSACTION_TAGS = ("ReqdExctnDt", "IntrBkSttlmDt", "SttlmDt", "CshSttlmDt", "ReqdFutrTradDt", "OrdrDtTm",
+                     "PlcOfTrad", "PoolRef", "PrvsRef", "MstrRef", "MstrId", "CpyDtls", "TtlSttlmAmt", "Xtnsn")
+_ORDER_TAGS = ("OrdrRef", "ClntRef", "UnitsNb", "SttlmAmt", "CshSttlmDt", "ReqdExctnDt", "SttlmDt", "FinInstrmDtls",
+               "DbtrAcct", "CdtrAcct", "DbtrAgt", "CdtrAgt")
+_PAYMENT_TAGS = ("PmtId", "InstdAmt", "IntrBkSttlmAmt", "Amt", "PmtTpInf", "ChrgBr", "Purp", "RmtInf", "ReqTp")
+
+
+def _header_party(role, name, bic):
+    return {
+        "role": role,
+        "name": name,
+        "aliases": None,
+        "address": _empty_address(),
+        "contact": _empty_contact(),
+        "account": {"iban": None, "other": None, "others": [], "bic": bic, "currency": None, "name": None,
+                    "accountId": None},
+        "identifiers": {"id": None, "anyBIC": bic, "lei": None, "other": []},
+        "financialInstitution": {"bic": bic, "lei": None, "clearingSystemId": None, "clearingMemberId": None,
+                                 "other": [], "branch": None}
+    }
 
-    root_element = tree.getroot()
-    ingest_hash = "sha256:" + hashlib.sha256(iso20022xml or b"").hexdigest()
-    root_tag_name = root_element.tag.split("}")[-1] if isinstance(root_element.tag, str) else root_element.tag
-    parent_map = {c: p for p in root_element.iter() for c in p}
 
-    application_header_element = None
-    for element in root_element.iter():
-        if (element.tag.split("}")[-1] if isinstance(element.tag, str) else element.tag) == "AppHdr":
-            application_header_element = element
+def _index_prtry_id(ix, position):
+    id_text = scheme_text = issuer_text = None
+    for child in ix.children(position):
+        name = ix.names[child]
+        text = ix.texts[child]
+        if name == "Id" and text:
+            id_text = text
+        elif name == "SchmeNm" and text:
+            scheme_text = text
+        elif name == "Issr" and text:
+            issuer_text = text
+    return id_text, scheme_text, issuer_text
+
+
+def _index_role_party(ix, position, canonical_role):
+    names = ix.names
+    texts = ix.texts
+
+    name_value = ix.first_text(position, ("Nm",))
+    if name_value is None:
+        name_value = ix.first_text(position, ("Id", "AcqrgInstn", "AddtlId", "ShrtNm", "ShortName"))
+
+    alias_values = []
+    for alias in ix.select(position, ("Alia", "Alias")):
+        alias_name_child = next((c for c in ix.children(alias) if names[c] == "Nm"), None)
+        if alias_name_child is not None and texts[alias_name_child]:
+            alias_values.append(texts[alias_name_child])
+        elif texts[alias]:
+            alias_values.append(texts[alias])
+    alias_values = alias_values or None
+
+    address = _index_extract_address(ix, position)
+
+    identifiers = {"id": None, "anyBIC": None, "lei": None, "other": []}
+    for child in ix.children(position):
+        if names[child] == "Id" and texts[child]:
+            identifiers["id"] = texts[child]
             break
+    for org in ix.within(position, "OrgId"):
+        for sub in ix.select(org, ("AnyBIC", "LEI", "Othr")):
+            sub_name = names[sub]
+            if sub_name == "AnyBIC":
+                if texts[sub]:
+                    identifiers["anyBIC"] = texts[sub]
+            elif sub_name == "LEI":
+                if texts[sub]:
+                    identifiers["lei"] = texts[sub]
+            else:
+                id_text = scheme_text = issuer_text = None
+                for x in ix.children(sub):
+                    if names[x] == "Id" and texts[x]:
+                        id_text = texts[x]
+                    elif names[x] == "SchmeNm":
+                        scheme_text = ix.child_text(x, "Prtry") or scheme_text
+                    elif names[x] == "Issr" and texts[x]:
+                        issuer_text = texts[x]
+                if id_text or scheme_text or issuer_text:
+                    identifiers["other"].append({"id": id_text, "scheme": scheme_text, "issuer": issuer_text})
+    if identifiers.get("lei") is None:
+        lei_value = ix.first_text(position, ("LEI",))
+        if lei_value:
+            identifiers["lei"] = lei_value
+
+    contact = _empty_contact()
+    for e in ix.select(position, ("CtryOfRes", "CountryOfResidence", "CtryAndResdtlSts", "BirthDt", "DtAndPlcOfBirth",
+                                  "CtctDtls", "PhneNb", "EmailAdr", "Dept")):
+        en = names[e]
+        text = texts[e]
+        if en in ("CtryOfRes", "CountryOfResidence"):
+            if text and not contact["countryOfResidence"]:
+                contact["countryOfResidence"] = text
+        elif en == "CtryAndResdtlSts":
+            for c in ix.children(e):
+                if names[c] == "Ctry" and texts[c]:
+                    contact["countryOfResidence"] = texts[c]
+                elif names[c] == "ResdtlSts" and texts[c]:
+                    contact["residencyStatus"] = texts[c]
+        elif en == "BirthDt":
+            if text and not contact["dateOfBirth"]:
+                contact["dateOfBirth"] = text
+        elif en == "DtAndPlcOfBirth":
+            for c in ix.children(e):
+                cn = names[c]
+                ct = texts[c]
+                if not ct:
+                    continue
+                if cn == "BirthDt":
+                    contact["dateOfBirth"] = ct
+                elif cn == "PrvcOfBirth":
+                    contact["provinceOfBirth"] = ct
+                elif cn == "CityOfBirth":
+                    contact["cityOfBirth"] = ct
+                elif cn == "CtryOfBirth":
+                    contact["countryOfBirth"] = ct
+                elif cn == "City" and not contact["placeOfBirth"]:
+                    contact["placeOfBirth"] = ct
+        elif en == "CtctDtls":
+            for c in ix.children(e):
+                cn = names[c]
+                ct = texts[c]
+                if cn == "Othr":
+                    channel_type = ix.child_text(c, "ChanlTp")
+                    channel_id = ix.child_text(c, "Id")
+                    if channel_type:
+                        contact["channelType"] = channel_type
+                    if channel_id:
+                        contact["channelId"] = channel_id
+                elif ct and cn in _CONTACT_DETAIL_FIELDS:
+                    contact[_CONTACT_DETAIL_FIELDS[cn]] = ct
+        elif en == "PhneNb":
+            if text and not contact["phone"]:
+                contact["phone"] = text
+        elif en == "EmailAdr":
+            if text and not contact["email"]:
+                contact["email"] = text
+        elif en == "Dept":
+            if text and not contact["department"]:
+                contact["department"] = text
+
+    iban_value = None
+    other_account_value = None
+    other_accounts = []
+    account_currency_value = None
+    account_id_value = None
+    for e in ix.select(position, ("IBAN", "Othr", "Ccy", "AcctId", "SfkpgAcct")):
+        en = names[e]
+        text = texts[e]
+        if en == "IBAN":
+            if text and not iban_value:
+                iban_value = text
+        elif en == "Othr":
+            id_text = scheme_text = issuer_text = None
+            for c in ix.children(e):
+                cn = names[c]
+                if cn == "Id" and texts[c]:
+                    id_text = texts[c]
+                elif cn == "SchmeNm":
+                    scheme_text = ix.child_text(c, "Prtry") or scheme_text
+                elif cn == "Issr" and texts[c]:
+                    issuer_text = texts[c]
+            if id_text:
+                if not other_account_value:
+                    other_account_value = id_text
+                other_accounts.append({"id": id_text, "scheme": scheme_text, "issuer": issuer_text})
+            elif text and not other_account_value:
+                other_account_value = text
+        elif en == "Ccy":
+            if text and not account_currency_value:
+                account_currency_value = text
+        elif en == "AcctId":
+            nested_value = ix.child_text(e, "Id")
+            if nested_value or text:
+                account_id_value = nested_value or text
+        else:
+            account_id_value = ix.last_text(e, "Id") or account_id_value
+
+    bic_value = None
+    financial_institution_other = []
+    financial_institution_lei = None
+    clearing_system_id = None
+    clearing_member_id = None
+    branch_object = None
+    any_bic_value = None
+    prtry_id_value = None
+    for e in ix.select(position, ("BICFI", "AnyBIC", "PrtryId", "FinInstnId", "BrnchId")):
+        en = names[e]
+        text = texts[e]
+        if en == "BICFI":
+            if text:
+                bic_value = text
+        elif en == "AnyBIC":
+            if text:
+                any_bic_value = text
+        elif en == "PrtryId":
+            id_text, scheme_text, _ = _index_prtry_id(ix, e)
+            prtry_id_value = id_text or prtry_id_value
+            if id_text or scheme_text:
+                financial_institution_other.append({"id": id_text, "scheme": scheme_text})
+        elif en == "FinInstnId":
+            for sub in ix.children(e):
+                sn = names[sub]
+                st = texts[sub]
+                if sn == "BICFI" and st:
+                    bic_value = st
+                elif sn == "AnyBIC" and st:
+                    any_bic_value = st
+                elif sn == "LEI" and st:
+                    financial_institution_lei = st
+                elif sn == "ClrSysMmbId":
+                    for y in ix.children(sub):
+                        if names[y] == "ClrSysId":
+                            clearing_system_id = ix.child_text(y, "Cd") or clearing_system_id
+                        elif names[y] == "MmbId" and texts[y]:
+                            clearing_member_id = texts[y]
+                elif sn == "Othr":
+                    id_text = scheme_text = None
+                    for y in ix.children(sub):
+                        if names[y] == "Id" and texts[y]:
+                            id_text = texts[y]
+                        elif names[y] == "SchmeNm":
+                            scheme_text = ix.child_text(y, "Prtry") or scheme_text
+                    if id_text or scheme_text:
+                        financial_institution_other.append({"id": id_text, "scheme": scheme_text})
+        else:
+            b_id = b_lei = b_name = None
+            b_address = {}
+            for sub in ix.children(e):
+                sn = names[sub]
+                st = texts[sub]
+                if sn == "Id" and st:
+                    b_id = st
+                elif sn == "LEI" and st:
+                    b_lei = st
+                elif sn == "Nm" and st:
+                    b_name = st
+                elif sn == "PstlAdr":
+                    ba = {
+                        "street": None,
+                        "buildingNumber": None,
+                        "postalCode": None,
+                        "city": None,
+                        "state": None,
+                        "country": None,
+                        "addressLine": None,
+                        "addressLines": []
+                    }
+                    for q in ix.children(sub):
+                        qn = names[q]
+                        qt = texts[q]
+                        if not qt:
+                            continue
+                        if qn == "AdrLine":
+                            ba["addressLines"].append(qt)
+                        elif qn in _BRANCH_ADDRESS_FIELDS:
+                            ba[_BRANCH_ADDRESS_FIELDS[qn]] = qt
+                    if ba["addressLines"] and not ba.get("addressLine"):
+                        ba["addressLine"] = ba["addressLines"][0]
+                    b_address = ba
+            branch_object = {"id": b_id, "lei": b_lei, "name": b_name, "address": b_address}
+
+    if bic_value is None and any_bic_value:
+        bic_value = any_bic_value
+    if name_value is None and bic_value:
+        name_value = bic_value
+    if name_value is None and prtry_id_value:
+        name_value = prtry_id_value
+
+    names_acc = []
+    for e in ix.within(position, "Nm"):
+        if texts[e] and texts[e] not in names_acc:
+            names_acc.append(texts[e])
+
+    addresses_acc = []
+    for e in ix.select(position, ("PstlAdr", "Adr")):
+        addr_obj = _empty_address()
+        _index_populate_address(ix, addr_obj, e, scheme_from_prtry=True)
+        if addr_obj["addressLines"] and not addr_obj.get("addressLine"):
+            addr_obj["addressLine"] = addr_obj["addressLines"][0]
+        if any(v for k, v in addr_obj.items() if k != "type") or any(v for v in addr_obj["type"].values()) or addr_obj["addressLines"]:
+            addresses_acc.append(addr_obj)
+
+    if not name_value and names_acc:
+        name_value = names_acc[0]
+    if not (address.get("street") or address.get("city") or address.get("postalCode") or address.get("country") or address.get("addressLines")) and addresses_acc:
+        address = addresses_acc[0]
+
+    return {
+        "role": canonical_role,
+        "name": name_value,
+        "names": names_acc or None,
+        "aliases": alias_values,
+        "address": address,
+        "addresses": addresses_acc or None,
+        "contact": contact,
+        "account": {
+            "iban": iban_value,
+            "other": other_account_value,
+            "others": other_accounts,
+            "bic": bic_value,
+            "currency": account_currency_value,
+            "name": None,
+            "accountId": account_id_value
+        },
+        "identifiers": identifiers,
+        "financialInstitution": {
+            "bic": bic_value,
+            "lei": financial_institution_lei,
+            "clearingSystemId": clearing_system_id,
+            "clearingMemberId": clearing_member_id,
+            "other": financial_institution_other,
+            "branch": branch_object
+        }
+    }
+
+
+_CONTACT_DETAIL_FIELDS = {
+    "NmPrfx": "prefix", "Nm": "contactName", "PhneNb": "phone", "MobNb": "mobile", "FaxNb": "fax", "URLAdr": "url",
+    "EmailAdr": "email", "EmailPurp": "emailPurpose", "JobTitl": "jobTitle", "Rspnsblty": "responsibility",
+    "Dept": "department", "PrefrdMtd": "preferredMethod",
+}
+_BRANCH_ADDRESS_FIELDS = {
+    "StrtNm": "street", "BldgNb": "buildingNumber", "PstCd": "postalCode", "PostCd": "postalCode", "TwnNm": "city",
+    "TownNm": "city", "CtrySubDvsn": "state", "Ctry": "country", "CtryCd": "country",
+}
+
+
+def _index_unmapped_parties(ix, document_position, seen):
+    names = ix.names
+    texts = ix.texts
+    parties_local = []
+    for trigger in ix.select(document_position, _UNMAPPED_TRIGGER_TAGS):
+        if trigger == document_position:
+            continue
+        parent = ix.parents[trigger]
+        parent_local = names[parent]
+        if not parent_local or parent_local in ("Document", "AppHdr"):
+            continue
+        if parent_local in CANONICAL_ROLE_MAP or parent in seen:
+            continue
+
+        trig_local = names[trigger]
+        name_value = None
+        if trig_local == "Nm" and texts[trigger]:
+            name_value = texts[trigger]
+        else:
+            for child in ix.children(parent):
+                if names[child] == "Nm" and texts[child]:
+                    name_value = texts[child]
+                    break
+        if name_value is None and trig_local != "Nm":
+            addr_bits = [texts[c] for c in ix.children(trigger) if names[c] in _UNMAPPED_ADDRESS_BITS and texts[c]]
+            if addr_bits:
+                name_value = " ".join(addr_bits)[:256]
+        if name_value is None:
+            continue
+
+        identifiers = {"id": None, "anyBIC": None, "lei": None, "other": []}
+        bic_value = None
+        financial_institution_other = []
+        for e in ix.select(parent, ("BICFI", "AnyBIC", "LEI", "Id", "PrtryId")):
+            en = names[e]
+            text = texts[e]
+            if en == "PrtryId":
+                id_text, scheme_text, _ = _index_prtry_id(ix, e)
+                if id_text or scheme_text:
+                    financial_institution_other.append({"id": id_text, "scheme": scheme_text})
+            elif not text:
+                continue
+            elif en == "BICFI":
+                bic_value = text
+            elif en == "AnyBIC":
+                if not identifiers["anyBIC"]:
+                    identifiers["anyBIC"] = text
+            elif en == "LEI":
+                identifiers["lei"] = text
+            elif identifiers["id"] is None:
+                identifiers["id"] = text
+
+        parties_local.append({
+            "role": parent_local,
+            "name": name_value,
+            "aliases": None,
+            "address": _index_extract_address(ix, parent),
+            "contact": _empty_contact(),
+            "account": {"iban": None, "other": None, "others": [], "bic": bic_value, "currency": None, "name": None,
+                        "accountId": None},
+            "identifiers": identifiers,
+            "financialInstitution": {"bic": bic_value, "lei": None, "clearingSystemId": None,
+                                     "clearingMemberId": None, "other": financial_institution_other, "branch": None}
+        })
+        seen.add(parent)
+    return parties_local
+
+
+def _index_account(ix, position):
+    """(iban, other, others, currency, name, accountId) from the first DbtrAcct/CdtrAcct-style node."""
+    names = ix.names
+    texts = ix.texts
+    iban_text = other_text = currency_text = display_name_text = account_id_text = None
+    others_list = []
+    for e in ix.select(position, ("IBAN", "Othr", "Ccy", "Nm", "AcctId", "SfkpgAcct")):
+        n = names[e]
+        text = texts[e]
+        if n == "Othr":
+            id_val = scheme_val = issuer_val = None
+            for sub in ix.children(e):
+                sn = names[sub]
+                if sn == "Id" and texts[sub]:
+                    id_val = texts[sub]
+                elif sn == "SchmeNm":
+                    scheme_val = ix.child_text(sub, "Prtry") or scheme_val
+                elif sn == "Issr" and texts[sub]:
+                    issuer_val = texts[sub]
+            if id_val:
+                if other_text is None:
+                    other_text = id_val
+                others_list.append({"id": id_val, "scheme": scheme_val, "issuer": issuer_val})
+        elif n == "AcctId":
+            account_id_text = ix.child_text(e, "Id") or account_id_text
+            if text and not account_id_text:
+                account_id_text = text
+        elif n == "SfkpgAcct":
+            account_id_text = ix.last_text(e, "Id") or account_id_text
+        elif not text:
+            continue
+        elif n == "IBAN":
+            iban_text = text
+        elif n == "Ccy":
+            currency_text = text
+        else:
+            display_name_text = text
+    return iban_text, other_text, others_list, currency_text, display_name_text, account_id_text
+
+
+def _index_safeguard_party(ix, position, name_value):
+    names = ix.names
+    texts = ix.texts
+    address_obj = _empty_address()
+    pstl_adr_node = ix.first(position, ("PstlAdr",))
+    if pstl_adr_node is not None:
+        # `PstlAdr or Adr` on elements: an empty PstlAdr element is falsy, so Adr wins.
+        adr_node = pstl_adr_node if ix.ends[pstl_adr_node] > pstl_adr_node + 1 else None
+    else:
+        adr_node = ix.first(position, ("Adr",))
+    if adr_node is not None:
+        for c in ix.children(adr_node):
+            cn = names[c]
+            ct = texts[c]
+            if cn == "AdrTp":
+                for prtry in ix.within(c, "Prtry"):
+                    for q in ix.children(prtry):
+                        qn = names[q]
+                        if not texts[q]:
+                            continue
+                        if qn == "Id":
+                            address_obj["type"]["id"] = texts[q]
+                        elif qn == "Issr":
+                            address_obj["type"]["issuer"] = texts[q]
+                        elif qn == "SchmeNm":
+                            address_obj["type"]["schemeName"] = texts[q]
+            elif not ct:
+                continue
+            elif cn == "AdrLine":
+                address_obj["addressLines"].append(ct)
+            elif cn in _SAFEGUARD_ADDRESS_FIELDS:
+                address_obj[_SAFEGUARD_ADDRESS_FIELDS[cn]] = ct
+        if address_obj["addressLines"] and not address_obj.get("addressLine"):
+            address_obj["addressLine"] = address_obj["addressLines"][0]
+
+    alias_values = []
+    for e in ix.select(position, ("Alia", "Alias")):
+        if texts[e]:
+            alias_values.append(texts[e])
+        else:
+            for c in ix.children(e):
+                if names[c] == "Nm" and texts[c]:
+                    alias_values.append(texts[c])
+                    break
+
+    return {
+        "role": "party",
+        "name": name_value,
+        "names": [name_value] if name_value else None,
+        "aliases": alias_values or None,
+        "address": address_obj,
+        "addresses": [address_obj],
+        "contact": _empty_contact(),
+        "account": {"iban": None, "other": None, "others": [], "bic": None, "currency": None, "name": None, "accountId": None},
+        "identifiers": {"id": None, "anyBIC": None, "lei": None, "other": []},
+        "financialInstitution": {"bic": None, "lei": None, "clearingSystemId": None, "clearingMemberId": None, "other": [], "branch": None}
+    }
+
+
+def parse(iso20022xml: bytes):
+    """
+    Parse an ISO 20022 message into the `parsed` structure used by buildbase()
+    and returnitems(). One iterparse pass builds a _DocumentIndex; each section
+    then visits only the elements whose local names it dispatches on.
+    data/iso/expected holds the output for every sample message.
+    """
+    ingest_hash = "sha256:" + hashlib.sha256(iso20022xml or b"").hexdigest()
+    return _parse_index(_index_document(iso20022xml), ingest_hash)
+
+
+def parse_element(element, ingest_hash=None):
+    """
+    parse() for an element that is already in memory, e.g. one transaction
+    cut out of a bulk file by the streaming screener. The element is treated
+    as the document root.
+    """
+    return _parse_index(_DocumentIndex(_element_events(element)), ingest_hash)
+
+
+def _parse_index(ix: _DocumentIndex, ingest_hash):
+    names = ix.names
+    texts = ix.texts
+    elements = ix.elements
+    ends = ix.ends
+    parents = ix.parents
+    root_element = elements[0]
 
     application_header = {
         "bizMsgId": None,
@@ -197,51 +957,25 @@ def parse(iso20022xml: bytes):
         "toName": None,
         "bizSvc": None
     }
-
-    if application_header_element is not None:
-        for element in application_header_element.iter():
-            tag_name = element.tag.split("}")[-1] if isinstance(element.tag, str) else element.tag
-            if tag_name == "BizMsgIdr" and element.text and element.text.strip():
-                application_header["bizMsgId"] = element.text.strip()
-            elif tag_name == "MsgDefIdr" and element.text and element.text.strip():
-                application_header["msgDefId"] = element.text.strip()
-            elif tag_name == "CreDt" and element.text and element.text.strip():
-                application_header["created"] = element.text.strip()
-            elif tag_name == "BizSvc" and element.text and element.text.strip():
-                application_header["bizSvc"] = element.text.strip()
-
+    header = ix.first(0, ("AppHdr",))
+    if header is not None:
+        for tag_name, key in (("BizMsgIdr", "bizMsgId"), ("MsgDefIdr", "msgDefId"), ("CreDt", "created"), ("BizSvc", "bizSvc")):
+            value = ix.last_text(header, tag_name)
+            if value:
+                application_header[key] = value
         from_container = None
         to_container = None
-        for child in application_header_element:
-            child_name = child.tag.split("}")[-1] if isinstance(child.tag, str) else child.tag
-            if child_name in ("Fr", "From"):
+        for child in ix.children(header):
+            if names[child] in ("Fr", "From"):
                 from_container = child
-            elif child_name in ("To", "Receiver", "ToWhom"):
+            elif names[child] in ("To", "Receiver", "ToWhom"):
                 to_container = child
-
         if from_container is not None:
-            bic_value = None
-            name_value = None
-            for e in from_container.iter():
-                n = e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag
-                if n == "BICFI" and e.text and e.text.strip():
-                    bic_value = e.text.strip()
-                elif n == "Nm" and e.text and e.text.strip():
-                    name_value = e.text.strip()
-            application_header["fromBIC"] = bic_value
-            application_header["fromName"] = name_value
-
+            application_header["fromBIC"] = ix.last_text(from_container, "BICFI")
+            application_header["fromName"] = ix.last_text(from_container, "Nm")
         if to_container is not None:
-            bic_value = None
-            name_value = None
-            for e in to_container.iter():
-                n = e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag
-                if n == "BICFI" and e.text and e.text.strip():
-                    bic_value = e.text.strip()
-                elif n == "Nm" and e.text and e.text.strip():
-                    name_value = e.text.strip()
-            application_header["toBIC"] = bic_value
-            application_header["toName"] = name_value
+            application_header["toBIC"] = ix.last_text(to_container, "BICFI")
+            application_header["toName"] = ix.last_text(to_container, "Nm")
 
     if not application_header.get("msgDefId"):
         if isinstance(root_element.tag, str) and "}" in root_element.tag:
@@ -249,1081 +983,81 @@ def parse(iso20022xml: bytes):
             if namespace_uri and ":" in namespace_uri:
                 application_header["msgDefId"] = namespace_uri.rsplit(":", 1)[-1]
 
-    document_element = None
-    for element in root_element.iter():
-        if (element.tag.split("}")[-1] if isinstance(element.tag, str) else element.tag) == "Document":
-            document_element = element
-            break
-    if document_element is None:
-        document_element = root_element
+    document = ix.first(0, ("Document",))
+    if document is None:
+        document = 0
+    document_element = elements[document]
 
-    group_header_element = None
+    group_header = {"msgId": None, "creDtTm": None, "nbOfTxs": None}
+    group_header_node = None
     for candidate_name in ("GrpHdr", "MsgHdr", "Hdr"):
-        for element in document_element.iter():
-            if (element.tag.split("}")[-1] if isinstance(element.tag, str) else element.tag) == candidate_name:
-                group_header_element = element
-                break
-        if group_header_element is not None:
+        group_header_node = ix.first(document, (candidate_name,))
+        if group_header_node is not None:
             break
-
-    group_header = {"msgId": None, "creDtTm": None, "nbOfTxs": None}
-    if group_header_element is not None:
-        for element in group_header_element.iter():
-            tag_name = element.tag.split("}")[-1] if isinstance(element.tag, str) else element.tag
-            if tag_name == "MsgId" and element.text and element.text.strip():
-                group_header["msgId"] = element.text.strip()
-            elif tag_name == "CreDtTm" and element.text and element.text.strip():
-                group_header["creDtTm"] = element.text.strip()
-            elif tag_name == "NbOfTxs" and element.text and element.text.strip():
-                group_header["nbOfTxs"] = element.text.strip()
+    if group_header_node is not None:
+        for tag_name, key in (("MsgId", "msgId"), ("CreDtTm", "creDtTm"), ("NbOfTxs", "nbOfTxs")):
+            value = ix.last_text(group_header_node, tag_name)
+            if value:
+                group_header[key] = value
     else:
-        msg_id_block = None
-        for element in document_element.iter():
-            if (element.tag.split("}")[-1] if isinstance(element.tag, str) else element.tag) == "MsgId":
-                msg_id_block = element
-                break
+        msg_id_block = ix.first(document, ("MsgId",))
         if msg_id_block is not None:
-            for e in msg_id_block:
-                en = e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag
-                if en == "Id" and e.text and e.text.strip():
-                    group_header["msgId"] = e.text.strip()
-                elif en == "CreDtTm" and e.text and e.text.strip():
-                    group_header["creDtTm"] = e.text.strip()
-
-    canonical_role_map = {
-        "MsgRcpt": "messageReceiver",
-        "Svcr": "accountServicer",
-        "RltdPties": "relatedParty",
-        "RltdAgts": "relatedAgent",
-        "RcptPty": "messageReceiver",
-        "InitgPty": "initiatingParty",
-        "Acqrr": "acquirer",
-        "ATMMgr": "atmManager",
-        "HstgNtty": "hostingEntity",
-        "ATM": "atm",
-        "Dbtr": "debtor",
-        "Cdtr": "creditor",
-        "DbtrAgt": "debtorAgent",
-        "CdtrAgt": "creditorAgent",
-        "UltmtDbtr": "ultimateDebtor",
-        "UltmtCdtr": "ultimateCreditor",
-        "InstgAgt": "instructingAgent",
-        "InstdAgt": "instructedAgent",
-        "IntrmyAgt1": "intermediaryAgent",
-        "IntrmyAgt2": "intermediaryAgent",
-        "IntrmyAgt3": "intermediaryAgent",
-        "Bnfcry": "beneficiary",
-        "BnfcryDtls": "beneficiary",
-        "OrgnlRcvr": "originalReceiver",
-        "AcctOwnr": "accountOwner",
-        "Ownr": "accountOwner",
-        "PmryOwnr": "accountOwner",
-        "ScndryOwnr": "accountOwner",
-        "PrncplAcctPty": "accountOwner",
-        "OwnrId": "accountOwner",
-        "AcctSvcr": "accountServicer",
-        "SttlmPlc": "settlementPlace",
-        "SfkpgPlc": "safekeepingPlace",
-        "RcvgAgt": "receivingAgent",
-        "RcvgAgtDtls": "receivingAgent",
-        "RcvgSd": "receivingAgent",
-        "RcvgSdDtls": "receivingAgent",
-        "DlvrgAgt": "deliveringAgent",
-        "DlvrgAgtDtls": "deliveringAgent",
-        "DlvrgSd": "deliveringAgent",
-        "DlvrgSdDtls": "deliveringAgent",
-        "Dpstry": "depository",
-        "Ctdn": "custodian",
-        "Custodian": "custodian",
-        "Brkr": "broker",
-        "ClrMmb": "clearingMember",
-        "CCP": "centralCounterparty",
-        "Regar": "registrar",
-        "TrfAgt": "transferAgent",
-        "Issr": "issuer",
-        "PngAgt": "payingAgent",
-        "WhldgAgt": "withholdingAgent",
-        "TaxAgt": "taxAgent",
-        "InfAgt": "informationAgent",
-        "TndrAgt": "tenderAgent",
-        "XchgAgt": "exchangeAgent",
-        "CltrlTkr": "collateralTaker",
-        "CltrlGv": "collateralGiver",
-        "TrptyAgt": "tripartyAgent",
-        "Crdhldr": "cardholder",
-        "CardHldr": "cardholder",
-        "Mrchnt": "merchant",
-        "Accptr": "merchant",
-        "AccptrAgt": "acceptorAgent",
-        "POI": "pointOfInteraction",
-        "PointOfInteraction": "pointOfInteraction",
-        "TermnlMgrId": "pointOfInteraction",
-        "IssrBk": "issuerBank",
-        "CardSchme": "cardScheme",
-        "ATMOp": "atmOperator",
-        "ATMOpr": "atmOperator",
-        "Buyr": "buyer",
-        "Sellr": "seller",
-        "BuyrCsdn": "buyerCustodian",
-        "SellrCsdn": "sellerCustodian",
-        "BuyrBkr": "buyerBroker",
-        "SellrBkr": "sellerBroker",
-        "BuyrBk": "buyerBank",
-        "SellrBk": "sellerBank",
-        "BuyrAgt": "buyerAgent",
-        "SellrAgt": "sellerAgent",
-        "FXSttlmAgt": "fxSettlementAgent",
-        "MsgSndr": "messageSender",
-        "Sndr": "messageSender",
-        "Fr": "messageSender",
-        "MsgRcvr": "messageReceiver",
-        "Rcvr": "messageReceiver",
-        "To": "messageReceiver",
-        "Rqstr": "requestor",
-        "Rspndr": "responder",
-        "Authrty": "authority",
-        "MandateHldr": "mandateHolder",
-        "MndtHldr": "mandateHolder",
-        "Prxy": "mandateHolder",
-        "BkCtct": "bankContact",
-        "RptgPty": "reportingParty",
-        "InstgPty": "instructingParty",
-        "InstdPty": "instructedParty",
-        "Initr": "initiator",
-        "AgtId": "agent",
-        "Pty": "party"
-    }
-
-    def _detect_unmapped_parties(document_element, canonical_role_map, already_seen):
-        parties_local = []
-        if document_element is None:
-            return parties_local
-
-        parent_map_local = {c: p for p in document_element.iter() for c in p}
-        trigger_tags = {"Nm", "Adr", "PstlAdr", "NmAndAdr", "Lctn"}
-
-        for trigger in document_element.iter():
-            trig_local = trigger.tag.split("}")[-1] if isinstance(trigger.tag, str) else trigger.tag
-            if trig_local not in trigger_tags:
-                continue
-            parent = parent_map_local.get(trigger)
-            if parent is None:
-                continue
-            parent_local = parent.tag.split("}")[-1] if isinstance(parent.tag, str) else parent.tag
-            if not parent_local or parent_local in ("Document", "AppHdr"):
-                continue
-            if parent_local in canonical_role_map:
-                continue
-            parent_id = id(parent)
-            if parent_id in already_seen:
-                continue
-
-            name_value = None
-            if trig_local == "Nm" and trigger.text and trigger.text.strip():
-                name_value = trigger.text.strip()
-            else:
-                for child in list(parent):
-                    cn = child.tag.split("}")[-1] if isinstance(child.tag, str) else child.tag
-                    if cn == "Nm" and child.text and child.text.strip():
-                        name_value = child.text.strip()
-                        break
-
-            if name_value is None and trig_local in {"Adr", "PstlAdr", "NmAndAdr", "Lctn"}:
-                addr_bits = []
-                for c in list(trigger):
-                    cn = c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag
-                    if cn in ("AdrLine", "StrtNm", "BldgNb", "TwnNm", "TownNm", "PstCd", "PostCd", "Ctry", "CtryCd"):
-                        if c.text and c.text.strip():
-                            addr_bits.append(c.text.strip())
-                if addr_bits:
-                    name_value = " ".join(addr_bits)[:256]
-
-            if name_value is None:
-                continue
-
-            alias_values = None
-            address = _extract_address(parent)
-
-            identifiers = {"id": None, "anyBIC": None, "lei": None, "other": []}
-            bic_value = None
-            financial_institution_other = []
-            financial_institution_lei = None
-            clearing_system_id = None
-            clearing_member_id = None
-            branch_object = None
-            any_bic_value = None
-            prtry_id_value = None
-            prtry_id_scheme = None
-            prtry_id_issuer = None
-
-            for e in parent.iter():
-                en = e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag
-                if en == "BICFI" and e.text and e.text.strip():
-                    bic_value = e.text.strip()
-                elif en == "AnyBIC" and e.text and e.text.strip():
-                    any_bic_value = e.text.strip()
-                elif en == "LEI" and e.text and e.text.strip():
-                    identifiers["lei"] = e.text.strip()
-                elif en == "Id" and e.text and e.text.strip() and identifiers["id"] is None:
-                    identifiers["id"] = e.text.strip()
-                elif en == "PrtryId":
-                    id_text = None
-                    scheme_text = None
-                    issuer_text = None
-                    for y in e:
-                        yn = y.tag.split("}")[-1] if isinstance(y.tag, str) else y.tag
-                        if yn == "Id" and y.text and y.text.strip():
-                            id_text = y.text.strip()
-                        elif yn == "SchmeNm" and y.text and y.text.strip():
-                            scheme_text = y.text.strip()
-                        elif yn == "Issr" and y.text and y.text.strip():
-                            issuer_text = y.text.strip()
-                    prtry_id_value = id_text or prtry_id_value
-                    prtry_id_scheme = scheme_text or prtry_id_scheme
-                    prtry_id_issuer = issuer_text or prtry_id_issuer
-                    if id_text or scheme_text:
-                        financial_institution_other.append({"id": id_text, "scheme": scheme_text})
-                if any_bic_value and not identifiers["anyBIC"]:
-                    identifiers["anyBIC"] = any_bic_value
-
-            party_obj = {
-                "role": parent_local,
-                "name": name_value,
-                "aliases": alias_values,
-                "address": address,
-                "contact": {
-                    "countryOfResidence": None,
-                    "residencyStatus": None,
-                    "placeOfBirth": None,
-                    "dateOfBirth": None,
-                    "provinceOfBirth": None,
-                    "cityOfBirth": None,
-                    "countryOfBirth": None,
-                    "prefix": None,
-                    "contactName": None,
-                    "phone": None,
-                    "mobile": None,
-                    "fax": None,
-                    "url": None,
-                    "email": None,
-                    "emailPurpose": None,
-                    "jobTitle": None,
-                    "responsibility": None,
-                    "department": None,
-                    "channelType": None,
-                    "channelId": None,
-                    "preferredMethod": None
-                },
-                "account": {
-                    "iban": None,
-                    "other": None,
-                    "others": [],
-                    "bic": bic_value,
-                    "currency": None,
-                    "name": None,
-                    "accountId": None
-                },
-                "identifiers": identifiers,
-                "financialInstitution": {
-                    "bic": bic_value,
-                    "lei": financial_institution_lei,
-                    "clearingSystemId": clearing_system_id,
-                    "clearingMemberId": clearing_member_id,
-                    "other": financial_institution_other,
-                    "branch": branch_object
-                }
-            }
-            parties_local.append(party_obj)
-            already_seen.add(parent_id)
-
-        return parties_local
+            for child in ix.children(msg_id_block):
+                if names[child] == "Id" and texts[child]:
+                    group_header["msgId"] = texts[child]
+                elif names[child] == "CreDtTm" and texts[child]:
+                    group_header["creDtTm"] = texts[child]
 
     parties = []
-    seen_party_elements = set()
-
+    seen = set()
     if application_header.get("fromBIC") or application_header.get("fromName"):
-        identifiers_map = {"id": None, "anyBIC": application_header.get("fromBIC"), "lei": None, "other": []}
-        parties.append({
-            "role": "messageSender",
-            "name": application_header.get("fromName"),
-            "aliases": None,
-            "address": {
-                "type": {"id": None, "issuer": None, "schemeName": None},
-                "careOf": None,
-                "department": None,
-                "subDepartment": None,
-                "street": None,
-                "buildingNumber": None,
-                "buildingName": None,
-                "floor": None,
-                "unitNumber": None,
-                "postBox": None,
-                "room": None,
-                "postalCode": None,
-                "city": None,
-                "townLocationName": None,
-                "districtName": None,
-                "state": None,
-                "country": None,
-                "addressLine": None,
-                "addressLines": []
-            },
-            "contact": {
-                "countryOfResidence": None,
-                "residencyStatus": None,
-                "placeOfBirth": None,
-                "dateOfBirth": None,
-                "provinceOfBirth": None,
-                "cityOfBirth": None,
-                "countryOfBirth": None,
-                "prefix": None,
-                "contactName": None,
-                "phone": None,
-                "mobile": None,
-                "fax": None,
-                "url": None,
-                "email": None,
-                "emailPurpose": None,
-                "jobTitle": None,
-                "responsibility": None,
-                "department": None,
-                "channelType": None,
-                "channelId": None,
-                "preferredMethod": None
-            },
-            "account": {
-                "iban": None,
-                "other": None,
-                "others": [],
-                "bic": application_header.get("fromBIC"),
-                "currency": None,
-                "name": None,
-                "accountId": None
-            },
-            "identifiers": identifiers_map,
-            "financialInstitution": {
-                "bic": application_header.get("fromBIC"),
-                "lei": None,
-                "clearingSystemId": None,
-                "clearingMemberId": None,
-                "other": [],
-                "branch": None
-            }
-        })
-
+        parties.append(_header_party("messageSender", application_header.get("fromName"), application_header.get("fromBIC")))
     if application_header.get("toBIC") or application_header.get("toName"):
-        identifiers_map = {"id": None, "anyBIC": application_header.get("toBIC"), "lei": None, "other": []}
-        parties.append({
-            "role": "messageReceiver",
-            "name": application_header.get("toName"),
-            "aliases": None,
-            "address": {
-                "type": {"id": None, "issuer": None, "schemeName": None},
-                "careOf": None,
-                "department": None,
-                "subDepartment": None,
-                "street": None,
-                "buildingNumber": None,
-                "buildingName": None,
-                "floor": None,
-                "unitNumber": None,
-                "postBox": None,
-                "room": None,
-                "postalCode": None,
-                "city": None,
-                "townLocationName": None,
-                "districtName": None,
-                "state": None,
-                "country": None,
-                "addressLine": None,
-                "addressLines": []
-            },
-            "contact": {
-                "countryOfResidence": None,
-                "residencyStatus": None,
-                "placeOfBirth": None,
-                "dateOfBirth": None,
-                "provinceOfBirth": None,
-                "cityOfBirth": None,
-                "countryOfBirth": None,
-                "prefix": None,
-                "contactName": None,
-                "phone": None,
-                "mobile": None,
-                "fax": None,
-                "url": None,
-                "email": None,
-                "emailPurpose": None,
-                "jobTitle": None,
-                "responsibility": None,
-                "department": None,
-                "channelType": None,
-                "channelId": None,
-                "preferredMethod": None
-            },
-            "account": {
-                "iban": None,
-                "other": None,
-                "others": [],
-                "bic": application_header.get("toBIC"),
-                "currency": None,
-                "name": None,
-                "accountId": None
-            },
-            "identifiers": identifiers_map,
-            "financialInstitution": {
-                "bic": application_header.get("toBIC"),
-                "lei": None,
-                "clearingSystemId": None,
-                "clearingMemberId": None,
-                "other": [],
-                "branch": None
-            }
-        })
+        parties.append(_header_party("messageReceiver", application_header.get("toName"), application_header.get("toBIC")))
 
     investment_accounts = []
-    for element in document_element.iter():
-        if (element.tag.split("}")[-1] if isinstance(element.tag, str) else element.tag) == "IndvOrdrDtls":
-            owner_name_value = None
-            account_identifier_value = None
-            account_display_name_value = None
-            for e in element.iter():
-                en = e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag
-                if en == "AcctOwnr":
-                    for c in e.iter():
-                        cn = c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag
-                        if cn == "Nm" and c.text and c.text.strip():
-                            owner_name_value = c.text.strip()
-                if en == "OwnrId":
-                    for c in e.iter():
-                        cn = c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag
-                        if cn == "Nm" and c.text and c.text.strip():
-                            owner_name_value = c.text.strip()
-                if en == "AcctNm" and e.text and e.text.strip() and owner_name_value is None:
-                    owner_name_value = e.text.strip()
-                if en == "InvstmtAcctDtls":
-                    for c in e.iter():
-                        cn = c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag
-                        if cn == "AcctId":
-                            direct_text_value = c.text.strip() if c.text and c.text.strip() else None
-                            nested_value = None
-                            for z in c:
-                                zn = z.tag.split("}")[-1] if isinstance(z.tag, str) else z.tag
-                                if zn == "Id" and z.text and z.text.strip():
-                                    nested_value = z.text.strip()
-                            account_identifier_value = nested_value or direct_text_value or account_identifier_value
-                        elif cn == "AcctNm" and c.text and c.text.strip():
-                            account_display_name_value = c.text.strip()
-            if owner_name_value and account_identifier_value:
-                investment_accounts.append({
-                    "ownerName": owner_name_value,
-                    "acctId": account_identifier_value,
-                    "acctName": account_display_name_value
-                })
-
-    for element in document_element.iter():
-        local_name = element.tag.split("}")[-1] if isinstance(element.tag, str) else element.tag
-        canonical_role = canonical_role_map.get(local_name)
-        if canonical_role is None:
-            continue
-
-        element_id_value = id(element)
-        if element_id_value in seen_party_elements:
-            continue
-
-        has_party_like_descendant = False
-        for d in element.iter():
-            dn = d.tag.split("}")[-1] if isinstance(d.tag, str) else d.tag
-            if dn in ("Nm", "PstlAdr", "Adr", "NmAndAdr", "OrgId", "PrvtId", "Id", "FinInstnId", "BICFI", "AnyBIC", "LEI", "IBAN", "Lctn", "PrtryId"):
-                has_party_like_descendant = True
-                break
-        if not has_party_like_descendant:
+    for order in ix.within(document, "IndvOrdrDtls"):
+        owner_name_value = None
+        account_identifier_value = None
+        account_display_name_value = None
+        for e in ix.select(order, ("AcctOwnr", "OwnrId", "AcctNm", "InvstmtAcctDtls")):
+            en = names[e]
+            if en in ("AcctOwnr", "OwnrId"):
+                owner_name_value = ix.last_text(e, "Nm") or owner_name_value
+            elif en == "AcctNm":
+                if texts[e] and owner_name_value is None:
+                    owner_name_value = texts[e]
+            else:
+                for c in ix.select(e, ("AcctId", "AcctNm")):
+                    if names[c] == "AcctId":
+                        account_identifier_value = ix.child_text(c, "Id") or texts[c] or account_identifier_value
+                    elif texts[c]:
+                        account_display_name_value = texts[c]
+        if owner_name_value and account_identifier_value:
+            investment_accounts.append({
+                "ownerName": owner_name_value,
+                "acctId": account_identifier_value,
+                "acctName": account_display_name_value
+            })
+
+    for element in ix.select(document, [name for name in CANONICAL_ROLE_MAP if name in ix.positions]):
+        if element in seen or ix.first(element, _PARTY_LIKE_TAGS) is None:
             continue
+        seen.add(element)
+        parties.append(_index_role_party(ix, element, CANONICAL_ROLE_MAP[names[element]]))
 
-        seen_party_elements.add(element_id_value)
-
-        name_value = None
-        for e in element.iter():
-            tn = e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag
-            if tn == "Nm" and e.text and e.text.strip():
-                name_value = e.text.strip()
-                break
-
-        if name_value is None:
-            person_or_party_node = None
-            for e in element.iter():
-                tn = e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag
-                if tn in ("Pty", "IndvPrsn", "OrgId", "PrvtId", "NmAndAdr"):
-                    person_or_party_node = e
-                    break
-            if person_or_party_node is not None:
-                for e in person_or_party_node.iter():
-                    tn = e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag
-                    if tn == "Nm" and e.text and e.text.strip():
-                        name_value = e.text.strip()
-                        break
-
-        if name_value is None:
-            for e in element.iter():
-                tn = e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag
-                if tn in ("Id", "AcqrgInstn", "AddtlId", "ShrtNm", "ShortName"):
-                    if e.text and e.text.strip():
-                        name_value = e.text.strip()
-                        break
-
-        alias_values = []
-        for e in element.iter():
-            tn = e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag
-            if tn in ("Alia", "Alias"):
-                alias_text = None
-                alias_name_child = None
-                for c in list(e):
-                    if (c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag) == "Nm":
-                        alias_name_child = c
-                        break
-                if alias_name_child is not None and alias_name_child.text and alias_name_child.text.strip():
-                    alias_text = alias_name_child.text.strip()
-                elif e.text and e.text.strip():
-                    alias_text = e.text.strip()
-                if alias_text:
-                    alias_values.append(alias_text)
-        if not alias_values:
-            alias_values = None
-
-        address = _extract_address(element)
-
-        identifiers = {"id": None, "anyBIC": None, "lei": None, "other": []}
-        for child in list(element):
-            child_name = child.tag.split("}")[-1] if isinstance(child.tag, str) else child.tag
-            if child_name == "Id" and child.text and child.text.strip():
-                identifiers["id"] = child.text.strip()
-                break
-        for e in element.iter():
-            en = e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag
-            if en == "OrgId":
-                for sub in e.iter():
-                    sn = sub.tag.split("}")[-1] if isinstance(sub.tag, str) else sub.tag
-                    if sn == "AnyBIC" and sub.text and sub.text.strip():
-                        identifiers["anyBIC"] = sub.text.strip()
-                    elif sn == "LEI" and sub.text and sub.text.strip():
-                        identifiers["lei"] = sub.text.strip()
-                    elif sn == "Othr":
-                        id_text = None
-                        scheme_text = None
-                        issuer_text = None
-                        for x in sub:
-                            xn = x.tag.split("}")[-1] if isinstance(x.tag, str) else x.tag
-                            if xn == "Id" and x.text and x.text.strip():
-                                id_text = x.text.strip()
-                            elif xn == "SchmeNm":
-                                for y in x:
-                                    yn = y.tag.split("}")[-1] if isinstance(y.tag, str) else y.tag
-                                    if yn == "Prtry" and y.text and y.text.strip():
-                                        scheme_text = y.text.strip()
-                            elif xn == "Issr" and x.text and x.text.strip():
-                                issuer_text = x.text.strip()
-                        if id_text or scheme_text or issuer_text:
-                            identifiers["other"].append({"id": id_text, "scheme": scheme_text, "issuer": issuer_text})
-        if identifiers.get("lei") is None:
-            for e in element.iter():
-                if (e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag) == "LEI" and e.text and e.text.strip():
-                    identifiers["lei"] = e.text.strip()
-                    break
-
-        country_of_residence_value = None
-        residency_status_value = None
-        date_of_birth_value = None
-        place_of_birth_value = None
-        province_of_birth_value = None
-        city_of_birth_value = None
-        country_of_birth_value = None
-        contact_person_prefix = None
-        contact_person_name = None
-        contact_phone = None
-        contact_mobile = None
-        contact_fax = None
-        contact_url = None
-        contact_email = None
-        contact_email_purpose = None
-        contact_job_title = None
-        contact_responsibility = None
-        contact_department = None
-        contact_channel_type = None
-        contact_channel_id = None
-        contact_preferred_method = None
-
-        for e in element.iter():
-            en = e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag
-            if en in ("CtryOfRes", "CountryOfResidence") and e.text and e.text.strip() and not country_of_residence_value:
-                country_of_residence_value = e.text.strip()
-            if en == "CtryAndResdtlSts":
-                for c in e:
-                    cn = c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag
-                    if cn == "Ctry" and c.text and c.text.strip():
-                        country_of_residence_value = c.text.strip()
-                    elif cn == "ResdtlSts" and c.text and c.text.strip():
-                        residency_status_value = c.text.strip()
-            if en == "BirthDt" and e.text and e.text.strip() and not date_of_birth_value:
-                date_of_birth_value = e.text.strip()
-            if en == "DtAndPlcOfBirth":
-                for c in e:
-                    cn = c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag
-                    if cn == "BirthDt" and c.text and c.text.strip():
-                        date_of_birth_value = c.text.strip()
-                    elif cn == "PrvcOfBirth" and c.text and c.text.strip():
-                        province_of_birth_value = c.text.strip()
-                    elif cn == "CityOfBirth" and c.text and c.text.strip():
-                        city_of_birth_value = c.text.strip()
-                    elif cn == "CtryOfBirth" and c.text and c.text.strip():
-                        country_of_birth_value = c.text.strip()
-                    elif cn == "City" and c.text and c.text.strip() and not place_of_birth_value:
-                        place_of_birth_value = c.text.strip()
-            if en == "CtctDtls":
-                for c in e:
-                    cn = c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag
-                    if cn == "NmPrfx" and c.text and c.text.strip():
-                        contact_person_prefix = c.text.strip()
-                    elif cn == "Nm" and c.text and c.text.strip():
-                        contact_person_name = c.text.strip()
-                    elif cn == "PhneNb" and c.text and c.text.strip():
-                        contact_phone = c.text.strip()
-                    elif cn == "MobNb" and c.text and c.text.strip():
-                        contact_mobile = c.text.strip()
-                    elif cn == "FaxNb" and c.text and c.text.strip():
-                        contact_fax = c.text.strip()
-                    elif cn == "URLAdr" and c.text and c.text.strip():
-                        contact_url = c.text.strip()
-                    elif cn == "EmailAdr" and c.text and c.text.strip():
-                        contact_email = c.text.strip()
-                    elif cn == "EmailPurp" and c.text and c.text.strip():
-                        contact_email_purpose = c.text.strip()
-                    elif cn == "JobTitl" and c.text and c.text.strip():
-                        contact_job_title = c.text.strip()
-                    elif cn == "Rspnsblty" and c.text and c.text.strip():
-                        contact_responsibility = c.text.strip()
-                    elif cn == "Dept" and c.text and c.text.strip():
-                        contact_department = c.text.strip()
-                    elif cn == "Othr":
-                        chan_tp = None
-                        chan_id = None
-                        for z in c:
-                            zn = z.tag.split("}")[-1] if isinstance(z.tag, str) else z.tag
-                            if zn == "ChanlTp" and z.text and z.text.strip():
-                                chan_tp = z.text.strip()
-                            elif zn == "Id" and z.text and z.text.strip():
-                                chan_id = z.text.strip()
-                        if chan_tp:
-                            contact_channel_type = chan_tp
-                        if chan_id:
-                            contact_channel_id = chan_id
-                    elif cn == "PrefrdMtd" and c.text and c.text.strip():
-                        contact_preferred_method = c.text.strip()
-            if en == "PhneNb" and e.text and e.text.strip() and not contact_phone:
-                contact_phone = e.text.strip()
-            if en == "EmailAdr" and e.text and e.text.strip() and not contact_email:
-                contact_email = e.text.strip()
-            if en == "Dept" and e.text and e.text.strip() and not contact_department:
-                contact_department = e.text.strip()
-
-        iban_value = None
-        other_account_value = None
-        other_accounts = []
-        account_currency_value = None
-        account_id_value = None
-
-        for e in element.iter():
-            en = e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag
-            if en == "IBAN" and e.text and e.text.strip() and not iban_value:
-                iban_value = e.text.strip()
-            elif en == "Othr":
-                id_child = None
-                scheme_child_text = None
-                issuer_child_text = None
-                for c in list(e):
-                    cn = c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag
-                    if cn == "Id" and c.text and c.text.strip():
-                        id_child = c
-                    elif cn == "SchmeNm":
-                        for pr in c:
-                            pn = pr.tag.split("}")[-1] if isinstance(pr.tag, str) else pr.tag
-                            if pn == "Prtry" and pr.text and pr.text.strip():
-                                scheme_child_text = pr.text.strip()
-                    elif cn == "Issr":
-                        if c.text and c.text.strip():
-                            issuer_child_text = c.text.strip()
-                if id_child is not None and id_child.text and id_child.text.strip():
-                    if not other_account_value:
-                        other_account_value = id_child.text.strip()
-                    other_accounts.append({
-                        "id": id_child.text.strip(),
-                        "scheme": scheme_child_text,
-                        "issuer": issuer_child_text
-                    })
-                elif e.text and e.text.strip() and not other_account_value:
-                    other_account_value = e.text.strip()
-            elif en == "Ccy" and e.text and e.text.strip() and not account_currency_value:
-                account_currency_value = e.text.strip()
-            elif en == "AcctId":
-                direct_text_value = e.text.strip() if e.text and e.text.strip() else None
-                nested_value = None
-                for c in e:
-                    if (c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag) == "Id" and c.text and c.text.strip():
-                        nested_value = c.text.strip()
-                if nested_value or direct_text_value:
-                    account_id_value = nested_value or direct_text_value
-            elif en == "SfkpgAcct":
-                for c in e.iter():
-                    cn = c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag
-                    if cn == "Id" and c.text and c.text.strip():
-                        account_id_value = c.text.strip()
-
-        bic_value = None
-        financial_institution_other = []
-        financial_institution_lei = None
-        clearing_system_id = None
-        clearing_member_id = None
-        branch_object = None
-        any_bic_value = None
-        prtry_id_value = None
-        prtry_id_scheme = None
-        prtry_id_issuer = None
-
-        for e in element.iter():
-            en = e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag
-            if en == "BICFI" and e.text and e.text.strip():
-                bic_value = e.text.strip()
-            elif en == "AnyBIC" and e.text and e.text.strip():
-                any_bic_value = e.text.strip()
-            elif en == "PrtryId":
-                id_text = None
-                scheme_text = None
-                issuer_text = None
-                for y in e:
-                    yn = y.tag.split("}")[-1] if isinstance(y.tag, str) else y.tag
-                    if yn == "Id" and y.text and y.text.strip():
-                        id_text = y.text.strip()
-                    elif yn == "SchmeNm" and y.text and y.text.strip():
-                        scheme_text = y.text.strip()
-                    elif yn == "Issr" and y.text and y.text.strip():
-                        issuer_text = y.text.strip()
-                prtry_id_value = id_text or prtry_id_value
-                prtry_id_scheme = scheme_text or prtry_id_scheme
-                prtry_id_issuer = issuer_text or prtry_id_issuer
-                if id_text or scheme_text:
-                    financial_institution_other.append({"id": id_text, "scheme": scheme_text})
-            elif en == "FinInstnId":
-                for sub in e:
-                    sn = sub.tag.split("}")[-1] if isinstance(sub.tag, str) else sub.tag
-                    if sn == "BICFI" and sub.text and sub.text.strip():
-                        bic_value = sub.text.strip()
-                    elif sn == "AnyBIC" and sub.text and sub.text.strip():
-                        any_bic_value = sub.text.strip()
-                    elif sn == "LEI" and sub.text and sub.text.strip():
-                        financial_institution_lei = sub.text.strip()
-                    elif sn == "ClrSysMmbId":
-                        for y in sub:
-                            yn = y.tag.split("}")[-1] if isinstance(y.tag, str) else y.tag
-                            if yn == "ClrSysId":
-                                for z in y:
-                                    zn = z.tag.split("}")[-1] if isinstance(z.tag, str) else z.tag
-                                    if zn == "Cd" and z.text and z.text.strip():
-                                        clearing_system_id = z.text.strip()
-                            elif yn == "MmbId" and y.text and y.text.strip():
-                                clearing_member_id = y.text.strip()
-                    elif sn == "Othr":
-                        id_text = None
-                        scheme_text = None
-                        for y in sub:
-                            yn = y.tag.split("}")[-1] if isinstance(y.tag, str) else y.tag
-                            if yn == "Id" and y.text and y.text.strip():
-                                id_text = y.text.strip()
-                            elif yn == "SchmeNm":
-                                for z in y:
-                                    zn = z.tag.split("}")[-1] if isinstance(z.tag, str) else z.tag
-                                    if zn == "Prtry" and z.text and z.text.strip():
-                                        scheme_text = z.text.strip()
-                        if id_text or scheme_text:
-                            financial_institution_other.append({"id": id_text, "scheme": scheme_text})
-            elif en == "BrnchId":
-                b_id = None
-                b_lei = None
-                b_name = None
-                b_address = {}
-                for sub in e:
-                    sn = sub.tag.split("}")[-1] if isinstance(sub.tag, str) else sub.tag
-                    if sn == "Id" and sub.text and sub.text.strip():
-                        b_id = sub.text.strip()
-                    elif sn == "LEI" and sub.text and sub.text.strip():
-                        b_lei = sub.text.strip()
-                    elif sn == "Nm" and sub.text and sub.text.strip():
-                        b_name = sub.text.strip()
-                    elif sn == "PstlAdr":
-                        ba = {
-                            "street": None,
-                            "buildingNumber": None,
-                            "postalCode": None,
-                            "city": None,
-                            "state": None,
-                            "country": None,
-                            "addressLine": None,
-                            "addressLines": []
-                        }
-                        for q in sub:
-                            qn = q.tag.split("}")[-1] if isinstance(q.tag, str) else q.tag
-                            if qn == "StrtNm" and q.text and q.text.strip():
-                                ba["street"] = q.text.strip()
-                            elif qn == "BldgNb" and q.text and q.text.strip():
-                                ba["buildingNumber"] = q.text.strip()
-                            elif qn in ("PstCd", "PostCd") and q.text and q.text.strip():
-                                ba["postalCode"] = q.text.strip()
-                            elif qn in ("TwnNm", "TownNm") and q.text and q.text.strip():
-                                ba["city"] = q.text.strip()
-                            elif qn == "CtrySubDvsn" and q.text and q.text.strip():
-                                ba["state"] = q.text.strip()
-                            elif qn in ("Ctry", "CtryCd") and q.text and q.text.strip():
-                                ba["country"] = q.text.strip()
-                            elif qn == "AdrLine" and q.text and q.text.strip():
-                                ba["addressLines"].append(q.text.strip())
-                        if ba["addressLines"] and not ba.get("addressLine"):
-                            ba["addressLine"] = ba["addressLines"][0]
-                        b_address = ba
-                branch_object = {"id": b_id, "lei": b_lei, "name": b_name, "address": b_address}
-
-        if bic_value is None and any_bic_value:
-            bic_value = any_bic_value
-        if name_value is None and bic_value:
-            name_value = bic_value
-        if name_value is None and prtry_id_value:
-            name_value = prtry_id_value
-
-        names_acc = []
-        for e in element.iter():
-            tn = e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag
-            if tn == "Nm" and e.text and e.text.strip():
-                val = e.text.strip()
-                if val not in names_acc:
-                    names_acc.append(val)
-
-        addresses_acc = []
-        for e in element.iter():
-            tn = e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag
-            if tn in ("PstlAdr", "Adr"):
-                addr_obj = {
-                    "type": {"id": None, "issuer": None, "schemeName": None},
-                    "careOf": None,
-                    "department": None,
-                    "subDepartment": None,
-                    "street": None,
-                    "buildingNumber": None,
-                    "buildingName": None,
-                    "floor": None,
-                    "unitNumber": None,
-                    "postBox": None,
-                    "room": None,
-                    "postalCode": None,
-                    "city": None,
-                    "townLocationName": None,
-                    "districtName": None,
-                    "state": None,
-                    "country": None,
-                    "addressLine": None,
-                    "addressLines": []
-                }
-                for c in e:
-                    cn = c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag
-                    cl = cn.lower() if isinstance(cn, str) else cn
-                    if cn == "AdrTp":
-                        for p in c.iter():
-                            pn = p.tag.split("}")[-1] if isinstance(p.tag, str) else p.tag
-                            if pn == "Prtry":
-                                for q in p:
-                                    qn = q.tag.split("}")[-1] if isinstance(q.tag, str) else q.tag
-                                    if qn == "Id" and q.text and q.text.strip():
-                                        addr_obj["type"]["id"] = q.text.strip()
-                                    elif qn == "Issr" and q.text and q.text.strip():
-                                        addr_obj["type"]["issuer"] = q.text.strip()
-                                    elif qn == "SchmeNm":
-                                        for r in q:
-                                            rn = r.tag.split("}")[-1] if isinstance(r.tag, str) else r.tag
-                                            if rn == "Prtry" and r.text and r.text.strip():
-                                                addr_obj["type"]["schemeName"] = r.text.strip()
-                    elif cl == "careof" and c.text and c.text.strip():
-                        addr_obj["careOf"] = c.text.strip()
-                    elif cn == "Dept" and c.text and c.text.strip():
-                        addr_obj["department"] = c.text.strip()
-                    elif cn == "SubDept" and c.text and c.text.strip():
-                        addr_obj["subDepartment"] = c.text.strip()
-                    elif cn == "StrtNm" and c.text and c.text.strip():
-                        addr_obj["street"] = c.text.strip()
-                    elif cn == "BldgNb" and c.text and c.text.strip():
-                        addr_obj["buildingNumber"] = c.text.strip()
-                    elif cn == "BldgNm" and c.text and c.text.strip():
-                        addr_obj["buildingName"] = c.text.strip()
-                    elif cn == "Flr" and c.text and c.text.strip():
-                        addr_obj["floor"] = c.text.strip()
-                    elif cn == "UnitNb" and c.text and c.text.strip():
-                        addr_obj["unitNumber"] = c.text.strip()
-                    elif cn == "PstBx" and c.text and c.text.strip():
-                        addr_obj["postBox"] = c.text.strip()
-                    elif cn == "Room" and c.text and c.text.strip():
-                        addr_obj["room"] = c.text.strip()
-                    elif cl in ("pstcd", "postcd") and c.text and c.text.strip():
-                        addr_obj["postalCode"] = c.text.strip()
-                    elif cl in ("twnnm", "townnm") and c.text and c.text.strip():
-                        addr_obj["city"] = c.text.strip()
-                    elif cn == "TwnLctnNm" and c.text and c.text.strip():
-                        addr_obj["townLocationName"] = c.text.strip()
-                    elif cn == "DstrctNm" and c.text and c.text.strip():
-                        addr_obj["districtName"] = c.text.strip()
-                    elif cn == "CtrySubDvsn" and c.text and c.text.strip():
-                        addr_obj["state"] = c.text.strip()
-                    elif cn in ("Ctry", "CtryCd") and c.text and c.text.strip():
-                        addr_obj["country"] = c.text.strip()
-                    elif cn == "AdrLine" and c.text and c.text.strip():
-                        addr_obj["addressLines"].append(c.text.strip())
-                if addr_obj["addressLines"] and not addr_obj.get("addressLine"):
-                    addr_obj["addressLine"] = addr_obj["addressLines"][0]
-                if any(v for k, v in addr_obj.items() if k != "type") or any(v for v in addr_obj["type"].values()) or addr_obj["addressLines"]:
-                    addresses_acc.append(addr_obj)
-
-        multi_names = names_acc if names_acc else None
-        multi_addresses = addresses_acc if addresses_acc else None
-        if not name_value and names_acc:
-            name_value = names_acc[0]
-        if not (address.get("street") or address.get("city") or address.get("postalCode") or address.get("country") or address.get("addressLines")) and addresses_acc:
-            address = addresses_acc[0]
-
-        parties.append({
-            "role": canonical_role,
-            "name": name_value,
-            "names": multi_names,
-            "aliases": alias_values,
-            "address": address,
-            "addresses": multi_addresses,
-            "contact": {
-                "countryOfResidence": country_of_residence_value,
-                "residencyStatus": residency_status_value,
-                "placeOfBirth": place_of_birth_value,
-                "dateOfBirth": date_of_birth_value,
-                "provinceOfBirth": province_of_birth_value,
-                "cityOfBirth": city_of_birth_value,
-                "countryOfBirth": country_of_birth_value,
-                "prefix": contact_person_prefix,
-                "contactName": contact_person_name,
-                "phone": contact_phone,
-                "mobile": contact_mobile,
-                "fax": contact_fax,
-                "url": contact_url,
-                "email": contact_email,
-                "emailPurpose": contact_email_purpose,
-                "jobTitle": contact_job_title,
-                "responsibility": contact_responsibility,
-                "department": contact_department,
-                "channelType": contact_channel_type,
-                "channelId": contact_channel_id,
-                "preferredMethod": contact_preferred_method
-            },
-            "account": {
-                "iban": iban_value,
-                "other": other_account_value,
-                "others": other_accounts,
-                "bic": bic_value,
-                "currency": account_currency_value,
-                "name": None,
-                "accountId": account_id_value
-            },
-            "identifiers": identifiers,
-            "financialInstitution": {
-                "bic": bic_value,
-                "lei": financial_institution_lei,
-                "clearingSystemId": clearing_system_id,
-                "clearingMemberId": clearing_member_id,
-                "other": financial_institution_other,
-                "branch": branch_object
-            }
-        })
-
-    safeguard_seen = set()
-    addr_like_tags = {"PstlAdr", "Adr", "NmAndAdr", "Lctn"}
-    addr_field_tags = {
-        "StrtNm": "street", "BldgNb": "buildingNumber", "BldgNm": "buildingName", "Flr": "floor", "UnitNb": "unitNumber",
-        "PstBx": "postBox", "Room": "room", "PstCd": "postalCode", "PostCd": "postalCode",
-        "TwnNm": "city", "TownNm": "city", "TwnLctnNm": "townLocationName", "DstrctNm": "districtName",
-        "CtrySubDvsn": "state", "Ctry": "country", "CtryCd": "country", "AdrLine": "addressLine",
-        "Dept": "department", "SubDept": "subDepartment"
-    }
-
-    extra_parties = _detect_unmapped_parties(document_element, canonical_role_map, seen_party_elements)
-    if extra_parties:
-        parties.extend(extra_parties)
-
-    account_role_to_party_role = {
-        "DbtrAcct": "debtor",
-        "CdtrAcct": "creditor",
-        "UltmtDbtrAcct": "ultimateDebtor",
-        "UltmtCdtrAcct": "ultimateCreditor"
-    }
+    parties.extend(_index_unmapped_parties(ix, document, seen))
 
     role_to_first_index = {}
     for i, p in enumerate(parties):
         if p.get("role") not in role_to_first_index:
             role_to_first_index[p.get("role")] = i
 
-    for acct_tag, target_role in account_role_to_party_role.items():
-        account_nodes = []
-        for e in document_element.iter():
-            if (e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag) == acct_tag:
-                account_nodes.append(e)
-        if not account_nodes:
+    for acct_tag, target_role in _ACCOUNT_ROLE_TO_PARTY_ROLE.items():
+        account_node = ix.first(document, (acct_tag,))
+        if account_node is None:
             continue
-
-        account_node = account_nodes[0]
-        iban_text = None
-        other_text = None
-        others_list = []
-        currency_text = None
-        display_name_text = None
-        account_id_text = None
-
-        for e in account_node.iter():
-            n = e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag
-            if n == "IBAN" and e.text and e.text.strip():
-                iban_text = e.text.strip()
-            elif n == "Othr":
-                id_val = None
-                scheme_val = None
-                issuer_val = None
-                for sub in e:
-                    sn = sub.tag.split("}")[-1] if isinstance(sub.tag, str) else sub.tag
-                    if sn == "Id" and sub.text and sub.text.strip():
-                        id_val = sub.text.strip()
-                    elif sn == "SchmeNm":
-                        for pr in sub:
-                            prn = pr.tag.split("}")[-1] if isinstance(pr.tag, str) else pr.tag
-                            if prn == "Prtry" and pr.text and pr.text.strip():
-                                scheme_val = pr.text.strip()
-                    elif sn == "Issr" and sub.text and sub.text.strip():
-                        issuer_val = sub.text.strip()
-                if id_val:
-                    if other_text is None:
-                        other_text = id_val
-                    others_list.append({"id": id_val, "scheme": scheme_val, "issuer": issuer_val})
-            elif n == "Ccy" and e.text and e.text.strip():
-                currency_text = e.text.strip()
-            elif n == "Nm" and e.text and e.text.strip():
-                display_name_text = e.text.strip()
-            elif n == "AcctId":
-                for c in e:
-                    if (c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag) == "Id" and c.text and c.text.strip():
-                        account_id_text = c.text.strip()
-                if e.text and e.text.strip() and not account_id_text:
-                    account_id_text = e.text.strip()
-            elif n == "SfkpgAcct":
-                for c in e.iter():
-                    cn = c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag
-                    if cn == "Id" and c.text and c.text.strip():
-                        account_id_text = c.text.strip()
-
+        iban_text, other_text, others_list, currency_text, display_name_text, account_id_text = _index_account(ix, account_node)
         if target_role in role_to_first_index:
             idx = role_to_first_index[target_role]
             account_object = parties[idx].get("account") or {}
@@ -1348,8 +1082,6 @@ def parse(iso20022xml: bytes):
         owner_name_value = inv.get("ownerName")
         acct_id_value = inv.get("acctId")
         acct_name_value = inv.get("acctName")
-        if not owner_name_value or not acct_id_value:
-            continue
         for p in parties:
             if p.get("role") == "accountOwner":
                 party_name_value = p.get("name") or ""
@@ -1362,126 +1094,23 @@ def parse(iso20022xml: bytes):
                     p["account"] = account_object
                     break
 
-    for element in document_element.iter():
-        local_name = element.tag.split("}")[-1] if isinstance(element.tag, str) else element.tag
-        if local_name in canonical_role_map:
+    # Elements with a name and an address that no role claimed, unless an ancestor was claimed.
+    count = len(elements)
+    under_seen = [False] * count
+    under_order = [False] * count
+    for position in range(1, count):
+        parent = parents[position]
+        under_seen[position] = parent in seen or under_seen[parent]
+        under_order[position] = names[parent] == "IndvOrdrDtls" or under_order[parent]
+    for element in range(document, ends[document]):
+        if names[element] in CANONICAL_ROLE_MAP or element in seen or under_seen[element]:
             continue
-        element_id_value = id(element)
-        if element_id_value in seen_party_elements:
+        if ix.first(element, ("PstlAdr", "Adr")) is None:
             continue
-        has_name = False
-        has_address = False
-        for e in element.iter():
-            en = e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag
-            if en == "Nm" and e.text and e.text.strip():
-                has_name = True
-            if en in ("PstlAdr", "Adr"):
-                has_address = True
-        if not (has_name and has_address):
-            continue
-        cur = element
-        skip_due_to_ancestor = False
-        while cur in parent_map:
-            cur = parent_map[cur]
-            if id(cur) in seen_party_elements:
-                skip_due_to_ancestor = True
-                break
-        if skip_due_to_ancestor:
+        name_value = ix.first_text(element, ("Nm",))
+        if name_value is None:
             continue
-
-        name_value = None
-        for e in element.iter():
-            en = e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag
-            if en == "Nm" and e.text and e.text.strip():
-                name_value = e.text.strip()
-                break
-
-        address_obj = {
-            "type": {"id": None, "issuer": None, "schemeName": None},
-            "careOf": None, "department": None, "subDepartment": None,
-            "street": None, "buildingNumber": None, "buildingName": None, "floor": None, "unitNumber": None,
-            "postBox": None, "room": None, "postalCode": None, "city": None,
-            "townLocationName": None, "districtName": None, "state": None, "country": None,
-            "addressLine": None, "addressLines": []
-        }
-        direct_adr_node = None
-        pstl_adr_node = None
-        for e in element.iter():
-            en = e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag
-            if en == "PstlAdr":
-                pstl_adr_node = e
-                break
-        if pstl_adr_node is None:
-            for e in element.iter():
-                en = e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag
-                if en == "Adr":
-                    direct_adr_node = e
-                    break
-        adr_node = pstl_adr_node or direct_adr_node
-        if adr_node is not None:
-            for c in adr_node:
-                cn = c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag
-                cl = cn.lower() if isinstance(cn, str) else cn
-                if cn == "AdrTp":
-                    for p in c.iter():
-                        pn = p.tag.split("}")[-1] if isinstance(p.tag, str) else p.tag
-                        if pn == "Prtry":
-                            for q in p:
-                                qn = q.tag.split("}")[-1] if isinstance(q.tag, str) else q.tag
-                                if qn == "Id" and q.text and q.text.strip():
-                                    address_obj["type"]["id"] = q.text.strip()
-                                elif qn == "Issr" and q.text and q.text.strip():
-                                    address_obj["type"]["issuer"] = q.text.strip()
-                                elif qn == "SchmeNm" and q.text and q.text.strip():
-                                    address_obj["type"]["schemeName"] = q.text.strip()
-                elif cn == "StrtNm" and c.text and c.text.strip():
-                    address_obj["street"] = c.text.strip()
-                elif cn == "BldgNb" and c.text and c.text.strip():
-                    address_obj["buildingNumber"] = c.text.strip()
-                elif cn in ("TwnNm", "TownNm") and c.text and c.text.strip():
-                    address_obj["city"] = c.text.strip()
-                elif cn in ("PstCd", "PostCd") and c.text and c.text.strip():
-                    address_obj["postalCode"] = c.text.strip()
-                elif cn == "CtrySubDvsn" and c.text and c.text.strip():
-                    address_obj["state"] = c.text.strip()
-                elif cn in ("Ctry", "CtryCd") and c.text and c.text.strip():
-                    address_obj["country"] = c.text.strip()
-                elif cn == "AdrLine" and c.text and c.text.strip():
-                    address_obj["addressLines"].append(c.text.strip())
-            if address_obj["addressLines"] and not address_obj.get("addressLine"):
-                address_obj["addressLine"] = address_obj["addressLines"][0]
-
-        alias_values = []
-        for e in element.iter():
-            en = e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag
-            if en in ("Alia", "Alias"):
-                if e.text and e.text.strip():
-                    alias_values.append(e.text.strip())
-                else:
-                    for c in e:
-                        if (c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag) == "Nm" and c.text and c.text.strip():
-                            alias_values.append(c.text.strip())
-                            break
-
-        parties.append({
-            "role": "party",
-            "name": name_value,
-            "names": [name_value] if name_value else None,
-            "aliases": alias_values or None,
-            "address": address_obj,
-            "addresses": [address_obj],
-            "contact": {
-                "countryOfResidence": None, "residencyStatus": None, "placeOfBirth": None, "dateOfBirth": None,
-                "provinceOfBirth": None, "cityOfBirth": None, "countryOfBirth": None,
-                "prefix": None, "contactName": None, "phone": None, "mobile": None, "fax": None,
-                "url": None, "email": None, "emailPurpose": None, "jobTitle": None,
-                "responsibility": None, "department": None, "channelType": None, "channelId": None,
-                "preferredMethod": None
-            },
-            "account": {"iban": None, "other": None, "others": [], "bic": None, "currency": None, "name": None, "accountId": None},
-            "identifiers": {"id": None, "anyBIC": None, "lei": None, "other": []},
-            "financialInstitution": {"bic": None, "lei": None, "clearingSystemId": None, "clearingMemberId": None, "other": [], "branch": None}
-        })
+        parties.append(_index_safeguard_party(ix, element, name_value))
 
     settlement_date_value = None
     cash_settlement_date_value = None
@@ -1496,62 +1125,41 @@ def parse(iso20022xml: bytes):
     total_settlement_amount_currency_value = None
     extension_list = []
 
-    for element in document_element.iter():
-        ancestor_is_order = False
-        cur = element
-        while cur in parent_map:
-            cur = parent_map[cur]
-            if (cur.tag.split("}")[-1] if isinstance(cur.tag, str) else cur.tag) == "IndvOrdrDtls":
-                ancestor_is_order = True
-                break
-        if ancestor_is_order:
+    for element in ix.select(document, _TRANSACTION_TAGS):
+        if under_order[element]:
             continue
-        tag_name = element.tag.split("}")[-1] if isinstance(element.tag, str) else element.tag
-        if tag_name in ("ReqdExctnDt", "IntrBkSttlmDt", "SttlmDt") and element.text and element.text.strip():
-            settlement_date_value = element.text.strip()
-        if tag_name in ("CshSttlmDt",) and element.text and element.text.strip():
-            cash_settlement_date_value = element.text.strip()
-        if tag_name in ("ReqdFutrTradDt",) and element.text and element.text.strip():
-            requested_future_trade_date_value = element.text.strip()
-        if tag_name in ("OrdrDtTm",) and element.text and element.text.strip():
-            order_date_time_value = element.text.strip()
-        if tag_name == "PlcOfTrad":
-            for c in element:
-                if (c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag) == "Xchg" and c.text and c.text.strip():
-                    place_of_trade_exchange_value = c.text.strip()
-        if tag_name == "PoolRef":
-            for c in element:
-                if (c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag) == "Ref" and c.text and c.text.strip():
-                    pool_reference_value = c.text.strip()
-        if tag_name == "PrvsRef":
-            for c in element:
-                if (c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag) == "Ref" and c.text and c.text.strip():
-                    previous_reference_value = c.text.strip()
-        if tag_name in ("MstrRef", "MstrId") and element.text and element.text.strip():
-            master_reference_value = element.text.strip()
-        if tag_name == "CpyDtls":
-            for c in element.iter():
-                cn = c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag
-                if cn == "OrgnlRcvr":
-                    for z in c.iter():
-                        zn = z.tag.split("}")[-1] if isinstance(z.tag, str) else z.tag
-                        if zn == "BICFI" and z.text and z.text.strip():
-                            original_receiver_bic_value = z.text.strip()
-                        elif z.text and z.text.strip() and original_receiver_bic_value is None:
-                            original_receiver_bic_value = z.text.strip()
-        if tag_name == "TtlSttlmAmt":
-            if element.get("Ccy") and element.text and element.text.strip():
-                total_settlement_amount_value = element.text.strip()
-                total_settlement_amount_currency_value = element.get("Ccy")
-        if tag_name == "Xtnsn":
-            place_and_name_value = None
-            text_value = None
-            for c in element:
-                cn = c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag
-                if cn == "PlcAndNm" and c.text and c.text.strip():
-                    place_and_name_value = c.text.strip()
-                elif cn == "Txt" and c.text and c.text.strip():
-                    text_value = c.text.strip()
+        tag_name = names[element]
+        text = texts[element]
+        if tag_name in ("ReqdExctnDt", "IntrBkSttlmDt", "SttlmDt"):
+            settlement_date_value = text or settlement_date_value
+        elif tag_name == "CshSttlmDt":
+            cash_settlement_date_value = text or cash_settlement_date_value
+        elif tag_name == "ReqdFutrTradDt":
+            requested_future_trade_date_value = text or requested_future_trade_date_value
+        elif tag_name == "OrdrDtTm":
+            order_date_time_value = text or order_date_time_value
+        elif tag_name == "PlcOfTrad":
+            place_of_trade_exchange_value = ix.child_text(element, "Xchg") or place_of_trade_exchange_value
+        elif tag_name == "PoolRef":
+            pool_reference_value = ix.child_text(element, "Ref") or pool_reference_value
+        elif tag_name == "PrvsRef":
+            previous_reference_value = ix.child_text(element, "Ref") or previous_reference_value
+        elif tag_name in ("MstrRef", "MstrId"):
+            master_reference_value = text or master_reference_value
+        elif tag_name == "CpyDtls":
+            for receiver in ix.within(element, "OrgnlRcvr"):
+                for z in range(receiver, ends[receiver]):
+                    if names[z] == "BICFI" and texts[z]:
+                        original_receiver_bic_value = texts[z]
+                    elif texts[z] and original_receiver_bic_value is None:
+                        original_receiver_bic_value = texts[z]
+        elif tag_name == "TtlSttlmAmt":
+            if elements[element].get("Ccy") and text:
+                total_settlement_amount_value = text
+                total_settlement_amount_currency_value = elements[element].get("Ccy")
+        else:
+            place_and_name_value = ix.child_text(element, "PlcAndNm")
+            text_value = ix.child_text(element, "Txt")
             if place_and_name_value or text_value:
                 extension_list.append({"placeAndName": place_and_name_value, "text": text_value})
 
@@ -1568,146 +1176,105 @@ def parse(iso20022xml: bytes):
     enclosures_list = []
     transaction_additional_info_value = None
 
-    for element in document_element.iter():
-        tag_name = element.tag.split("}")[-1] if isinstance(element.tag, str) else element.tag
-        if tag_name == "XtndOrPayReqDtls":
-            for e in element.iter():
-                en = e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag
-                if en == "UdrtkgId":
-                    for u in e.iter():
-                        un = u.tag.split("}")[-1] if isinstance(u.tag, str) else u.tag
-                        if un == "Id" and u.text and u.text.strip():
-                            undertaking_id_value = u.text.strip()
-                        elif un == "ApplcntRefNb" and u.text and u.text.strip():
-                            applicant_reference_value = u.text.strip()
-                elif en == "ReqdXpryDt" and e.text and e.text.strip():
-                    requested_expiry_date_value = e.text.strip()
-                elif en == "BkInstrs":
-                    for b in e:
-                        bn = b.tag.split("}")[-1] if isinstance(b.tag, str) else b.tag
-                        if bn == "Txt" and b.text and b.text.strip():
-                            bank_instr_text_value = b.text.strip()
-                        elif bn == "LastDtForRspn" and b.text and b.text.strip():
-                            bank_instr_last_date_value = b.text.strip()
-                elif en == "DmndDtls":
-                    for d in e.iter():
-                        dn = d.tag.split("}")[-1] if isinstance(d.tag, str) else d.tag
-                        if dn == "Id" and d.text and d.text.strip():
-                            demand_id_value = d.text.strip()
-                        elif dn == "SubmissnDtTm" and d.text and d.text.strip():
-                            demand_submission_dt_value = d.text.strip()
-                        elif dn == "Amt":
-                            if d.text and d.text.strip():
-                                demand_amount_value = d.text.strip()
-                            ccy_attr = d.get("Ccy")
-                            if ccy_attr:
-                                demand_amount_currency_value = ccy_attr
-                        elif dn == "AddtlInf" and d.text and d.text.strip():
-                            demand_additional_info_value = d.text.strip()
-                elif en == "AddtlInf" and e.text and e.text.strip():
-                    if transaction_additional_info_value is None:
-                        transaction_additional_info_value = e.text.strip()
-                elif en == "NclsdFile":
-                    type_id = None
-                    type_scheme_name = None
-                    type_issuer = None
-                    file_id = None
-                    file_format = None
-                    file_content = None
-                    for nf in e:
-                        nfn = nf.tag.split("}")[-1] if isinstance(nf.tag, str) else nf.tag
-                        if nfn == "Tp":
-                            for tp in nf.iter():
-                                tpn = tp.tag.split("}")[-1] if isinstance(tp.tag, str) else tp.tag
-                                if tpn == "Prtry":
-                                    for pr in tp:
-                                        prn = pr.tag.split("}")[-1] if isinstance(pr.tag, str) else pr.tag
-                                        if prn == "Id" and pr.text and pr.text.strip():
-                                            type_id = pr.text.strip()
-                                        elif prn == "Issr" and pr.text and pr.text.strip():
-                                            type_issuer = pr.text.strip()
-                                        elif prn == "SchmeNm":
-                                            for q in pr:
-                                                qn = q.tag.split("}")[-1] if isinstance(q.tag, str) else q.tag
-                                                if qn == "Prtry" and q.text and q.text.strip():
-                                                    type_scheme_name = q.text.strip()
-                        elif nfn == "Id" and nf.text and nf.text.strip():
-                            file_id = nf.text.strip()
-                        elif nfn == "Frmt":
-                            for fr in nf:
-                                frn = fr.tag.split("}")[-1] if isinstance(fr.tag, str) else fr.tag
-                                if frn == "Cd" and fr.text and fr.text.strip():
-                                    file_format = fr.text.strip()
-                        elif nfn in ("Nclsr", "NclsrCntt") and nf.text and nf.text.strip():
-                            file_content = nf.text.strip()
-                    enclosure_obj = {
-                        "type": {"id": type_id, "schemeName": type_scheme_name, "issuer": type_issuer},
-                        "id": file_id,
-                        "format": file_format,
-                        "contentBase64": file_content
-                    }
-                    if any(v for v in enclosure_obj.values()):
-                        enclosures_list.append(enclosure_obj)
+    for request in ix.within(document, "XtndOrPayReqDtls"):
+        for e in ix.select(request, ("UdrtkgId", "ReqdXpryDt", "BkInstrs", "DmndDtls", "AddtlInf", "NclsdFile")):
+            en = names[e]
+            if en == "UdrtkgId":
+                for u in range(e, ends[e]):
+                    if names[u] == "Id" and texts[u]:
+                        undertaking_id_value = texts[u]
+                    elif names[u] == "ApplcntRefNb" and texts[u]:
+                        applicant_reference_value = texts[u]
+            elif en == "ReqdXpryDt":
+                requested_expiry_date_value = texts[e] or requested_expiry_date_value
+            elif en == "BkInstrs":
+                bank_instr_text_value = ix.child_text(e, "Txt") or bank_instr_text_value
+                bank_instr_last_date_value = ix.child_text(e, "LastDtForRspn") or bank_instr_last_date_value
+            elif en == "DmndDtls":
+                for d in range(e, ends[e]):
+                    dn = names[d]
+                    if dn == "Id" and texts[d]:
+                        demand_id_value = texts[d]
+                    elif dn == "SubmissnDtTm" and texts[d]:
+                        demand_submission_dt_value = texts[d]
+                    elif dn == "Amt":
+                        if texts[d]:
+                            demand_amount_value = texts[d]
+                        ccy_attr = elements[d].get("Ccy")
+                        if ccy_attr:
+                            demand_amount_currency_value = ccy_attr
+                    elif dn == "AddtlInf" and texts[d]:
+                        demand_additional_info_value = texts[d]
+            elif en == "AddtlInf":
+                if texts[e] and transaction_additional_info_value is None:
+                    transaction_additional_info_value = texts[e]
+            else:
+                type_id = type_scheme_name = type_issuer = None
+                file_id = file_format = file_content = None
+                for nf in ix.children(e):
+                    nfn = names[nf]
+                    if nfn == "Tp":
+                        for tp in ix.within(nf, "Prtry"):
+                            for pr in ix.children(tp):
+                                prn = names[pr]
+                                if prn == "Id" and texts[pr]:
+                                    type_id = texts[pr]
+                                elif prn == "Issr" and texts[pr]:
+                                    type_issuer = texts[pr]
+                                elif prn == "SchmeNm":
+                                    type_scheme_name = ix.child_text(pr, "Prtry") or type_scheme_name
+                    elif nfn == "Id" and texts[nf]:
+                        file_id = texts[nf]
+                    elif nfn == "Frmt":
+                        file_format = ix.child_text(nf, "Cd") or file_format
+                    elif nfn in ("Nclsr", "NclsrCntt") and texts[nf]:
+                        file_content = texts[nf]
+                # "type" is always a non-empty dict, so every NclsdFile is kept.
+                enclosures_list.append({
+                    "type": {"id": type_id, "schemeName": type_scheme_name, "issuer": type_issuer},
+                    "id": file_id,
+                    "format": file_format,
+                    "contentBase64": file_content
+                })
 
     orders_list = []
-    for element in document_element.iter():
-        if (element.tag.split("}")[-1] if isinstance(element.tag, str) else element.tag) != "IndvOrdrDtls":
-            continue
-        or_ref = None
-        cl_ref = None
-        units = None
-        st_amt = None
-        st_ccy = None
-        cash_dt = None
-        st_dt = None
-        ord_isin = None
-        ord_name = None
-        dbtr_iban = None
-        cdtr_iban = None
-        dbtr_bic = None
-        cdtr_bic = None
-        for c in element.iter():
-            cn = c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag
-            if cn == "OrdrRef" and c.text and c.text.strip():
-                or_ref = c.text.strip()
-            elif cn == "ClntRef" and c.text and c.text.strip():
-                cl_ref = c.text.strip()
-            elif cn == "UnitsNb" and c.text and c.text.strip():
-                units = c.text.strip()
-            elif cn == "SttlmAmt" and c.get("Ccy") and c.text and c.text.strip():
-                st_amt = c.text.strip()
-                st_ccy = c.get("Ccy")
-            elif cn in ("CshSttlmDt",) and c.text and c.text.strip():
-                cash_dt = c.text.strip()
-            elif cn in ("ReqdExctnDt", "SttlmDt") and c.text and c.text.strip():
-                st_dt = c.text.strip()
-            elif cn == "FinInstrmDtls":
-                for z in c.iter():
-                    zn = z.tag.split("}")[-1] if isinstance(z.tag, str) else z.tag
-                    if zn == "ISIN" and z.text and z.text.strip():
-                        ord_isin = z.text.strip()
-                    elif zn in ("Nm", "FullNm", "ShrtNm") and z.text and z.text.strip() and ord_name is None:
-                        ord_name = z.text.strip()
+    for order in ix.within(document, "IndvOrdrDtls"):
+        or_ref = cl_ref = units = st_amt = st_ccy = cash_dt = st_dt = ord_isin = ord_name = None
+        dbtr_iban = cdtr_iban = dbtr_bic = cdtr_bic = None
+        for c in ix.select(order, _ORDER_TAGS):
+            cn = names[c]
+            ct = texts[c]
+            if cn == "FinInstrmDtls":
+                for z in range(c, ends[c]):
+                    zn = names[z]
+                    if zn == "ISIN" and texts[z]:
+                        ord_isin = texts[z]
+                    elif zn in ("Nm", "FullNm", "ShrtNm") and texts[z] and ord_name is None:
+                        ord_name = texts[z]
             elif cn == "DbtrAcct":
-                for z in c.iter():
-                    zn = z.tag.split("}")[-1] if isinstance(z.tag, str) else z.tag
-                    if zn == "IBAN" and z.text and z.text.strip():
-                        dbtr_iban = z.text.strip()
+                dbtr_iban = ix.last_text(c, "IBAN") or dbtr_iban
             elif cn == "CdtrAcct":
-                for z in c.iter():
-                    zn = z.tag.split("}")[-1] if isinstance(z.tag, str) else z.tag
-                    if zn == "IBAN" and z.text and z.text.strip():
-                        cdtr_iban = z.text.strip()
+                cdtr_iban = ix.last_text(c, "IBAN") or cdtr_iban
             elif cn == "DbtrAgt":
-                for z in c.iter():
-                    zn = z.tag.split("}")[-1] if isinstance(z.tag, str) else z.tag
-                    if zn == "BICFI" and z.text and z.text.strip():
-                        dbtr_bic = z.text.strip()
+                dbtr_bic = ix.last_text(c, "BICFI") or dbtr_bic
             elif cn == "CdtrAgt":
-                for z in c.iter():
-                    zn = z.tag.split("}")[-1] if isinstance(z.tag, str) else z.tag
-                    if zn == "BICFI" and z.text and z.text.strip():
-                        cdtr_bic = z.text.strip()
+                cdtr_bic = ix.last_text(c, "BICFI") or cdtr_bic
+            elif not ct:
+                continue
+            elif cn == "OrdrRef":
+                or_ref = ct
+            elif cn == "ClntRef":
+                cl_ref = ct
+            elif cn == "UnitsNb":
+                units = ct
+            elif cn == "SttlmAmt":
+                if elements[c].get("Ccy"):
+                    st_amt = ct
+                    st_ccy = elements[c].get("Ccy")
+            elif cn == "CshSttlmDt":
+                cash_dt = ct
+            else:
+                st_dt = ct
 
         order_obj = {}
         if or_ref:
@@ -1751,83 +1318,43 @@ def parse(iso20022xml: bytes):
     request_type_scheme_value = None
     request_type_issuer_value = None
 
-    for e in document_element.iter():
-        en = e.tag.split("}")[-1] if isinstance(e.tag, str) else e.tag
+    for e in ix.select(document, _PAYMENT_TAGS):
+        en = names[e]
         if en == "PmtId":
-            for c in e:
-                cn = c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag
-                if cn == "InstrId" and c.text and c.text.strip():
-                    payment_instr_id_value = c.text.strip()
-                elif cn == "EndToEndId" and c.text and c.text.strip():
-                    payment_end_to_end_id_value = c.text.strip()
-                elif cn == "TxId" and c.text and c.text.strip():
-                    payment_tx_id_value = c.text.strip()
+            payment_instr_id_value = ix.child_text(e, "InstrId") or payment_instr_id_value
+            payment_end_to_end_id_value = ix.child_text(e, "EndToEndId") or payment_end_to_end_id_value
+            payment_tx_id_value = ix.child_text(e, "TxId") or payment_tx_id_value
         elif en in ("InstdAmt", "IntrBkSttlmAmt", "Amt"):
-            if e.text and e.text.strip():
-                payment_amount_value = e.text.strip()
-            ccy_attr = e.get("Ccy")
+            if texts[e]:
+                payment_amount_value = texts[e]
+            ccy_attr = elements[e].get("Ccy")
             if ccy_attr:
                 payment_amount_currency_value = ccy_attr
         elif en == "PmtTpInf":
-            for c in e.iter():
-                cn = c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag
+            for c in ix.select(e, ("SvcLvl", "LclInstrm", "CtgyPurp")):
+                cn = names[c]
                 if cn == "SvcLvl":
-                    for z in c:
-                        zn = z.tag.split("}")[-1] if isinstance(z.tag, str) else z.tag
-                        if zn == "Cd" and z.text and z.text.strip():
-                            service_level_code_value = z.text.strip()
-                        elif zn == "Prtry" and z.text and z.text.strip():
-                            service_level_proprietary_value = z.text.strip()
+                    service_level_code_value = ix.child_text(c, "Cd") or service_level_code_value
+                    service_level_proprietary_value = ix.child_text(c, "Prtry") or service_level_proprietary_value
                 elif cn == "LclInstrm":
-                    for z in c:
-                        zn = z.tag.split("}")[-1] if isinstance(z.tag, str) else z.tag
-                        if zn == "Cd" and z.text and z.text.strip():
-                            local_instrument_code_value = z.text.strip()
-                        elif zn == "Prtry" and z.text and z.text.strip():
-                            local_instrument_proprietary_value = z.text.strip()
-                elif cn == "CtgyPurp":
-                    for z in c:
-                        zn = z.tag.split("}")[-1] if isinstance(z.tag, str) else z.tag
-                        if zn == "Cd" and z.text and z.text.strip():
-                            category_purpose_code_value = z.text.strip()
-        elif en == "ChrgBr" and e.text and e.text.strip():
-            charge_bearer_value = e.text.strip()
+                    local_instrument_code_value = ix.child_text(c, "Cd") or local_instrument_code_value
+                    local_instrument_proprietary_value = ix.child_text(c, "Prtry") or local_instrument_proprietary_value
+                else:
+                    category_purpose_code_value = ix.child_text(c, "Cd") or category_purpose_code_value
+        elif en == "ChrgBr":
+            charge_bearer_value = texts[e] or charge_bearer_value
         elif en == "Purp":
-            for c in e:
-                cn = c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag
-                if cn == "Cd" and c.text and c.text.strip():
-                    purpose_code_value = c.text.strip()
+            purpose_code_value = ix.child_text(e, "Cd") or purpose_code_value
         elif en == "RmtInf":
-            texts = []
-            for c in e.iter():
-                cn = c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag
-                if cn == "Ustrd" and c.text and c.text.strip():
-                    texts.append(c.text.strip())
-                if cn == "Ref" and c.text and c.text.strip():
-                    texts.append(c.text.strip())
-            if texts:
-                remittance_information_value = " | ".join(texts)
-        elif en == "ReqTp":
-            for c in e:
-                cn = c.tag.split("}")[-1] if isinstance(c.tag, str) else c.tag
-                if cn == "Id" and c.text and c.text.strip():
-                    request_type_id_value = c.text.strip()
-                elif cn == "SchmeNm":
-                    for z in c:
-                        zn = z.tag.split("}")[-1] if isinstance(z.tag, str) else z.tag
-                        if zn == "Prtry" and z.text and z.text.strip():
-                            request_type_scheme_value = z.text.strip()
-                elif cn == "Issr" and c.text and c.text.strip():
-                    request_type_issuer_value = c.text.strip()
-
-    def _is_currency_role(role):
-        if not isinstance(role, str):
-            return False
-        if role == "Ccy":
-            return True
-        if role.endswith("Ccy"):
-            return True
-        return False
+            remittance_texts = [texts[c] for c in ix.select(e, ("Ustrd", "Ref")) if texts[c]]
+            if remittance_texts:
+                remittance_information_value = " | ".join(remittance_texts)
+        else:
+            request_type_id_value = ix.child_text(e, "Id") or request_type_id_value
+            for c in ix.children(e):
+                if names[c] == "SchmeNm":
+                    request_type_scheme_value = ix.child_text(c, "Prtry") or request_type_scheme_value
+            request_type_issuer_value = ix.child_text(e, "Issr") or request_type_issuer_value
 
     parties = [p for p in parties if not _is_currency_role(p.get("role"))]
 
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from database import get_list_metadata
+from sourcefetch import fetch_source
+from OFACload import OFAC_CONS_SOURCE, OFAC_SDN_SOURCE, OFAC_fetch_cons_path, OFAC_fetch_sdn_path, OFAC_extract_stream
+from UKload import UK_SOURCE, UK_fetch_path, UK_extract_stream
+from UNload import UN_SOURCE, UN_fetch_path, UN_extract_stream
+from EUCFSLload import EU_SOURCE, EU_fetch_path, EU_extract_stream
+from AUload import AU_SOURCE, AU_fetch, AU_extract
+from CAload import CA_SOURCE, CA_fetch_path, CA_extract_stream
+from SECOload import SECO_SOURCE, SECO_fetch_path, SECO_extract_stream
+
+# (source, fetch, extract) per list, keyed by the listsUsed names in screening._LOG_SOURCES;
+# source is the (key, url, log file) the loader hands to fetch_source(). The XML lists are
+# fetched as a file path and extracted with iterparse, one entry in memory at a time.
+LIST_LOADERS = {
+    "OFAC consolidated": (OFAC_CONS_SOURCE, OFAC_fetch_cons_path, OFAC_extract_stream),
+    "OFAC SDN": (OFAC_SDN_SOURCE, OFAC_fetch_sdn_path, OFAC_extract_stream),
+    "UK consolidated": (UK_SOURCE, UK_fetch_path, UK_extract_stream),
+    "UN consolidated": (UN_SOURCE, UN_fetch_path, UN_extract_stream),
+    "EU consolidated": (EU_SOURCE, EU_fetch_path, EU_extract_stream),
+    "AU consolidated": (AU_SOURCE, AU_fetch, AU_extract),
+    "CA consolidated": (CA_SOURCE, CA_fetch_path, CA_extract_stream),
+    "SECO consolidated": (SECO_SOURCE, SECO_fetch_path, SECO_extract_stream),
+}
+
+
+def check_source(name: str) -> Dict[str, Any]:
+    """Conditional download of one list's source into the source cache. Never raises."""
+    source = LIST_LOADERS[name][0]
+    report: Dict[str, Any] = {"sourceHash": None, "etag": None, "notModified": False, "stale": False,
+                              "checkSeconds": None, "error": None}
+    started = time.perf_counter()
+    try:
+        fetched = fetch_source(*source)
+        report.update(sourceHash=fetched.content_hash, etag=fetched.etag,
+                      notModified=fetched.not_modified, stale=fetched.stale)
+    except Exception as e:
+        report["error"] = f"{e.__class__.__name__}: {e}"
+        logging.warning("checking %s failed", name, exc_info=True)
+    report["checkSeconds"] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def check_sources(workers: int) -> Dict[str, Dict[str, Any]]:
+    """check_source() for every list, on threads: the checks only wait on the network."""
+    names = [name for name, (source, _, _) in LIST_LOADERS.items() if source is not None]
+    if not names:
+        return {}
+    with ThreadPoolExecutor(max(1, min(workers, len(names))), thread_name_prefix="list-check") as executor:
+        return dict(zip(names, executor.map(check_source, names)))
+
+
+def sources_unchanged(checks: Dict[str, Dict[str, Any]]) -> bool:
+    """True when every list's source matches the download the current database was built from."""
+    if set(checks) != set(LIST_LOADERS):
+        return False
+    stored = get_list_metadata()
+    for name, check in checks.items():
+        if check["error"] or check["stale"] or not check["sourceHash"]:
+            return False
+        if (stored.get(name) or {}).get("sourceHash") != check["sourceHash"]:
+            return False
+    return True
+
+
+# Rows per pickle in a spill file; bounds what a worker or the build holds of one list.
+SPILL_CHUNK_ROWS = 1000
+
+
+def _row_digest_bytes(row: dict) -> bytes:
+    return json.dumps(row, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+
+
+class SpilledRows:
+    """
+    One list's extracted rows in a temporary file, as pickled chunks of
+    SPILL_CHUNK_ROWS. Iterating reads them back a chunk at a time and deletes
+    the file once it is done (or abandoned), so the rows can be consumed once.
+    """
+
+    def __init__(self, path: str, rows: int):
+        self.path = path
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __iter__(self) -> Iterator[dict]:
+        try:
+            with open(self.path, "rb") as f:
+                while True:
+                    try:
+                        chunk = pickle.load(f)
+                    except EOFError:
+                        return
+                    yield from chunk
+        finally:
+            self.discard()
+
+    def discard(self) -> None:
+        Path(self.path).unlink(missing_ok=True)
+
+
+def spill_rows(rows: Iterable[dict], provenance: Optional[Dict[str, str]] = None) -> Tuple[SpilledRows, str]:
+    """
+    Write rows to a SpilledRows file as they are extracted: (spilled rows,
+    sha256 of them as one JSON array). Rows get the keys of `provenance` they do not carry
+    themselves, after hashing, so the hash only follows the extracted rows.
+    """
+    fd, path = tempfile.mkstemp(prefix="aml-list-", suffix=".pickle")
+    digest = hashlib.sha256(b"[")
+    count = 0
+    chunk: List[dict] = []
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for row in rows:
+                if count:
+                    digest.update(b", ")
+                digest.update(_row_digest_bytes(row))
+                count += 1
+                if provenance:
+                    for key, value in provenance.items():
+                        row.setdefault(key, value)
+                chunk.append(row)
+                if len(chunk) >= SPILL_CHUNK_ROWS:
+                    pickle.dump(chunk, f, pickle.HIGHEST_PROTOCOL)
+                    chunk = []
+            if chunk:
+                pickle.dump(chunk, f, pickle.HIGHEST_PROTOCOL)
+    except BaseException:
+        Path(path).unlink(missing_ok=True)
+        raise
+    digest.update(b"]")
+    return SpilledRows(path, count), "sha256:" + digest.hexdigest()
+
+
+def drain_rows(rows_by_list: Dict[str, Iterable[dict]]) -> Iterator[dict]:
+    """Every row, list by list, dropping each list from rows_by_list once it has been consumed."""
+    for name in list(rows_by_list):
+        yield from rows_by_list.pop(name)
+
+
+def discard_rows(rows_by_list: Dict[str, Iterable[dict]]) -> None:
+    """Delete the spill files of lists that will not be consumed, e.g. when the build is abandoned."""
+    for rows in rows_by_list.values():
+        if isinstance(rows, SpilledRows):
+            rows.discard()
+    rows_by_list.clear()
+
+
+def source_provenance(name: str, check: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """source_url and source_etag (the ETag, else the download's content hash) for a list's provenance rows."""
+    source = LIST_LOADERS[name][0]
+    provenance = {}
+    if source is not None:
+        provenance["source_url"] = source[1]
+    etag = (check or {}).get("etag") or (check or {}).get("sourceHash")
+    if etag:
+        provenance["source_etag"] = etag
+    return provenance
+
+
+def load_list(
+    name: str, revalidate: bool = True, provenance: Optional[Dict[str, str]] = None
+) -> Tuple[Optional[SpilledRows], Dict[str, Any]]:
+    """
+    Fetch and extract one list into a spill file (see spill_rows):
+    (spilled rows or None, timing/error report). Never raises.
+    """
+    _, fetch, extract = LIST_LOADERS[name]
+    report: Dict[str, Any] = {"rows": 0, "contentHash": None, "fetchSeconds": None, "extractSeconds": None, "error": None}
+    started = time.perf_counter()
+    try:
+        raw = fetch(revalidate=revalidate)
+        fetched = time.perf_counter()
+        report["fetchSeconds"] = round(fetched - started, 3)
+        rows, report["contentHash"] = spill_rows(extract(raw), provenance)
+        report["extractSeconds"] = round(time.perf_counter() - fetched, 3)
+        report["rows"] = len(rows)
+        return rows, report
+    except Exception as e:
+        report["error"] = f"{e.__class__.__name__}: {e}"
+        logging.error("loading %s failed", name, exc_info=True)
+        return None, report
+
+
+def load_lists(
+    workers: int, force: bool = False
+) -> Tuple[Optional[Dict[str, SpilledRows]], Dict[str, Dict[str, Any]]]:
+    """
+    Every list in LIST_LOADERS, up to `workers` at a time in separate
+    processes. First each source gets a conditional request (check_sources);
+    if every one answers 304 or with the same bytes the current database was
+    built from, nothing is extracted and (None, report) is returned unless
+    force is set. Otherwise each worker extracts its own list from the
+    download just cached into a spill file: only a file name and the report
+    cross the process boundary, so the parent never holds a list's rows.
+    Returns (spilled rows by list for the lists that loaded, in LIST_LOADERS
+    order, and report by list); a failing list does not stop the others.
+    The caller consumes the rows with drain_rows() or drops them with
+    discard_rows().
+    """
+    names = list(LIST_LOADERS)
+    checks = check_sources(workers)
+    if not force and sources_unchanged(checks):
+        return None, {name: dict(checks[name], rows=0, unchanged=True) for name in names}
+    # A list whose check failed gets one more try in its worker, then its bundled backup.
+    revalidate = {name: name not in checks or checks[name]["error"] is not None for name in names}
+    provenance = {name: source_provenance(name, checks.get(name)) for name in names}
+    results: Dict[str, Tuple[Optional[SpilledRows], Dict[str, Any]]] = {}
+    if workers <= 1:
+        for name in names:
+            results[name] = load_list(name, revalidate[name], provenance[name])
+    else:
+        # spawn: refresh runs inside the API process, which has live threads.
+        with ProcessPoolExecutor(
+            min(workers, len(names)), mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            futures = {executor.submit(load_list, name, revalidate[name], provenance[name]): name for name in names}
+            for future in as_completed(futures):
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    # The worker itself died (BrokenProcessPool); load_list() catches everything else.
+                    results[futures[future]] = (None, {"rows": 0, "contentHash": None, "fetchSeconds": None,
+                                                       "extractSeconds": None, "error": f"{e.__class__.__name__}: {e}"})
+    rows_by_list: Dict[str, SpilledRows] = {}
+    report: Dict[str, Dict[str, Any]] = {}
+    # LIST_LOADERS order, whichever worker finished first: entry ids follow the build order.
+    for name in names:
+        rows, list_report = results[name]
+        report[name] = dict(checks.get(name, {}), **list_report)
+        if rows is not None:
+            rows_by_list[name] = rows
+    return rows_by_list, report
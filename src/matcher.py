@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+from array import array
 from datetime import datetime, timezone
 import json
 import re
 import unicodedata
 from typing import Any, Dict, Iterable, List, Sequence, Tuple
 
+import numpy as np
+
 from countrycode import country_to_iso2
 from rules import apply_risklevel_rules
 
@@ -361,6 +364,152 @@ def normalize_record(record_tuple: Sequence[Any]) -> Dict[str, Any]:
     }
     return normalized
 
+class TokenDictionary:
+    """
+    Global token -> integer id mapping of one sanctions build. Sanctions-side
+    token sets are stored as sorted id arrays against it; party tokens are
+    looked up at request time and unknown ones can never match a record.
+    """
+
+    __slots__ = ("ids", "terms")
+
+    def __init__(self, tokens: Iterable[str]):
+        self.ids: Dict[str, int] = {}
+        self.terms: List[str] = []
+        for token in tokens:
+            if token not in self.ids:
+                self.ids[token] = len(self.terms)
+                self.terms.append(token)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def encode(self, tokens: Iterable[str]) -> array:
+        """Sorted distinct ids of known tokens; unknown tokens are dropped."""
+        ids = self.ids
+        return array("I", sorted({ids[token] for token in tokens if token in ids}))
+
+    def encode_sequence(self, tokens: Iterable[str]) -> array:
+        """Ids of `tokens` in order, repeats kept; every token must be known."""
+        ids = self.ids
+        return array("I", (ids[token] for token in tokens))
+
+    def decode(self, token_ids: Iterable[int]) -> List[str]:
+        terms = self.terms
+        return [terms[token_id] for token_id in token_ids]
+
+
+class PreparedRecord:
+    """
+    A sanctions record normalized and tokenized once, ready for evaluate_match.
+    Encoded against a TokenDictionary, its name, alias and address tokens are
+    held only as id arrays in token order (the *_sequence attributes) and
+    decoded on access; otherwise they are plain string lists.
+    """
+
+    __slots__ = ("key", "norm", "tokens", "name_sequence", "alias_sequences", "address_sequences")
+
+    def __init__(self, key, norm, name_sequence, alias_sequences, address_sequences, tokens=None):
+        self.key = key
+        self.norm = norm
+        self.tokens = tokens
+        self.name_sequence = name_sequence
+        self.alias_sequences = alias_sequences
+        self.address_sequences = address_sequences
+
+    @property
+    def name_tokens(self) -> List[str]:
+        if self.tokens is None:
+            return self.name_sequence
+        return self.tokens.decode(self.name_sequence)
+
+    @property
+    def alias_tokens(self) -> List[List[str]]:
+        if self.tokens is None:
+            return self.alias_sequences
+        return [self.tokens.decode(ids) for ids in self.alias_sequences]
+
+    @property
+    def address_tokens(self) -> List[List[str]]:
+        if self.tokens is None:
+            return self.address_sequences
+        return [self.tokens.decode(ids) for ids in self.address_sequences]
+
+    @property
+    def name_ids(self) -> array | None:
+        """Sorted distinct ids of the name tokens; None unless encoded."""
+        return array("I", sorted(set(self.name_sequence))) if self.tokens is not None else None
+
+
+def prepare_record(record_tuple: Sequence[Any], tokens: TokenDictionary | None = None) -> PreparedRecord:
+    rec_norm = normalize_record(record_tuple)
+    prepared = PreparedRecord(
+        (rec_norm["list_name"], rec_norm["list_id"]),
+        rec_norm,
+        tokenize(rec_norm.get("name", "")),
+        [tokenize(alias) for alias in rec_norm.get("aliases", [])],
+        [tokenize(address) for address in rec_norm.get("addresses", [])],
+    )
+    return encode_prepared(prepared, tokens) if tokens is not None else prepared
+
+
+def encode_prepared(prepared: PreparedRecord, tokens: TokenDictionary) -> PreparedRecord:
+    """Re-hold the record's tokens as ids of `tokens`, which must know all of them."""
+    if prepared.tokens is tokens:
+        return prepared
+    name, aliases, addresses = prepared.name_tokens, prepared.alias_tokens, prepared.address_tokens
+    prepared.tokens = tokens
+    prepared.name_sequence = tokens.encode_sequence(name)
+    prepared.alias_sequences = [tokens.encode_sequence(alias) for alias in aliases]
+    prepared.address_sequences = [tokens.encode_sequence(address) for address in addresses]
+    return prepared
+
+
+def prepared_token_vocabulary(records: Iterable[PreparedRecord]) -> List[str]:
+    """Every token used by the records, sorted, for building a TokenDictionary."""
+    vocabulary = set()
+    for prepared in records:
+        vocabulary.update(prepared.name_tokens)
+        for tokens in prepared.alias_tokens:
+            vocabulary.update(tokens)
+        for tokens in prepared.address_tokens:
+            vocabulary.update(tokens)
+    return sorted(vocabulary)
+
+
+# Bump when normalize_record/tokenize or the payload below change so persisted
+# features are rebuilt.
+FEATURES_VERSION = "3"
+
+
+def prepared_to_json(prepared: PreparedRecord) -> str:
+    """The normalized record and its token id sequences; the record must be encoded."""
+    if prepared.tokens is None:
+        raise ValueError("prepared_to_json needs a record encoded against a TokenDictionary")
+    return json.dumps(
+        [
+            prepared.norm,
+            prepared.name_sequence.tolist(),
+            [ids.tolist() for ids in prepared.alias_sequences],
+            [ids.tolist() for ids in prepared.address_sequences],
+        ],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+
+
+def prepared_from_json(payload: str, tokens: TokenDictionary) -> PreparedRecord:
+    norm, name_ids, alias_ids, address_ids = json.loads(payload)
+    return PreparedRecord(
+        (norm["list_name"], norm["list_id"]),
+        norm,
+        array("I", name_ids),
+        [array("I", ids) for ids in alias_ids],
+        [array("I", ids) for ids in address_ids],
+        tokens,
+    )
+
+
 def matched_fields_struct(labels: Iterable[str], extras: Iterable[Dict[str, str]]) -> List[Dict[str, str]]:
     label_map: Dict[Tuple[str, str], Dict[str, str]] = {}
     for label in labels:
@@ -655,6 +804,250 @@ def evaluate_match(
     }
 
 
+def _csr(groups: Iterable[Sequence[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    ptr = [0]
+    ids: List[int] = []
+    for group in groups:
+        ids.extend(group)
+        ptr.append(len(ids))
+    return np.asarray(ptr, dtype=np.int64), np.asarray(ids, dtype=np.int64)
+
+
+def _segment_hits(mask: np.ndarray, ptr: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    hits = np.concatenate(([0], np.cumsum(mask[ids], dtype=np.int64)))
+    return hits[ptr[1:]] - hits[ptr[:-1]]
+
+
+def _jaccard(intersection: np.ndarray, party_size: int, sizes: np.ndarray) -> np.ndarray:
+    union = party_size + sizes - intersection
+    out = np.zeros(len(sizes), dtype=np.float64)
+    np.divide(intersection, union, out=out, where=union > 0)
+    return out
+
+
+class RecordMatrix:
+    """
+    Integer-encoded view of prepared records for batch scoring. Name, alias,
+    address and ID tokens are interned to ids and stored as CSR arrays (one
+    distinct, sorted id set per record or per alias/address row); city, state,
+    country and address strings are interned so equality becomes an integer
+    compare. score() applies evaluate_match's weights and thresholds to one
+    party against every record at once.
+    """
+
+    __slots__ = (
+        "records", "tokens", "texts", "places", "place_list", "id_vocab",
+        "name_ptr", "name_ids", "name_size", "name_first", "name_last",
+        "alias_owner", "alias_ptr", "alias_ids", "alias_size", "has_aliases",
+        "address_owner", "address_ptr", "address_ids", "address_size", "address_text",
+        "street", "country", "country_iso", "city", "state",
+        "id_ptr", "id_ids",
+        "has_bics", "has_ibans", "has_email", "has_dob", "has_pob_country", "has_pob_city",
+    )
+
+    def __init__(self, records: Sequence[PreparedRecord]):
+        self.records = tuple(records)
+        # Records encoded against one TokenDictionary reuse its ids; anything
+        # else is interned into a private vocabulary here.
+        shared = self.records[0].tokens if self.records else None
+        if shared is not None and any(prepared.tokens is not shared for prepared in self.records):
+            shared = None
+        tokens: Dict[str, int] = shared.ids if shared is not None else {}
+        texts: Dict[str, int] = {"": 0}
+        places: Dict[str, int] = {"": 0}
+        id_vocab: Dict[str, int] = {}
+
+        def token_ids(values):
+            if shared is not None:
+                return sorted(set(values))
+            return sorted({tokens.setdefault(value, len(tokens)) for value in values})
+
+        name_sets, alias_sets, address_sets, id_sets = [], [], [], []
+        name_first, name_last = [], []
+        alias_owner, address_owner, address_text = [], [], []
+        street, country, country_iso, city, state = [], [], [], [], []
+        flags = {key: [] for key in ("bics", "ibans", "email", "date_of_birth", "place_of_birth_country", "place_of_birth_city")}
+        for position, prepared in enumerate(self.records):
+            norm = prepared.norm
+            # Sequences are token ids when shared, strings otherwise.
+            name = prepared.name_sequence
+            name_sets.append(token_ids(name))
+            if len(name) >= 2:
+                name_first.append(name[0] if shared is not None else tokens[name[0]])
+                name_last.append(name[-1] if shared is not None else tokens[name[-1]])
+            else:
+                name_first.append(-1)
+                name_last.append(-1)
+            for alias in prepared.alias_sequences:
+                alias_owner.append(position)
+                alias_sets.append(token_ids(alias))
+            for address, address_tokens in zip(norm.get("addresses") or [], prepared.address_sequences):
+                address_owner.append(position)
+                address_sets.append(token_ids(address_tokens))
+                address_text.append(texts.setdefault(address, len(texts)))
+            street.append(texts.setdefault(norm.get("addr_street") or "", len(texts)))
+            country.append(texts.setdefault(norm.get("addr_country") or "", len(texts)))
+            country_iso.append(texts.setdefault(norm.get("addr_country_iso") or "", len(texts)))
+            city.append(places.setdefault(norm.get("addr_city") or "", len(places)))
+            state.append(places.setdefault(norm.get("addr_state") or "", len(places)))
+            id_sets.append(sorted({id_vocab.setdefault(value, len(id_vocab)) for value in norm.get("id_numbers") or []}))
+            for key, values in flags.items():
+                values.append(bool(norm.get(key)))
+
+        self.tokens = tokens
+        self.texts = texts
+        self.places = places
+        self.place_list = list(places)
+        self.id_vocab = id_vocab
+        self.name_ptr, self.name_ids = _csr(name_sets)
+        self.name_size = np.diff(self.name_ptr)
+        self.name_first = np.asarray(name_first, dtype=np.int64)
+        self.name_last = np.asarray(name_last, dtype=np.int64)
+        self.alias_owner = np.asarray(alias_owner, dtype=np.int64)
+        self.alias_ptr, self.alias_ids = _csr(alias_sets)
+        self.alias_size = np.diff(self.alias_ptr)
+        self.has_aliases = np.asarray([bool(prepared.alias_sequences) for prepared in self.records], dtype=bool)
+        self.address_owner = np.asarray(address_owner, dtype=np.int64)
+        self.address_ptr, self.address_ids = _csr(address_sets)
+        self.address_size = np.diff(self.address_ptr)
+        self.address_text = np.asarray(address_text, dtype=np.int64)
+        self.street = np.asarray(street, dtype=np.int64)
+        self.country = np.asarray(country, dtype=np.int64)
+        self.country_iso = np.asarray(country_iso, dtype=np.int64)
+        self.city = np.asarray(city, dtype=np.int64)
+        self.state = np.asarray(state, dtype=np.int64)
+        self.id_ptr, self.id_ids = _csr(id_sets)
+        self.has_bics = np.asarray(flags["bics"], dtype=bool)
+        self.has_ibans = np.asarray(flags["ibans"], dtype=bool)
+        self.has_email = np.asarray(flags["email"], dtype=bool)
+        self.has_dob = np.asarray(flags["date_of_birth"], dtype=bool)
+        self.has_pob_country = np.asarray(flags["place_of_birth_country"], dtype=bool)
+        self.has_pob_city = np.asarray(flags["place_of_birth_city"], dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _token_mask(self, values: Iterable[str], vocab: Dict[str, int]) -> Tuple[np.ndarray, int]:
+        distinct = set(values)
+        mask = np.zeros(len(vocab) + 1, dtype=bool)
+        for value in distinct:
+            token_id = vocab.get(value)
+            if token_id is not None:
+                mask[token_id] = True
+        return mask, len(distinct)
+
+    def _place_points(self, value: str, exact_points: float, partial_points: float, same, other) -> np.ndarray:
+        place_id = self.places.get(value, -1)
+        contains = np.fromiter((bool(place) and value in place for place in self.place_list), dtype=bool, count=len(self.place_list))
+        exact = same == place_id
+        partial = ((same != 0) & contains[same]) | ((other != 0) & contains[other])
+        points = np.where(exact, exact_points, np.where(partial, partial_points, 0.0))
+        return np.where((same != 0) | (other != 0), points, 0.0)
+
+    def score(
+        self,
+        party_norm: Dict[str, Any],
+        party_name_tokens: List[str],
+        party_alias_tokens: List[List[str]],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (scores, exact) for one party against every record. scores is
+        evaluate_match's score before the 1.0 cap, summed in the same order.
+        Where exact is False the record carries BIC/IBAN/e-mail/date or place
+        of birth data that is only scored per pair, and scores holds an upper
+        bound instead; evaluate_match is the authority for those records.
+        """
+        count = len(self.records)
+        score = np.zeros(count, dtype=np.float64)
+
+        party_ids = party_norm.get("id_numbers") or []
+        if party_ids:
+            mask, _ = self._token_mask(party_ids, self.id_vocab)
+            score += np.where(_segment_hits(mask, self.id_ptr, self.id_ids) > 0, 0.90, 0.0)
+
+        bound = np.zeros(count, dtype=np.float64)
+        if party_norm.get("bic"):
+            bound += np.where(self.has_bics, 0.90, 0.0)
+        if party_norm.get("iban"):
+            bound += np.where(self.has_ibans, 0.90, 0.0)
+        if party_norm.get("date_of_birth"):
+            bound += np.where(self.has_dob, 0.02, 0.0)
+        if party_norm.get("place_of_birth_country"):
+            bound += np.where(self.has_pob_country, 0.01, 0.0)
+        if party_norm.get("place_of_birth_city"):
+            bound += np.where(self.has_pob_city, 0.02, 0.0)
+        if party_norm.get("email"):
+            bound += np.where(self.has_email, 0.90, 0.0)
+
+        mask, party_size = self._token_mask(party_name_tokens, self.tokens)
+        intersection = _segment_hits(mask, self.name_ptr, self.name_ids)
+        name_jaccard = _jaccard(intersection, party_size, self.name_size)
+        name_points = np.select(
+            [name_jaccard >= 0.95, name_jaccard >= 0.70, name_jaccard >= 0.40],
+            [np.full(count, 0.85), 0.65 * name_jaccard, 0.35 * name_jaccard],
+            0.0,
+        )
+        if len(party_name_tokens) >= 2:
+            first = self.tokens.get(party_name_tokens[0], -2)
+            last = self.tokens.get(party_name_tokens[-1], -2)
+            first_last = (self.name_first == first) & (self.name_last == last)
+            subset = intersection == party_size
+            name_points = np.where((name_points == 0.0) & (first_last | subset), 0.55, name_points)
+        score += name_points
+
+        if party_alias_tokens and len(self.alias_owner):
+            best = np.zeros(count, dtype=np.float64)
+            for alias_tokens in party_alias_tokens:
+                mask, party_size = self._token_mask(alias_tokens, self.tokens)
+                rows = _jaccard(_segment_hits(mask, self.alias_ptr, self.alias_ids), party_size, self.alias_size)
+                np.maximum.at(best, self.alias_owner, rows)
+            alias_points = np.select([best >= 0.70, best >= 0.30, best > 0.0], [0.40, 0.25, 0.10], 0.0)
+            score += np.where(self.has_aliases, alias_points, 0.0)
+
+        party_country = party_norm.get("country")
+        party_country_iso = party_norm.get("country_iso")
+        country_match = np.zeros(count, dtype=bool)
+        if party_country:
+            country_match |= self.country == self.texts.get(party_country, -1)
+        if party_country_iso:
+            country_match |= self.country_iso == self.texts.get(party_country_iso, -1)
+        score += np.where(country_match, 0.03, 0.0)
+
+        party_town = party_norm.get("town")
+        if party_town:
+            score += self._place_points(party_town, 0.04, 0.02, self.city, self.state)
+        party_state = party_norm.get("state")
+        if party_state:
+            score += self._place_points(party_state, 0.03, 0.01, self.state, self.city)
+
+        party_street = party_norm.get("street")
+        if party_street:
+            street_id = self.texts.get(party_street, -1)
+            exact = self.street == street_id
+            exact[self.address_owner[self.address_text == street_id]] = True
+            best = np.zeros(count, dtype=np.float64)
+            party_street_tokens = tokenize(party_street)
+            if party_street_tokens and len(self.address_owner):
+                mask, party_size = self._token_mask(party_street_tokens, self.tokens)
+                rows = _jaccard(_segment_hits(mask, self.address_ptr, self.address_ids), party_size, self.address_size)
+                np.maximum.at(best, self.address_owner, rows)
+            score += np.where(exact, 0.40, np.where(best > 0.60, 0.30 * best, 0.0))
+
+        return score + bound, bound == 0.0
+
+
+# Below this many candidates encoding a RecordMatrix costs more than it saves.
+VECTOR_MIN_RECORDS = 16
+
+
+def min_risk_final_score() -> int:
+    """Lowest finalScore that apply_risklevel_rules does not rate as no risk."""
+    for final_score in range(101):
+        if apply_risklevel_rules(final_score / 100.0) != "no risk":
+            return final_score
+    return 101
+
+
 def _dedup(matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     deduped: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
     for match in matches:
@@ -669,11 +1062,107 @@ def _dedup(matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     return list(deduped.values())
 
 
+def prepare_table(table_data, use_vector: bool = True) -> Tuple[Sequence[PreparedRecord], "RecordMatrix | None"]:
+    """Turn matching()'s table_data into prepared records plus an optional RecordMatrix."""
+    if isinstance(table_data, RecordMatrix):
+        return table_data.records, (table_data if use_vector else None)
+    sanctions_cache: Dict[Tuple[str, str], PreparedRecord] = {}
+    records: List[PreparedRecord] = []
+    for record in table_data or []:
+        if isinstance(record, PreparedRecord):
+            records.append(record)
+            continue
+        record_key = (to_text(record[0]) if len(record) > 0 else "", to_text(record[1]) if len(record) > 1 else "")
+        prepared = sanctions_cache.get(record_key)
+        if prepared is None:
+            prepared = prepare_record(record)
+            sanctions_cache[record_key] = prepared
+        records.append(prepared)
+    matrix = RecordMatrix(records) if use_vector and len(records) >= VECTOR_MIN_RECORDS else None
+    return records, matrix
+
+
+def party_role(party: Dict[str, Any]) -> str | None:
+    """The party's role, or None when the role is excluded from screening."""
+    role_value = to_text(party.get("Role") or "")
+    role_norm = normalize_text(role_value)
+    if any(stop_role in role_norm for stop_role in EXCLUDE_ROLES):
+        return None
+    return role_value
+
+
+def screen_party(
+    party: Dict[str, Any],
+    records: Sequence[PreparedRecord],
+    matrix: "RecordMatrix | None" = None,
+    min_final_score: int | None = None,
+) -> Dict[str, Any] | None:
+    """
+    Score one party against the records. Returns the party's best match per
+    sanctions record (risk above "no risk") and how many evaluated pairs fell
+    in each risk level, or None when the party is not screened.
+    """
+    if not isinstance(party, dict):
+        return None
+    role_value = party_role(party)
+    if role_value is None:
+        return None
+    if min_final_score is None:
+        min_final_score = min_risk_final_score()
+    counts = {level: 0 for level in RISK_LEVELS}
+    counts["no risk"] = 0
+    index = party.get("index") or party.get("i") or party.get("idx") or ""
+    party_norm = normalize_party(party)
+    name_tokens = tokenize(party_norm.get("name", ""))
+    alias_tokens = [tokenize(alias) for alias in party_norm.get("aliases", [])]
+
+    best_by_record: Dict[Tuple[str, str, str, Any], Dict[str, Any]] = {}
+    candidates: Sequence[PreparedRecord] = records
+    if matrix is not None:
+        # Records whose (upper-bound) score cannot reach a risk level are
+        # counted as "no risk" without building a match object.
+        scores, _ = matrix.score(party_norm, name_tokens, alias_tokens)
+        final_scores = np.rint(np.minimum(scores, 1.0) * 100)
+        selected = np.flatnonzero(final_scores >= min_final_score)
+        counts["no risk"] += len(records) - len(selected)
+        candidates = [records[position] for position in selected]
+    for prepared in candidates:
+        match_obj = evaluate_match(
+            party_norm,
+            prepared.norm,
+            role_value,
+            name_tokens,
+            prepared.name_tokens,
+            alias_tokens,
+            prepared.alias_tokens,
+        )
+        if match_obj is None:
+            counts["no risk"] += 1
+            continue
+        risk_label = apply_risklevel_rules((match_obj.get("finalScore", 0) or 0) / 100.0)
+        counts[risk_label] = counts.get(risk_label, 0) + 1
+        if risk_label == "no risk":
+            continue
+        dedupe_key = (match_obj["sanctionsList"], match_obj["sanctionsId"], role_value, index)
+        existing = best_by_record.get(dedupe_key)
+        if not existing or match_obj.get("finalScore", 0) > existing.get("finalScore", 0):
+            best_by_record[dedupe_key] = match_obj
+    return {"matches": list(best_by_record.values()), "counts": counts}
+
+
 def matching(party_infos, transaction_info, table_data, ScreeningConfig):
+    use_vector = bool(getattr(ScreeningConfig, "VECTOR_SCORING", True))
+    records, matrix = prepare_table(table_data, use_vector)
+    min_final_score = min_risk_final_score()
+    party_results = [screen_party(party, records, matrix, min_final_score) for party in party_infos or []]
+    return summarize_parties(party_results, ScreeningConfig)
+
+
+def summarize_parties(party_results, ScreeningConfig):
+    """Combine screen_party() results (None entries are skipped) into the engine result."""
     matches_total = 0
     matches_by_risk = {level: 0 for level in RISK_LEVELS}
     matches_by_risk["no risk"] = 0
-    sanctions_cache: Dict[Tuple[str, str], Dict[str, Any]] = {}
     all_matches: List[Dict[str, Any]] = []
     shown_matches: List[Dict[str, Any]] = []
 
@@ -682,60 +1171,16 @@ def matching(party_infos, transaction_info, table_data, ScreeningConfig):
     else:
         show_slight = bool(getattr(ScreeningConfig, "SHOW_SLIGHT_MATCHES", False))
 
-    for party in party_infos or []:
-        if not isinstance(party, dict):
-            continue
-        role_value = to_text(party.get("Role") or "")
-        role_norm = normalize_text(role_value)
-        if any(stop_role in role_norm for stop_role in EXCLUDE_ROLES):
+    for result in party_results:
+        if result is None:
             continue
-        index = party.get("index") or party.get("i") or party.get("idx") or ""
-        party_norm = normalize_party(party)
-        name_tokens = tokenize(party_norm.get("name", ""))
-        alias_tokens = [tokenize(alias) for alias in party_norm.get("aliases", [])]
-
-        best_by_record: Dict[Tuple[str, str, str, Any], Dict[str, Any]] = {}
-        for record in table_data or []:
-            record_key = (to_text(record[0]) if len(record) > 0 else "", to_text(record[1]) if len(record) > 1 else "")
-            cached = sanctions_cache.get(record_key)
-            if cached is None:
-                rec_norm = normalize_record(record)
-                cache_entry = {
-                    "norm": rec_norm,
-                    "name_tokens": tokenize(rec_norm.get("name", "")),
-                    "alias_tokens": [tokenize(alias) for alias in rec_norm.get("aliases", [])],
-                }
-                sanctions_cache[record_key] = cache_entry
-            else:
-                rec_norm = cached["norm"]
-            cache_tokens = sanctions_cache[record_key]
-            match_obj = evaluate_match(
-                party_norm,
-                rec_norm,
-                role_value,
-                name_tokens,
-                cache_tokens["name_tokens"],
-                alias_tokens,
-                cache_tokens["alias_tokens"],
-            )
-            if match_obj is None:
-                matches_total += 1
-                matches_by_risk["no risk"] += 1
-                continue
-            risk_label = apply_risklevel_rules((match_obj.get("finalScore", 0) or 0) / 100.0)
-            matches_total += 1
-            matches_by_risk[risk_label] = matches_by_risk.get(risk_label, 0) + 1
-            if risk_label == "no risk":
-                continue
-            dedupe_key = (match_obj["sanctionsList"], match_obj["sanctionsId"], role_value, index)
-            existing = best_by_record.get(dedupe_key)
-            if not existing or match_obj.get("finalScore", 0) > existing.get("finalScore", 0):
-                best_by_record[dedupe_key] = match_obj
-        if best_by_record:
-            for match in best_by_record.values():
-                all_matches.append(match)
-                if show_slight or (match.get("riskLevel", "").lower() not in {"slight risk"}):
-                    shown_matches.append(match)
+        for level, count in result["counts"].items():
+            matches_total += count
+            matches_by_risk[level] = matches_by_risk.get(level, 0) + count
+        for match in result["matches"]:
+            all_matches.append(match)
+            if show_slight or (match.get("riskLevel", "").lower() not in {"slight risk"}):
+                shown_matches.append(match)
 
     all_matches = _dedup(all_matches)
     shown_matches = _dedup(shown_matches)
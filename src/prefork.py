@@ -0,0 +1,187 @@
+"""
+Pre-fork server: python prefork.py [workers]
+
+The parent verifies the index, warms SQLite and builds the sanctions snapshot
+once, then forks the uvicorn workers. Workers inherit the snapshot
+copy-on-write instead of each building their own, so adding a worker costs
+its request-time memory, not another copy of the lists.
+
+A list refresh in any worker (POST /refresh-lists) sends the parent SIGHUP;
+so does `kill -HUP <parent>`. The parent then reloads the snapshot from the
+new build and replaces the workers generation by generation: the new ones
+start accepting on the shared socket before the old ones are asked to finish
+their in-flight requests and exit. Workers that die are replaced.
+"""
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+from config import get_config
+from database import reset_read_connections, verify_index, warm_database
+from snapshot import load_snapshot
+from api import app
+
+cfg = get_config()
+
+# Set in the environment of forked workers; api.py sends this pid SIGHUP after a list refresh.
+PARENT_ENV = "AML_PREFORK_PARENT"
+# Seconds old workers get to finish in-flight requests after a reload or shutdown.
+GRACEFUL_TIMEOUT = 30
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _load_shared_state() -> None:
+    """Everything workers should share, loaded in the parent before fork."""
+    started = time.perf_counter()
+    verify_index(force=True)
+    warm_database()
+    snapshot = load_snapshot()
+    # SQLite connections must not cross fork; workers open their own.
+    reset_read_connections()
+    # Keep the collector from writing to (and so un-sharing) the inherited objects.
+    gc.collect()
+    gc.freeze()
+    logging.info(
+        "prefork: shared state loaded in %.1fs (%s records)",
+        time.perf_counter() - started, len(snapshot) if snapshot else 0,
+    )
+
+
+def _uvicorn_config() -> uvicorn.Config:
+    config = uvicorn.Config(
+        app,
+        host=cfg.api.host,
+        port=cfg.api.port,
+        log_level="debug" if cfg.api.debug else "info",
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+    )
+    # Imports the loop/protocol modules now, so workers share them too.
+    config.load()
+    return config
+
+
+def _serve(sock: socket.socket, config: uvicorn.Config) -> None:
+    for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+        signal.signal(signum, signal.SIG_DFL)
+    os.environ[PARENT_ENV] = str(os.getppid())
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Arbiter:
+    def __init__(self, sock: socket.socket, workers: int):
+        self.sock = sock
+        self.config = _uvicorn_config()
+        self.workers = max(1, int(workers))
+        self.generation = 0
+        self.children = {}
+        self._reload = False
+        self._stop = False
+
+    def _spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _serve(self.sock, self.config)
+            except BaseException:
+                logging.exception("prefork worker failed")
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = self.generation
+
+    def _spawn_generation(self) -> None:
+        while sum(1 for g in self.children.values() if g == self.generation) < self.workers:
+            self._spawn()
+
+    def _retire(self, pids) -> None:
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _reap(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            generation = self.children.pop(pid, None)
+            if generation == self.generation and not self._stop:
+                logging.warning("prefork: worker %d exited (status %d); replacing it", pid, status)
+
+    def reload(self) -> None:
+        try:
+            _load_shared_state()
+        except Exception:
+            # The current workers still serve the build they were forked with.
+            logging.exception("prefork: reload failed; generation %d keeps serving", self.generation)
+            return
+        old = [pid for pid, g in self.children.items() if g == self.generation]
+        self.generation += 1
+        self._spawn_generation()
+        self._retire(old)
+        logging.info("prefork: generation %d started, %d workers retired", self.generation, len(old))
+
+    def _on_hup(self, signum, frame) -> None:
+        self._reload = True
+
+    def _on_stop(self, signum, frame) -> None:
+        self._stop = True
+
+    def run(self) -> None:
+        signal.signal(signal.SIGHUP, self._on_hup)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        _load_shared_state()
+        self._spawn_generation()
+        logging.info("prefork: %d workers on %s:%d", self.workers, cfg.api.host, cfg.api.port)
+        while not self._stop:
+            time.sleep(0.5)
+            self._reap()
+            if self._reload:
+                self._reload = False
+                self.reload()
+            elif not self._stop:
+                self._spawn_generation()
+        self._retire(list(self.children))
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT + 5
+        while self.children and time.monotonic() < deadline:
+            time.sleep(0.1)
+            self._reap()
+        self._kill_remaining()
+
+    def _kill_remaining(self) -> None:
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self._reap()
+
+
+def main(argv):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    workers = int(argv[0]) if argv else cfg.api.workers
+    Arbiter(_bind(cfg.api.host, cfg.api.port), workers).run()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from config import get_config
+from rules import rules_version
+
+cfg = get_config()
+
+# Bump when the response layout changes so stored responses are ignored.
+RESULT_CACHE_VERSION = "1"
+# The disk directory is pruned to max_files after this many writes.
+PRUNE_EVERY_WRITES = 500
+
+
+def ingest_hash(xml_bytes: bytes) -> str:
+    """Same value isoparser.parse() stores as metadata.ingestHash."""
+    return "sha256:" + hashlib.sha256(xml_bytes or b"").hexdigest()
+
+
+class ResultCache:
+    """
+    Whole-message screening responses keyed by (ingestHash, sanctions build
+    version, rules version). Memory is an LRU bounded by the total size of the
+    stored JSON; with a directory configured, responses are also written there
+    so they survive restarts and are shared between workers. A hit returns a
+    copy of the stored response with a fresh riskSummary.time.
+    """
+
+    def __init__(self, max_bytes: int, directory: Optional[Path] = None, max_files: int = 100000):
+        self.max_bytes = max(0, int(max_bytes))
+        self.directory = Path(directory) if directory else None
+        self.max_files = max(1, int(max_files))
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def key(self, message_hash: str, build_version: int) -> str:
+        payload = f"{RESULT_CACHE_VERSION}|{rules_version()}|{build_version}|{message_hash}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _remember(self, key: str, payload: str) -> None:
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        self._entries[key] = payload
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+        if payload is None and self.directory is not None:
+            try:
+                payload = self._path(key).read_text(encoding="utf-8")
+            except FileNotFoundError:
+                payload = None
+            except OSError:
+                self.errors += 1
+                payload = None
+            if payload is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(key, payload)
+        if payload is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        response = json.loads(payload)
+        summary = response.get("riskSummary")
+        if isinstance(summary, dict):
+            summary["time"] = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+        return response
+
+    def put(self, key: str, response: Dict[str, Any]) -> None:
+        payload = json.dumps(response, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._remember(key, payload)
+            self._writes_since_prune += 1
+            prune = self._writes_since_prune >= PRUNE_EVERY_WRITES
+            if prune:
+                self._writes_since_prune = 0
+        if self.directory is None:
+            return
+        try:
+            path = self._path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(payload, encoding="utf-8")
+            os.replace(tmp, path)
+            if prune:
+                self.prune_disk()
+        except OSError:
+            self.errors += 1
+            logging.warning("result cache write failed", exc_info=True)
+
+    def prune_disk(self) -> int:
+        """Delete the oldest files beyond max_files. Returns files deleted."""
+        if self.directory is None or not self.directory.exists():
+            return 0
+        files = sorted(self.directory.glob("*/*.json"), key=lambda p: p.stat().st_mtime)
+        excess = files[:max(0, len(files) - self.max_files)]
+        for path in excess:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        return len(excess)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "directory": str(self.directory) if self.directory else None,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "errors": self.errors,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else None,
+            }
+
+
+result_cache = ResultCache(
+    cfg.screening.RESULT_CACHE_MB * 1048576,
+    cfg.screening.RESULT_CACHE_DIR or None,
+    cfg.screening.RESULT_CACHE_MAX_FILES,
+)
+
+
+def result_cache_stats() -> Dict[str, Any]:
+    return result_cache.stats()
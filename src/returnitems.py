@@ -1,5 +1,7 @@
 from typing import Any, Dict, Iterable, List, Mapping, MutableMapping
 
+from isoparser import buildbase, parse
+
 
 def _as_dict(value: Any) -> Dict[str, Any]:
     return value if isinstance(value, dict) else {}
@@ -255,3 +257,11 @@ def returnitems(parsed, base):
         transaction_information["Screening Note"] = "No customer parties present for this message type"
 
     return party_information_list, transaction_information
+
+
+def parse_message(xml_bytes: bytes):
+    """parse(), buildbase() and returnitems() for one message: (base, party_infos, transaction_info)."""
+    parsed = parse(xml_bytes)
+    base = buildbase(parsed)
+    party_infos, transaction_info = returnitems(parsed, base)
+    return base, party_infos, transaction_info
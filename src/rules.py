@@ -1,5 +1,6 @@
 import os
 import json
+import hashlib
 
 RISKLEVEL_DEFAULT = { #Change Risk Levels
     "veryHighFrom": 0.90,
@@ -69,3 +70,10 @@ def apply_responsecode_rules(overall_risk_level: str) -> str:
     mapping = get_responsecode_rules()
     key = (overall_risk_level or "").strip().lower()
     return mapping.get(key, "UNKNOWN")
+
+def rules_version() -> str:
+    """Short fingerprint of the active risk-level and response-code rules."""
+    payload = json.dumps(
+        {"risk": get_risklevel_rules(), "codes": get_responsecode_rules()}, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
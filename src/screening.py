@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import Any, Dict, Mapping, Optional
+from typing import Any, Dict, Iterable, Mapping, Optional
 
+from database import get_build_version, get_list_metadata, get_list_metadata_version, set_list_metadata
 from readLog import readLogFiles
 from rules import apply_responsecode_rules
 
@@ -109,22 +110,81 @@ def _normalize_party(party_map: Mapping[str, Any]) -> Optional[Dict[str, Any]]:
     return normalized
 
 
-def _build_lists_used() -> list[dict[str, Any]]:
-    lists: list[dict[str, Any]] = []
+# Rendered listsUsed for one sanctions build; refresh_lists() invalidates it.
+_lists_used_cache: Dict[str, Any] = {"version": None, "lists": None}
+
+
+def invalidate_lists_used() -> None:
+    global _lists_used_cache
+    _lists_used_cache = {"version": None, "lists": None}
+
+
+def list_refresh_entries(report: Mapping[str, Mapping[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Each refreshed list's metadata for sanctions_meta: the last download time
+    from its log file and source URL, plus from `report` (listload's per-list
+    report) the extracted row count, the hash of the extracted rows and the
+    hash and ETag of the download they came from. refresh_lists() hands these
+    to createdatabase(), which stores them in the commit that publishes the build.
+    """
+    entries = {}
     for source in _LOG_SOURCES:
-        last_refreshed = readLogFiles(source["log"]) or "N/A"
-        lists.append(
-            {
-                "name": source["name"],
-                "publisher": source["publisher"],
-                "sourceUrl": source["sourceUrl"],
-                "lastRefreshedAt": last_refreshed,
-            }
-        )
-    return lists
-
-
-def submitresponse(base, party_infos, transaction_info, engine_result):
+        loaded = report.get(source["name"])
+        if not loaded or loaded.get("error"):
+            continue
+        entries[source["name"]] = {
+            "publisher": source["publisher"],
+            "sourceUrl": source["sourceUrl"],
+            "lastRefreshedAt": readLogFiles(source["log"]) or "N/A",
+            "rows": loaded.get("rows"),
+            "contentHash": loaded.get("contentHash"),
+            "sourceHash": loaded.get("sourceHash"),
+            "etag": loaded.get("etag"),
+        }
+    return entries
+
+
+def touch_list_refresh(names: Iterable[str]) -> None:
+    """Move lastRefreshedAt forward for lists whose source was re-checked and found unchanged."""
+    names = set(names)
+    stored = get_list_metadata()
+    entries = {}
+    for source in _LOG_SOURCES:
+        meta = stored.get(source["name"])
+        if meta is None or source["name"] not in names:
+            continue
+        entries[source["name"]] = dict(meta, lastRefreshedAt=readLogFiles(source["log"]) or meta.get("lastRefreshedAt"))
+    set_list_metadata(entries)
+    invalidate_lists_used()
+
+
+def _build_lists_used() -> list[dict[str, Any]]:
+    global _lists_used_cache
+    # touch_list_refresh() rewrites the metadata without a new build, possibly in another
+    # worker, so the cache follows the stored metadata stamp as well as the build version.
+    version = (get_build_version(), get_list_metadata_version())
+    cached = _lists_used_cache
+    lists = cached["lists"]
+    if lists is None or cached["version"] != version:
+        stored = get_list_metadata()
+        lists = []
+        for source in _LOG_SOURCES:
+            meta = stored.get(source["name"]) or {}
+            # Databases built before list metadata existed fall back to the log file, once per build.
+            last_refreshed = meta.get("lastRefreshedAt") or readLogFiles(source["log"]) or "N/A"
+            lists.append(
+                {
+                    "name": source["name"],
+                    "publisher": source["publisher"],
+                    "sourceUrl": meta.get("sourceUrl") or source["sourceUrl"],
+                    "lastRefreshedAt": last_refreshed,
+                }
+            )
+        _lists_used_cache = {"version": version, "lists": lists}
+    return [dict(item) for item in lists]
+
+
+def submitresponse(base, party_infos, transaction_info, engine_result, lists_used=None):
     engine_result = engine_result or {}
 
     risk_score_points = _coerce_score(engine_result.get("riskScore"))
@@ -164,7 +224,7 @@ def submitresponse(base, party_infos, transaction_info, engine_result):
     }
 
     fullresponse = {
-        "listsUsed": _build_lists_used(),
+        "listsUsed": _build_lists_used() if lists_used is None else lists_used,
         "parties": parties,
         "transaction": transaction_info or {},
         "responseCode": responsecode,
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from config import get_config
+from database import (
+    NAME_MIN_SHOULD_MATCH,
+    NAME_TOKEN_MAX_POSTINGS,
+    _min_should_match_candidates,
+    _normalize_fts_queries,
+    get_build_version,
+    get_token_dictionary,
+    returnFtsPostings,
+    returnPreparedRecords,
+)
+from matcher import PreparedRecord, RecordMatrix, TokenDictionary
+
+cfg = get_config()
+
+
+class _TermIndex:
+    """Sorted terms with their record positions, for "term*" prefix lookups."""
+
+    __slots__ = ("terms", "postings")
+
+    def __init__(self, postings: Dict[str, array]):
+        self.terms = sorted(postings)
+        self.postings = [postings[term] for term in self.terms]
+
+    def prefix(self, token: str) -> Set[int]:
+        docs: Set[int] = set()
+        for index in range(bisect_left(self.terms, token), len(self.terms)):
+            if not self.terms[index].startswith(token):
+                break
+            docs.update(self.postings[index])
+        return docs
+
+
+class SanctionsSnapshot:
+    """
+    Immutable in-process copy of sanctionslist + sanctionsdetails for one
+    build version: every record prepared once (normalized, name/alias/address
+    tokens) plus the FTS index's own postings, mapped to record positions, so
+    candidate retrieval finds what the FTS path finds. Never mutated after
+    construction, so readers need no locking.
+    """
+
+    __slots__ = ("build_version", "built_at", "records", "tokens", "name_index", "address_index", "_matrix")
+
+    def __init__(
+        self,
+        build_version: int,
+        records: Sequence[PreparedRecord],
+        tokens: TokenDictionary,
+        name_index: _TermIndex,
+        address_index: _TermIndex,
+    ):
+        self.build_version = build_version
+        self.built_at = time.time()
+        self.records = tuple(records)
+        self.tokens = tokens
+        self.name_index = name_index
+        self.address_index = address_index
+        self._matrix: Optional[RecordMatrix] = None
+
+    @classmethod
+    def from_prepared(
+        cls,
+        entry_ids: Sequence[int],
+        records: Sequence[PreparedRecord],
+        tokens: TokenDictionary,
+        name_postings: Dict[str, array],
+        address_postings: Dict[str, array],
+        build_version: int,
+    ) -> "SanctionsSnapshot":
+        """records in entry_id order; postings keyed by term, holding fts rowids (= entry ids)."""
+        positions = {entry_id: position for position, entry_id in enumerate(entry_ids)}
+
+        def to_positions(postings):
+            mapped = {}
+            for term, docs in postings.items():
+                found = array("I", (positions[doc] for doc in docs if doc in positions))
+                if found:
+                    mapped[term] = found
+            return mapped
+
+        return cls(
+            build_version, records, tokens,
+            _TermIndex(to_positions(name_postings)), _TermIndex(to_positions(address_postings)),
+        )
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def matrix(self) -> RecordMatrix:
+        """Every record encoded for batch scoring (full-table mode), built on first use."""
+        matrix = self._matrix
+        if matrix is None:
+            matrix = self._matrix = RecordMatrix(self.records)
+        return matrix
+
+    def _name_candidates(self, tokens, limit, min_should_match, max_postings, prefixes):
+        postings: Dict[str, Set[int]] = {}
+        frequent: Dict[str, int] = {}
+        for token in tokens:
+            docs = prefixes.get(token)
+            if docs is None:
+                docs = prefixes[token] = self.name_index.prefix(token)
+            postings[token] = docs
+            if len(docs) > max_postings:
+                frequent[token] = len(docs)
+        return _min_should_match_candidates(
+            tokens, postings, len(self.records), limit, min_should_match, frequent=frequent
+        )
+
+    def _address_candidates(self, tokens, limit):
+        postings = sorted((self.address_index.prefix(token) for token in tokens), key=len)
+        matched = postings[0]
+        for docs in postings[1:]:
+            matched = matched & docs
+            if not matched:
+                return []
+        return [(position, -1.0) for position in sorted(matched)[:limit]]
+
+    def candidates(
+        self, queries, limit=500, min_should_match=NAME_MIN_SHOULD_MATCH, max_postings=NAME_TOKEN_MAX_POSTINGS
+    ) -> List[PreparedRecord]:
+        """
+        In-memory counterpart of returnDetails2_fts_multi: the same query
+        tokens, prefix matching on the index's terms, the same at-least-k-of-n
+        rule (and frequent-prefix cap) for names, every token for streets.
+        Street matches all score -1.0 here, while FTS ranks them by bm25, so
+        when one street query matches more than `limit` records the two may
+        keep different ones. Returns prepared records ordered by best score.
+        """
+        best: Dict[int, float] = {}
+        prefixes: Dict[str, Set[int]] = {}
+        for _, field, tokens in _normalize_fts_queries(queries):
+            if field == "address":
+                ranked = self._address_candidates(tokens, limit)
+            else:
+                ranked = self._name_candidates(tokens, limit, min_should_match, max_postings, prefixes)
+            for position, score in ranked:
+                existing = best.get(position)
+                if existing is None or score < existing:
+                    best[position] = score
+        ordered = sorted(best, key=lambda position: (best[position], self.records[position].key, position))
+        return [self.records[position] for position in ordered]
+
+
+_current: Optional[SanctionsSnapshot] = None
+_build_lock = threading.Lock()
+_status: Dict[str, Any] = {"building": False, "last_error": None, "last_build_seconds": None}
+
+
+def build_snapshot() -> SanctionsSnapshot:
+    started = time.perf_counter()
+    build_version = get_build_version()
+    entry_ids, records = returnPreparedRecords(entry_ids=True)
+    name_postings, address_postings = returnFtsPostings()
+    built = SanctionsSnapshot.from_prepared(
+        entry_ids, records, get_token_dictionary(), name_postings, address_postings, build_version
+    )
+    _status["last_build_seconds"] = round(time.perf_counter() - started, 3)
+    return built
+
+
+def load_snapshot() -> Optional[SanctionsSnapshot]:
+    """Build a snapshot from the current database and swap it in."""
+    global _current
+    with _build_lock:
+        if not cfg.paths.DB_PATH.exists():
+            return None
+        _status["building"] = True
+        try:
+            built = build_snapshot()
+            _status["last_error"] = None
+        except Exception as e:
+            _status["last_error"] = f"{e.__class__.__name__}: {e}"
+            logging.error("Sanctions snapshot build failed; keeping the previous snapshot", exc_info=True)
+            return _current
+        finally:
+            _status["building"] = False
+        _current = built
+        return built
+
+
+def refresh_snapshot_async() -> threading.Thread:
+    """Rebuild in the background; requests keep the old snapshot until the swap."""
+    thread = threading.Thread(target=load_snapshot, name="sanctions-snapshot", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_snapshot(load: bool = True) -> Optional[SanctionsSnapshot]:
+    snapshot = _current
+    if snapshot is None and load:
+        snapshot = load_snapshot()
+    return snapshot
+
+
+def snapshot_status() -> Dict[str, Any]:
+    snapshot = _current
+    return {
+        "loaded": snapshot is not None,
+        "build_version": snapshot.build_version if snapshot else None,
+        "records": len(snapshot) if snapshot else 0,
+        "built_at": snapshot.built_at if snapshot else None,
+        **_status,
+    }
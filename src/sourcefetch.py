@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import requests
+
+from config import get_config
+
+cfg = get_config()
+
+
+# Bytes read from the response per chunk: a download is never held in memory whole.
+CHUNK_SIZE = 1 << 20
+
+
+@dataclass
+class FetchedSource:
+    key: str
+    path: Path
+    content_hash: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    # False for a 304, a body identical to the stored one, or a stored copy served without asking.
+    changed: bool = True
+    not_modified: bool = False
+    # The request failed and the last stored download was used instead.
+    stale: bool = False
+
+    @property
+    def content(self) -> bytes:
+        return self.path.read_bytes()
+
+
+def _paths(key: str):
+    directory = Path(cfg.paths.SOURCE_CACHE_DIR)
+    return directory / f"{key}.raw", directory / f"{key}.json"
+
+
+def _read_stored(key: str):
+    body_path, meta_path = _paths(key)
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None, None
+    if not body_path.exists():
+        return None, None
+    return meta, body_path
+
+
+def _tmp_path(path: Path) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = _tmp_path(path)
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _download(resp, path: Path):
+    """Stream the response body to a temporary file next to `path`: (tmp path, size, content hash)."""
+    tmp = _tmp_path(path)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with tmp.open("wb") as f:
+            for chunk in resp.iter_content(CHUNK_SIZE):
+                digest.update(chunk)
+                size += len(chunk)
+                f.write(chunk)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return tmp, size, "sha256:" + digest.hexdigest()
+
+
+def _log_refresh(log_name: str) -> None:
+    log_path = cfg.paths.DATA_DIR / log_name
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with log_path.open("a", encoding="utf-8") as f:
+        f.write(datetime.now(timezone.utc).isoformat() + "\n")
+
+
+def _stored_source(key: str, meta: Dict[str, Any], body_path: Path, **flags) -> FetchedSource:
+    return FetchedSource(
+        key=key,
+        path=body_path,
+        content_hash=meta.get("contentHash"),
+        etag=meta.get("etag"),
+        last_modified=meta.get("lastModified"),
+        changed=False,
+        **flags,
+    )
+
+
+def fetch_source(key: str, url: str, log_name: str, revalidate: bool = True, timeout: int = 120) -> FetchedSource:
+    """
+    Download a sanctions source, keeping the raw body and its ETag /
+    Last-Modified under SOURCE_CACHE_DIR as <key>.raw and <key>.json. The
+    body is streamed to disk in CHUNK_SIZE pieces and the result points at
+    the file (FetchedSource.path). Later calls send If-None-Match /
+    If-Modified-Since, so an unchanged source answers 304 and the stored
+    body is used without a transfer. With revalidate=False a stored body is
+    used without any request.
+
+    The list's log file gets a line whenever the source was confirmed
+    current (200 or 304), as the loaders did before. If the request fails
+    and a stored body exists it is returned with stale=True; otherwise the
+    error propagates and the loader falls back to its bundled file.
+    """
+    meta, body_path = _read_stored(key)
+    if meta is not None and not revalidate:
+        return _stored_source(key, meta, body_path)
+    headers = {}
+    if meta is not None and meta.get("url") == url:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("lastModified"):
+            headers["If-Modified-Since"] = meta["lastModified"]
+    body_path, meta_path = _paths(key)
+    try:
+        with requests.get(url, headers=headers, timeout=timeout, stream=True) as resp:
+            if resp.status_code == 304 and meta is not None:
+                _log_refresh(log_name)
+                return _stored_source(key, meta, body_path, not_modified=True)
+            resp.raise_for_status()
+            tmp, size, content_hash = _download(resp, body_path)
+        if not size:
+            tmp.unlink(missing_ok=True)
+            raise ValueError("empty body")
+    except Exception:
+        if meta is None:
+            raise
+        logging.warning("%s download failed; using the stored copy from %s", key, meta.get("fetchedAt"), exc_info=True)
+        return _stored_source(key, meta, body_path, stale=True)
+
+    changed = meta is None or meta.get("contentHash") != content_hash
+    fetched = {
+        "url": url,
+        "etag": resp.headers.get("ETag"),
+        "lastModified": resp.headers.get("Last-Modified"),
+        "contentHash": content_hash,
+        "bytes": size,
+        "fetchedAt": datetime.now(timezone.utc).isoformat(),
+    }
+    if changed:
+        os.replace(tmp, body_path)
+    else:
+        tmp.unlink(missing_ok=True)
+    _write_atomic(meta_path, json.dumps(fetched, indent=2).encode("utf-8"))
+    _log_refresh(log_name)
+    return FetchedSource(
+        key=key,
+        path=body_path,
+        content_hash=content_hash,
+        etag=fetched["etag"],
+        last_modified=fetched["lastModified"],
+        changed=changed,
+    )
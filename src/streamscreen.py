@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import json
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, Iterator, List, Optional
+
+from config import ScreeningConfig
+from engine import _ensure_db_ready, _party_key, _screen_parties
+from isoparser import _local_name, buildbase, parse_element
+from matcher import party_role, summarize_parties
+from returnitems import returnitems
+from screening import _build_lists_used, submitresponse
+
+# Elements that hold one transaction each in bulk messages (pain.001, pain.008, pacs.008/009/003, pacs.004).
+TRANSACTION_TAGS = frozenset({"CdtTrfTxInf", "DrctDbtTxInf", "TxInf"})
+
+
+def _merge_transaction(context: Dict[str, Any], transaction: Dict[str, Any]) -> Dict[str, Any]:
+    """Group header fields from the message, transaction fields from the transaction itself."""
+    merged = dict(context or {})
+    for key, value in (transaction or {}).items():
+        if value not in (None, "") or key not in merged:
+            merged[key] = value
+    return merged
+
+
+def _items(element) -> tuple:
+    parsed = parse_element(element)
+    return returnitems(parsed, buildbase(parsed))
+
+
+class StreamScreener:
+    """
+    Screens a bulk message one transaction at a time. iterparse builds the
+    tree incrementally; each completed transaction element is screened and
+    then removed from its parent, so memory holds the message skeleton (group
+    header, PmtInf debtor, ...) plus one transaction rather than the whole file.
+
+    Every distinct party is screened once: results are kept by party record,
+    so a creditor repeated across 10k transactions costs one lookup. Skeleton
+    parties are part of every transaction's decision, since a pain.001 debtor
+    lives on PmtInf rather than inside CdtTrfTxInf.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self._results: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._context_parties: List[Dict[str, Any]] = []
+        self._context_transaction: Dict[str, Any] = {}
+        self.transactions = 0
+        self.parties = 0
+        self.screened = 0
+
+    def _screen(self, party_infos) -> List[Optional[Dict[str, Any]]]:
+        """Results aligned with party_infos; only parties not seen before are screened."""
+        keys = [_party_key(p) if isinstance(p, dict) and party_role(p) is not None else None for p in party_infos]
+        pending = {}
+        for party, key in zip(party_infos, keys):
+            if key is not None and key not in self._results and key not in pending:
+                pending[key] = party
+        if pending:
+            for key, result in zip(pending, _screen_parties(list(pending.values()))):
+                self._results[key] = result
+            self.screened += len(pending)
+        self.parties += sum(key is not None for key in keys)
+        return [self._results.get(key) if key is not None else None for key in keys]
+
+    def _refresh_context(self, root) -> None:
+        parties, transaction = _items(root)
+        self._context_parties = list(parties or [])
+        self._context_transaction = transaction or {}
+        self._screen(self._context_parties)
+
+    def _record(self, index: int, party_infos, transaction_info) -> Dict[str, Any]:
+        party_infos = self._context_parties + list(party_infos or [])
+        engine_result = summarize_parties(self._screen(party_infos), ScreeningConfig)
+        response = submitresponse(None, party_infos, transaction_info, engine_result, lists_used=[])
+        del response["listsUsed"]
+        return {"type": "transaction", "index": index, **response}
+
+    def _summary(self) -> Dict[str, Any]:
+        engine_result = summarize_parties(list(self._results.values()), ScreeningConfig)
+        response = submitresponse(None, [], self._context_transaction, engine_result, lists_used=[])
+        return {
+            "type": "summary",
+            "transactions": self.transactions,
+            "parties": self.parties,
+            "uniqueParties": len(self._results),
+            "screenedParties": self.screened,
+            "responseCode": response["responseCode"],
+            "riskSummary": response["riskSummary"],
+            "engine": response["engine"],
+        }
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        _ensure_db_ready()
+        yield {"type": "header", "listsUsed": _build_lists_used()}
+        # iterparse reads ahead, so the live tree already holds later transactions
+        # when an end event arrives; the skeleton is rebuilt from the events instead.
+        skeleton = None
+        open_skeleton = []
+        stack = []
+        current = None
+        context_dirty = True
+        try:
+            for event, element in ET.iterparse(self.source, events=("start", "end")):
+                if event == "start":
+                    if current is None:
+                        if _local_name(element.tag) in TRANSACTION_TAGS:
+                            current = element
+                        elif open_skeleton:
+                            open_skeleton.append(ET.SubElement(open_skeleton[-1], element.tag, element.attrib))
+                        else:
+                            skeleton = ET.Element(element.tag, element.attrib)
+                            open_skeleton.append(skeleton)
+                    stack.append(element)
+                    continue
+                stack.pop()
+                if current is None:
+                    open_skeleton.pop().text = element.text
+                    context_dirty = True
+                    continue
+                if element is not current:
+                    continue
+                current = None
+                if stack:
+                    stack[-1].remove(element)
+                if context_dirty:
+                    self._refresh_context(skeleton)
+                    context_dirty = False
+                party_infos, transaction_info = _items(element)
+                element.clear()
+                yield self._record(
+                    self.transactions,
+                    party_infos,
+                    _merge_transaction(self._context_transaction, transaction_info),
+                )
+                self.transactions += 1
+        except ET.ParseError as e:
+            yield {"type": "error", "index": self.transactions, "detail": str(e)}
+            return
+        if skeleton is not None and not self.transactions:
+            #No transaction blocks: the whole message is one record, as /screen would return it.
+            party_infos, transaction_info = _items(skeleton)
+            yield self._record(0, party_infos, transaction_info)
+            self.transactions = 1
+        elif skeleton is not None and context_dirty:
+            #Skeleton parties after the last transaction still count towards the summary.
+            self._refresh_context(skeleton)
+        yield self._summary()
+
+
+def screen_stream(source) -> Iterator[Dict[str, Any]]:
+    """
+    Screen a bulk message read from a file object or path, yielding one dict
+    per transaction between a "header" record (listsUsed) and a "summary"
+    record (overall decision over every distinct party).
+    """
+    return iter(StreamScreener(source))
+
+
+def screen_stream_ndjson(source) -> Iterator[bytes]:
+    for record in screen_stream(source):
+        yield (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
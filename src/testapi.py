@@ -1,8 +1,43 @@
+import json
+from pathlib import Path
+
+import pytest
 from fastapi.testclient import TestClient
+
+import database
+import snapshot
+from config import get_config
+from decisioncache import decision_cache
+from resultcache import result_cache
+from src import api as api_module
 from src.api import app
 
 client = TestClient(app)
 
+RECORDS = [
+    {"list_name": "OFAC", "list_id": "22391", "classification": "Entity", "full_name": "TRANSNEFT-DRUZHBA, AO",
+     "primary_address_value": "d. 113 ul. Uralskaya", "address_city": "Bryansk", "address_country": "Russia",
+     "address_country_iso": "RU", "aliases": ["JSC 'DRUZHBA'"]},
+    {"list_name": "UN", "list_id": "QDe.093", "classification": "Entity",
+     "full_name": "BENEVOLENCE INTERNATIONAL FOUNDATION", "address_city": "Oak Lawn",
+     "address_country": "United States of America", "address_country_iso": "US", "aliases": ["BIF"]},
+]
+
+
+@pytest.fixture(autouse=True, scope="module")
+def sanctions_db():
+    # conftest points AML_DB_PATH at a scratch directory; build it so the api
+    # never falls back to refreshing the lists from the network.
+    db_path = get_config().paths.DB_PATH
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(snapshot, "_current", None)
+        database.createdatabase(RECORDS)
+        yield db_path
+        database.reset_read_connections()
+        decision_cache.clear()
+        result_cache.clear()
+    db_path.unlink(missing_ok=True)
+
 def test_health():
     r = client.get("/health")
     assert r.status_code == 200
@@ -12,3 +47,78 @@ def test_screen_basic():
     xml = "<Document><AppHdr/><Test>ok</Test></Document>"
     r = client.post("/screen", json={"xml": xml})
     assert r.status_code in (200, 400)
+
+def test_screen_stream_emits_one_line_per_transaction():
+    xml = (b"<Document><CstmrCdtTrfInitn><GrpHdr><MsgId>M1</MsgId></GrpHdr><PmtInf>"
+           + b"".join(b"<CdtTrfTxInf><PmtId><EndToEndId>E%d</EndToEndId></PmtId>"
+                      b"<Cdtr><Nm>Example GmbH</Nm></Cdtr></CdtTrfTxInf>" % i for i in range(3))
+           + b"</PmtInf></CstmrCdtTrfInitn></Document>")
+    r = client.post("/screen/stream", files={"file": ("bulk.xml", xml, "application/xml")})
+    assert r.status_code == 200
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert [line["type"] for line in lines] == ["header", "transaction", "transaction", "transaction", "summary"]
+    assert [line["transaction"]["End To End Id"] for line in lines[1:4]] == ["E0", "E1", "E2"]
+    assert lines[-1]["transactions"] == 3
+    assert lines[-1]["screenedParties"] == lines[-1]["uniqueParties"] < lines[-1]["parties"]
+
+def test_screen_batch_returns_responses_in_order():
+    safe = (Path(__file__).parent.parent / "data" / "iso" / "safe.xml").read_text(encoding="utf-8")
+    flagged = (Path(__file__).parent.parent / "data" / "iso" / "full.xml").read_text(encoding="utf-8")
+    r = client.post("/screen/batch", json=[safe, {"xml": flagged}, "<broken"])
+    assert r.status_code == 200
+    results = r.json()
+    assert [result.get("responseCode") for result in results[:2]] == [
+        client.post("/screen", json={"xml": xml}).json()["responseCode"] for xml in (safe, flagged)
+    ]
+    assert results[0]["responseCode"] != results[1]["responseCode"]
+    assert "error" in results[2]
+
+    r = client.post("/screen/batch", files=[("files", ("a.xml", safe)), ("files", ("b.xml", flagged))])
+    assert r.status_code == 200
+    assert [result["responseCode"] for result in r.json()] == [result["responseCode"] for result in results[:2]]
+
+def test_screen_stream_enforces_its_limit_while_reading(monkeypatch):
+    monkeypatch.setattr(api_module, "MAX_STREAM_MB", 0)
+    xml = (Path(__file__).parent.parent / "data" / "iso" / "full.xml").read_bytes()
+    body = b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"bulk.xml\"\r\n\r\n" + xml + b"\r\n--b--\r\n"
+    spooled = []
+    real_parse = api_module.MultiPartParser.parse
+
+    async def parse(self):
+        spooled.append(self)
+        return await real_parse(self)
+
+    monkeypatch.setattr(api_module.MultiPartParser, "parse", parse)
+    r = client.post("/screen/stream", content=iter([body[:100], body[100:]]),
+                    headers={"Content-Type": "multipart/form-data; boundary=b"})
+    assert r.status_code == 413
+    assert len(spooled) == 1
+    assert client.post("/screen/stream", content=xml, headers={"Content-Type": "application/xml"}).status_code == 400
+
+
+def test_screen_xml_raw_body_and_incremental_limit(monkeypatch):
+    xml = (Path(__file__).parent.parent / "data" / "iso" / "full.xml").read_bytes()
+    r = client.post("/screen/xml", content=xml, headers={"Content-Type": "application/xml"})
+    assert r.status_code == 200
+    assert r.json()["responseCode"] == client.post("/screen", json={"xml": xml.decode("utf-8")}).json()["responseCode"]
+
+    monkeypatch.setattr(api_module, "MAX_REQUEST_MB", 0)
+    r = client.post("/screen/xml", content=iter([xml[:100], xml[100:]]), headers={"Content-Type": "application/xml"})
+    assert r.status_code == 413
+    assert client.post("/screen/xml", content=b"{}", headers={"Content-Type": "application/json"}).status_code == 415
+
+def test_screen_batch_rejects_oversized_multipart_before_parsing(monkeypatch):
+    safe = (Path(__file__).parent.parent / "data" / "iso" / "safe.xml").read_bytes()
+    parsed = []
+    monkeypatch.setattr(api_module.MultiPartParser, "parse", lambda self: parsed.append(self) or None)
+    monkeypatch.setattr(api_module, "MAX_REQUEST_MB", 0)
+    r = client.post("/screen/batch", files=[("files", ("a.xml", safe))])
+    assert r.status_code == 413
+    assert parsed == []
+
+    monkeypatch.undo()
+    monkeypatch.setattr(api_module, "MAX_REQUEST_MB", 0)
+    body = b"--b\r\nContent-Disposition: form-data; name=\"files\"; filename=\"a.xml\"\r\n\r\n" + safe + b"\r\n--b--\r\n"
+    r = client.post("/screen/batch", content=iter([body[:100], body[100:]]),
+                    headers={"Content-Type": "multipart/form-data; boundary=b"})
+    assert r.status_code == 413
@@ -0,0 +1,40 @@
+import sqlite3
+
+from audit import AuditWriter, audit_entry, decode_audit_value
+
+RESPONSE = {
+    "parties": [{"Name": "Rosneft Trading SA"}],
+    "transaction": {"MsgId": "M1"},
+    "responseCode": "REVIEW",
+    "riskSummary": {"level": "high"},
+    "engine": {"responseCode": "REVIEW"},
+    "matches": [{"sanctionsList": "OFAC", "sanctionsId": "100", "finalScore": 90, "note": "x" * 500}],
+}
+
+
+def test_entries_are_written_in_batches_and_large_payloads_compressed(tmp_path):
+    writer = AuditWriter(tmp_path / "audit.db", queue_size=100, batch_size=50, compress_bytes=256, block_ms=0)
+    for i in range(5):
+        assert writer.enqueue(audit_entry("sha256:abc", RESPONSE, tx_id=f"tx{i}"))
+    assert writer.flush()
+    assert writer.stats()["written"] == 5
+
+    conn = sqlite3.connect(tmp_path / "audit.db")
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    inputs, matched, decision = conn.execute(
+        "SELECT inputs_json, matched_json, decision_json FROM screening_audit WHERE tx_id = 'tx3'"
+    ).fetchone()
+    conn.close()
+    assert isinstance(matched, bytes) and isinstance(inputs, str)
+    assert decode_audit_value(matched) == RESPONSE["matches"]
+    assert decode_audit_value(inputs)["ingestHash"] == "sha256:abc"
+    assert decode_audit_value(decision)["responseCode"] == "REVIEW"
+
+
+def test_full_queue_spills_to_the_overflow_file(tmp_path, monkeypatch):
+    writer = AuditWriter(tmp_path / "audit.db", queue_size=1, batch_size=10, compress_bytes=0, block_ms=0)
+    monkeypatch.setattr(writer, "_ensure_started", lambda: None)
+    assert writer.enqueue(audit_entry(None, RESPONSE))
+    assert not writer.enqueue(audit_entry(None, RESPONSE, tx_id="spilled"))
+    assert writer.stats()["overflowed"] == 1
+    assert '"tx_id": "spilled"' in writer.overflow_path.read_text(encoding="utf-8")
@@ -0,0 +1,212 @@
+import json
+import re
+import sqlite3
+import threading
+import tracemalloc
+from types import SimpleNamespace
+
+import pytest
+
+import database
+
+RECORDS = [
+    {"list_name": "OFAC", "list_id": "100", "full_name": "Rosneft Trading S.A.", "aliases": ["Rosneft Trading"], "address_country": "Switzerland"},
+    {"list_name": "UN", "list_id": "QDe.001", "full_name": "Example Relief Foundation", "primary_address_value": "12 Harbour Road"},
+    {"list_name": "CA", "list_id": "1", "first_name": "Ivan", "last_name": "Petrov", "nationality": "Russia"},
+    {"list_name": "CA", "list_id": "1", "full_name": "Second Regime Entity Ltd"},
+]
+
+SCAN_RE = re.compile(r"\bSCAN (s|d|sanctionslist|sanctionsdetails)\b")
+
+
+@pytest.fixture()
+def sanctions_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "cfg", SimpleNamespace(paths=SimpleNamespace(DB_PATH=tmp_path / "sanctions.db")))
+    database.createdatabase(RECORDS)
+    yield database.get_read_connection()
+    database.reset_read_connections()
+
+
+def _plan(conn, sql, params):
+    return [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+
+
+def test_batched_candidate_sql_resolves_by_key(sanctions_db):
+    sql = database._batched_candidate_sql(2, "bm25(sanctions_fts)", "")
+    plan = _plan(sanctions_db, sql, ["name:rosneft*", 10, "addresses:harbour*", 10])
+    assert plan
+    assert not [line for line in plan if SCAN_RE.search(line)], plan
+
+
+def test_records_by_rowid_sql_resolves_by_key(sanctions_db):
+    plan = _plan(sanctions_db, database._records_by_rowid_sql(3), [1, 2, 3])
+    assert not [line for line in plan if SCAN_RE.search(line)], plan
+
+
+def test_fts_rows_share_rowid_with_sanctionslist(sanctions_db):
+    rows = sanctions_db.execute(
+        "SELECT s.list_name, s.list_id, s.full_name, d.list_id "
+        "FROM sanctions_fts JOIN sanctionslist AS s ON s.rowid = sanctions_fts.rowid "
+        "JOIN sanctionsdetails AS d ON d.rowid = s.rowid "
+        "WHERE sanctions_fts MATCH 'name:second*'"
+    ).fetchall()
+    assert rows == [("CA", "1", "Second Regime Entity Ltd", "1")]
+
+
+def test_batch_retrieval_tags_matching_queries(sanctions_db):
+    rows = database.returnDetails2_fts_batch(
+        ["Rosneft Trading", {"field": "address", "value": "Harbour Road"}], None, 50
+    )
+    tagged = {(record[0], record[1]): matched for record, matched in rows}
+    assert tagged[("OFAC", "100")] == (0,)
+    assert tagged[("UN", "QDe.001")] == (1,)
+
+
+def test_prepared_records_are_cached_per_build(sanctions_db):
+    database.prepared_cache.clear()
+    first = database.returnDetails2_fts_multi(["Rosneft Trading"], None, 50, prepared=True)
+    stats = database.prepared_cache_stats()
+    assert stats["misses"] and stats["size"] == len(first)
+    second = database.returnDetails2_fts_multi(["Rosneft Trading"], None, 50, prepared=True)
+    assert [record.key for record in second] == [record.key for record in first]
+    assert second[0] is first[0]
+    assert database.prepared_cache_stats()["hits"] >= len(first)
+
+    database.createdatabase(RECORDS)
+    assert database.prepared_cache_stats()["size"] == 0
+    third = database.returnDetails2_fts_multi(["Rosneft Trading"], None, 50, prepared=True)
+    assert third[0] is not first[0]
+
+
+def test_records_stream_in_chunks_and_cluster_by_global_id(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "cfg", SimpleNamespace(paths=SimpleNamespace(DB_PATH=tmp_path / "sanctions.db")))
+    monkeypatch.setattr(database, "BUILD_CHUNK_SIZE", 2)
+    shared = [
+        {"list_name": "EU", "list_id": "EU.1", "global_id": "G-1", "full_name": "Bank Rossiya",
+         "aliases": ["Rossiya"], "address_country": "Russia"},
+        {"list_name": "UK", "list_id": "RUS0001", "global_id": "G-1", "full_name": "Joint Stock Company Bank Rossiya",
+         "aliases": ["AB Rossiya"], "address_country": "Latvia"},
+    ]
+    database.createdatabase(record for record in RECORDS + shared)
+    conn = database.get_read_connection()
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM sanctionslist").fetchone()[0] == len(RECORDS) + 2
+        (eid,) = {row[0] for row in conn.execute("SELECT entity_id FROM list_entity_map WHERE global_id='G-1'")}
+        name, countries = conn.execute("SELECT canonical_name, countries_json FROM entities WHERE entity_id=?", (eid,)).fetchone()
+        aliases = [row[0] for row in conn.execute("SELECT alias FROM entity_aliases WHERE entity_id=?", (eid,))]
+    finally:
+        database.reset_read_connections()
+    stats = database.build_stats()
+    assert stats["records"] == stats["steps"]["sanctionslist"]["rows"] == len(RECORDS) + 2
+    assert stats["steps"]["merged entities"]["rows"] >= 1
+    assert name == "Joint Stock Company Bank Rossiya"
+    assert set(json.loads(countries)) >= {"RU", "LV"}
+    assert {"Rossiya", "AB Rossiya"} <= set(aliases)
+
+
+def _rebuild_peak(tmp_path, monkeypatch, count):
+    monkeypatch.setattr(database, "cfg", SimpleNamespace(paths=SimpleNamespace(DB_PATH=tmp_path / f"sanctions-{count}.db")))
+    firsts, lasts = ("Ivan", "Olga", "Pavel", "Anna"), ("Petrov", "Sokolova", "Volkov", "Orlova", "Morozov")
+    database.createdatabase(
+        {"list_name": "UN", "list_id": str(i), "first_name": firsts[i % 4], "last_name": lasts[i % 5],
+         "aliases": [f"{lasts[i % 5]} Trading"], "primary_address": "12 Harbour Road", "address_country": "Cyprus"}
+        for i in range(count)
+    )
+    conn = sqlite3.connect(database.cfg.paths.DB_PATH)
+    try:
+        cur = conn.cursor()
+        tracemalloc.start()
+        database._rebuild_features_from_source(cur)
+        database._rebuild_fts_from_source(cur)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert cur.execute("SELECT COUNT(*) FROM sanctions_features").fetchone()[0] == count
+    finally:
+        conn.close()
+    return peak
+
+
+def test_rebuild_memory_stays_flat_as_rows_grow(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "BUILD_CHUNK_SIZE", 100)
+    small = _rebuild_peak(tmp_path, monkeypatch, 500)
+    large = _rebuild_peak(tmp_path, monkeypatch, 4000)
+    assert large < small * 1.5, (small, large)
+
+
+def test_index_is_verified_once_per_build(sanctions_db, monkeypatch):
+    version = database.get_build_version()
+    assert database.verify_index()["seconds"] == 0.0
+    database.createdatabase(RECORDS)
+    assert database.get_build_version() == version + 1
+    assert database.verify_index() == {"verified": True, "build_version": version + 1, "seconds": 0.0}
+
+    scans = []
+    monkeypatch.setattr(database, "_ensure_fts5", lambda conn: scans.append(conn))
+    database.returnDetails2_fts_multi(["Rosneft Trading"], None, 50)
+    assert scans == []
+    assert database.verify_index(force=True)["build_version"] == version + 1
+    assert len(scans) == 1
+
+
+def test_read_pool_keeps_one_read_only_connection_per_thread(sanctions_db):
+    assert database.get_read_connection() is sanctions_db
+    assert sanctions_db.execute("PRAGMA query_only").fetchone()[0] == 1
+    with pytest.raises(sqlite3.OperationalError):
+        sanctions_db.execute("DELETE FROM sanctionslist")
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(database.get_read_connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not sanctions_db
+
+    database.reset_read_connections()
+    reopened = database.get_read_connection()
+    assert reopened is not sanctions_db
+    assert reopened.execute("SELECT COUNT(*) FROM sanctionslist").fetchone()[0] == len(RECORDS)
+
+
+def test_batched_retrieval_matches_one_query_at_a_time(sanctions_db, monkeypatch):
+    queries = ["Rosneft Trading", "Ivan Petrov", {"field": "address", "value": "Harbour Road"}, "Second Regime"]
+    strategy = database.NAME_STRATEGY_PAIRWISE
+    expected = {}
+    for position, query in enumerate(queries):
+        for record, _ in database.returnDetails2_fts_batch([query], None, 50, strategy):
+            expected.setdefault((record[0], record[1]), set()).add(position)
+
+    monkeypatch.setattr(database, "FTS_BATCH_MAX_QUERIES", 3)
+    statements = []
+    sanctions_db.set_trace_callback(lambda sql: statements.append(sql) if "qslot" in sql else None)
+    try:
+        rows = database.returnDetails2_fts_batch(queries, None, 50, strategy)
+    finally:
+        sanctions_db.set_trace_callback(None)
+    assert {(record[0], record[1]): set(matched) for record, matched in rows} == expected
+    assert len(statements) == 2
+    assert statements[0].count("UNION ALL") == 2
+
+
+def test_frequent_prefixes_only_rank_reached_documents(sanctions_db, monkeypatch):
+    cur = sanctions_db.cursor()
+    postings, frequent = database._name_postings(cur, [["rosneft", "trading", "s"]], "", [], max_postings=1)
+    assert frequent == {"s": 2}
+    assert postings["s"] == [1]
+    ranked = database._min_should_match_candidates(["rosneft", "trading", "s"], postings, 4, 50, frequent=frequent)
+    assert ranked == [(1, -1.0)]
+    assert database._min_should_match_candidates(["s"], postings, 4, 50, frequent=frequent) == []
+
+    monkeypatch.setattr(database, "NAME_TOKEN_MAX_POSTINGS", 1)
+    rows = database.returnDetails2_fts_batch(
+        ["Rosneft S", {"field": "address", "value": "Harbour Road"}], None, 50
+    )
+    assert [((record[0], record[1]), matched) for record, matched in rows] == [
+        (("OFAC", "100"), (0,)), (("UN", "QDe.001"), (1,))
+    ]
+
+
+def test_fts_score_fallback_never_moves_back(monkeypatch):
+    monkeypatch.setitem(database._fts_score_variant, "index", 0)
+    database._skip_fts_score_variant(1)
+    # A thread that started on the first variant fails after another thread already skipped past it.
+    database._skip_fts_score_variant(0)
+    assert database._current_fts_score_variant() == 2
@@ -0,0 +1,80 @@
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+import database
+import decisioncache
+import engine
+from decisioncache import DecisionCache
+
+PARTY = {"Name": "Rosneft Trading SA", "Street": "Rue du Rhone 8", "Role": "Debtor"}
+RESULT = {"matches": [{"sanctionsList": "OFAC", "sanctionsId": "100", "finalScore": 70}], "counts": {"no risk": 3}}
+
+
+@pytest.fixture()
+def cache_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "cfg", SimpleNamespace(paths=SimpleNamespace(DB_PATH=tmp_path / "sanctions.db")))
+    database.createdatabase([{"list_name": "OFAC", "list_id": "100", "full_name": "Rosneft Trading S.A."}])
+    yield tmp_path / "match_cache.db"
+    database.reset_read_connections()
+
+
+def test_decisions_round_trip_through_l1_and_match_cache(cache_db):
+    cache = DecisionCache(l1_size=10, ttl_seconds=60, max_rows=100, db_path=cache_db)
+    key = cache.key(PARTY, 1)
+    assert key != cache.key(PARTY, 2)
+    assert key != cache.key(dict(PARTY, Street="Other Street 1"), 1)
+    assert cache.get(key) is None
+
+    cache.put_many([(key, RESULT)])
+    assert cache.get(key) == RESULT
+    cache.clear()
+    assert cache.get(key) == RESULT
+    stats = cache.stats()
+    assert (stats["misses"], stats["l1_hits"], stats["l2_hits"]) == (1, 1, 1)
+
+
+def test_match_cache_lives_in_its_own_wal_database(cache_db):
+    cache = DecisionCache(l1_size=0, ttl_seconds=60, max_rows=100, db_path=cache_db)
+    key = cache.key(PARTY, 1)
+    cache.put_many([(key, RESULT)])
+    database.createdatabase([{"list_name": "OFAC", "list_id": "100", "full_name": "Rosneft Trading S.A."}])
+    assert cache.get(key) == RESULT
+
+    sanctions = sqlite3.connect(database.cfg.paths.DB_PATH)
+    try:
+        assert not sanctions.execute("SELECT 1 FROM sqlite_master WHERE name = 'match_cache'").fetchall()
+    finally:
+        sanctions.close()
+    assert cache.store._connection().execute("PRAGMA journal_mode").fetchone() == ("wal",)
+
+
+def test_expired_and_surplus_rows_are_evicted(cache_db, monkeypatch):
+    monkeypatch.setattr(decisioncache, "SWEEP_EVERY_WRITES", 3)
+    cache = DecisionCache(l1_size=0, ttl_seconds=60, max_rows=2, db_path=cache_db)
+    keys = [cache.key(dict(PARTY, Name=f"Party {i}"), 1) for i in range(3)]
+    cache.put_many([(key, RESULT) for key in keys])
+    assert cache.stats()["l2_evictions"] == 1
+    assert sum(cache.get(key) is not None for key in keys) == 2
+
+    expired = DecisionCache(l1_size=10, ttl_seconds=60, max_rows=100, db_path=cache_db)
+    real_time = decisioncache.time.time
+    monkeypatch.setattr(decisioncache.time, "time", lambda: 1000.0)
+    expired.put_many([(keys[0], RESULT)])
+    monkeypatch.setattr(decisioncache.time, "time", real_time)
+    assert expired.get(keys[0]) is None
+
+
+def test_decisions_are_keyed_on_the_snapshot_screened_against(cache_db, monkeypatch):
+    cache = DecisionCache(l1_size=10, ttl_seconds=60, max_rows=100, db_path=cache_db)
+    stale = SimpleNamespace(build_version=database.get_build_version() - 1)
+    monkeypatch.setattr(engine, "decision_cache", cache)
+    monkeypatch.setattr(engine.cfg.screening, "USE_SNAPSHOT", True)
+    monkeypatch.setattr(engine.cfg.screening, "DECISION_CACHE", True)
+    monkeypatch.setattr(engine, "get_snapshot", lambda: stale)
+    monkeypatch.setattr(engine, "_screen_uncached", lambda parties, snapshot: [RESULT for _ in parties])
+
+    assert engine._screen_parties([PARTY]) == [RESULT]
+    assert cache.get(cache.key(PARTY, stale.build_version)) == RESULT
+    assert cache.get(cache.key(PARTY, database.get_build_version())) is None
@@ -0,0 +1,37 @@
+import json
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import pytest
+
+from isoparser import parse, parse_element
+
+ISO_DIR = Path(__file__).parent.parent / "data" / "iso"
+EXPECTED_DIR = ISO_DIR / "expected"
+
+
+def _expected(name):
+    return json.loads((EXPECTED_DIR / name).read_text(encoding="utf-8"))
+
+
+@pytest.mark.parametrize("path", sorted(ISO_DIR.glob("*.xml")), ids=lambda path: path.name)
+def test_parse_matches_expected_output(path):
+    # json.dumps also compares key order, which ends up in the response.
+    assert json.dumps(parse(path.read_bytes())) == json.dumps(_expected(path.stem + ".json"))
+
+
+def test_parse_element_matches_parse():
+    xml = (ISO_DIR / "full.xml").read_bytes()
+    parsed = parse(xml)
+    parsed["metadata"]["ingestHash"] = None
+    assert json.dumps(parse_element(ET.fromstring(xml))) == json.dumps(parsed)
+
+
+def test_bulk_message_matches_expected_output():
+    xml = (ISO_DIR / "full.xml").read_bytes()
+    start = xml.index(b"<CdtTrfTxInf>")
+    end = xml.rindex(b"</CdtTrfTxInf>") + len(b"</CdtTrfTxInf>")
+    bulk = xml[:start] + xml[start:end] * 3 + xml[end:]
+    parsed = parse(bulk)
+    assert json.dumps(parsed) == json.dumps(_expected("full.bulk3.json"))
+    assert len(parsed["parties"]) > 3
@@ -0,0 +1,101 @@
+import hashlib
+import json
+from pathlib import Path
+
+from types import SimpleNamespace
+
+import database
+import listload
+from sourcefetch import FetchedSource
+
+
+def _json_hash(rows):
+    whole = json.dumps(list(rows), sort_keys=True, ensure_ascii=False, default=str)
+    return "sha256:" + hashlib.sha256(whole.encode("utf-8")).hexdigest()
+
+
+def _broken_fetch(revalidate=True):
+    raise RuntimeError("download failed and no backup found")
+
+
+def test_failing_list_is_reported_without_stopping_the_others(monkeypatch):
+    monkeypatch.setattr(listload, "LIST_LOADERS", {
+        "UN consolidated": (None, lambda revalidate=True: ["a", "b"],
+                            lambda raw: [{"list_name": "UN", "full_name": x} for x in raw]),
+        "EU consolidated": (None, _broken_fetch, lambda raw: raw),
+    })
+    rows_by_list, report = listload.load_lists(workers=1)
+    assert list(rows_by_list) == ["UN consolidated"]
+    assert report["UN consolidated"]["rows"] == 2 and report["UN consolidated"]["error"] is None
+    assert report["UN consolidated"]["contentHash"] == _json_hash(rows_by_list["UN consolidated"])
+    assert report["EU consolidated"]["error"].startswith("RuntimeError")
+    assert report["EU consolidated"]["fetchSeconds"] is None
+
+
+def test_unchanged_sources_skip_the_extract(monkeypatch):
+    extracted = []
+    monkeypatch.setattr(listload, "LIST_LOADERS", {
+        "UN consolidated": (("UN", "http://un.test/list.xml", "UNlog.txt"), lambda revalidate=True: ["a"],
+                            lambda raw: extracted.append(raw) or [{"list_name": "UN", "full_name": "a"}]),
+    })
+    monkeypatch.setattr(listload, "fetch_source", lambda key, url, log: FetchedSource(
+        key=key, path=Path("UN.raw"), content_hash="sha256:1", etag='"1"', changed=False, not_modified=True))
+    monkeypatch.setattr(listload, "get_list_metadata", lambda: {"UN consolidated": {"sourceHash": "sha256:1"}})
+    rows_by_list, report = listload.load_lists(workers=1)
+    assert rows_by_list is None and extracted == []
+    assert report["UN consolidated"]["unchanged"] and report["UN consolidated"]["notModified"]
+
+    rows_by_list, report = listload.load_lists(workers=1, force=True)
+    assert list(rows_by_list["UN consolidated"]) == [
+        {"list_name": "UN", "full_name": "a", "source_url": "http://un.test/list.xml", "source_etag": '"1"'}
+    ]
+    assert report["UN consolidated"]["sourceHash"] == "sha256:1"
+
+    monkeypatch.setattr(listload, "get_list_metadata", lambda: {"UN consolidated": {"sourceHash": "sha256:0"}})
+    rows_by_list, _ = listload.load_lists(workers=1)
+    assert list(rows_by_list) == ["UN consolidated"]
+    listload.discard_rows(rows_by_list)
+
+
+def test_rows_carry_their_download_into_provenance(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "cfg", SimpleNamespace(paths=SimpleNamespace(DB_PATH=tmp_path / "sanctions.db")))
+    monkeypatch.setattr(listload, "LIST_LOADERS", {
+        "UN consolidated": (("UN", "http://un.test/list.xml", "UNlog.txt"), lambda revalidate=True: ["a"],
+                            lambda raw: [{"list_name": "UN", "list_id": "1", "full_name": "Example Person"}]),
+        "EU consolidated": (("EU", "http://eu.test/list.xml", "EUlog.txt"), lambda revalidate=True: ["b"],
+                            lambda raw: [{"list_name": "EU", "list_id": "2", "full_name": "Other Person",
+                                          "source_etag": "from-the-list"}]),
+    })
+    monkeypatch.setattr(listload, "fetch_source", lambda key, url, log: FetchedSource(
+        key=key, path=Path(key + ".raw"), content_hash="sha256:" + key, etag='"un-7"' if key == "UN" else None))
+    monkeypatch.setattr(listload, "get_list_metadata", lambda: {})
+    rows_by_list, report = listload.load_lists(workers=1)
+    bare, bare_hash = listload.spill_rows(iter([{"list_name": "UN", "list_id": "1", "full_name": "Example Person"}]))
+    bare.discard()
+    assert report["UN consolidated"]["contentHash"] == bare_hash
+
+    database.createdatabase(listload.drain_rows(rows_by_list))
+    conn = database.get_read_connection()
+    provenance = conn.execute("SELECT list_name, source_url, source_etag FROM provenance ORDER BY list_name").fetchall()
+    database.reset_read_connections()
+    assert provenance == [("EU", "http://eu.test/list.xml", "from-the-list"), ("UN", "http://un.test/list.xml", '"un-7"')]
+
+
+def test_rows_are_spilled_in_chunks_and_deleted_once_consumed(monkeypatch):
+    monkeypatch.setattr(listload, "SPILL_CHUNK_ROWS", 2)
+    rows = [{"list_name": "UN", "list_id": str(i), "full_name": f"Person {i}"} for i in range(5)]
+    first, first_hash = listload.spill_rows(iter([dict(row) for row in rows]), {"source_etag": '"1"'})
+    second, _ = listload.spill_rows(iter(rows[:1]))
+    assert first_hash == _json_hash(rows)
+    assert len(first) == 5 and Path(first.path).exists()
+
+    rows_by_list = {"UN consolidated": first, "EU consolidated": second}
+    drained = listload.drain_rows(rows_by_list)
+    assert next(drained) == dict(rows[0], source_etag='"1"')
+    assert [row["list_id"] for row in drained] == ["1", "2", "3", "4", "0"]
+    assert not Path(first.path).exists() and not Path(second.path).exists()
+
+    abandoned, _ = listload.spill_rows(iter(rows))
+    rows_by_list = {"UN consolidated": abandoned}
+    listload.discard_rows(rows_by_list)
+    assert rows_by_list == {} and not Path(abandoned.path).exists()
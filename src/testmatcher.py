@@ -0,0 +1,115 @@
+import json
+
+import matcher
+from matcher import (
+    RecordMatrix,
+    TokenDictionary,
+    evaluate_match,
+    matching,
+    normalize_party,
+    prepare_record,
+    prepared_from_json,
+    prepared_to_json,
+    prepared_token_vocabulary,
+    tokenize,
+)
+
+
+def _record(list_name, list_id, full_name="", first="", last="", aliases=(), street="", city="", state="",
+            country="", country_iso="", alt_addresses=(), ids=()):
+    return (
+        list_name, list_id, "Entity", full_name, first, "", last, "",
+        "", "", "",
+        street, city, state, "", country, country_iso,
+        json.dumps(list(alt_addresses)), json.dumps(list(aliases)), json.dumps(list(ids)),
+        "", "",
+    )
+
+
+RECORDS = [
+    _record("OFAC", "1", "Rosneft Trading S.A.", aliases=["Rosneft Trading", "RTSA"], street="Rue du Rhone 8",
+            city="Geneva", country="Switzerland", country_iso="CH"),
+    _record("OFAC", "2", first="Ivan", last="Petrov", city="Saint Petersburg", state="Leningrad Oblast",
+            country="Russia", ids=["AB 123456"]),
+    _record("UN", "3", "Example Relief Foundation", street="12 Harbour Road", city="Karachi", country="Pakistan",
+            alt_addresses=["PO Box 77 Karachi"]),
+    _record("CA", "4", "Petrov Ivan Trading Company", aliases=["Ivan Petrov Trading"], city="Moscow", country="Russia"),
+    _record("CA", "5", "Harbour Road Holdings", street="Harbour Road 12", city="Geneva", state="Geneva"),
+    _record("UN", "6", "Rosneft", aliases=[], country_iso="RU"),
+    _record("OFAC", "7", "Bank Melli Iran", aliases=["Melli Bank", "BMI Iran"], city="Tehran", country="Iran"),
+]
+
+PARTIES = [
+    {"Name": "Rosneft Trading SA", "Street": "Rue du Rhone 8", "City": "Geneva", "Country": "Switzerland"},
+    {"Name": "Ivan Petrov", "City": "Petersburg", "State": "Leningrad", "IdNumbers": ["ab123456"]},
+    {"Name": "Petrov Ivan", "Aliases": ["Ivan Petrov Trading Co"], "Country": "Russia"},
+    {"Name": "Example Relief", "Street": "12 Harbour Road", "City": "Karachi"},
+    {"Name": "Harbour Road", "Street": "Harbour Road 12", "State": "Geneva", "CountryCode": "CH"},
+    {"Name": "Melli", "Aliases": ["Bank Melli"], "City": "Tehran"},
+    {"Name": "Unrelated Person", "Country": "Norway"},
+]
+
+
+class _Config:
+    SHOW_SLIGHT_MATCHES = True
+
+    def __init__(self, vector):
+        self.VECTOR_SCORING = vector
+
+
+def test_vector_scores_match_evaluate_match():
+    prepared = [prepare_record(record) for record in RECORDS]
+    matrix = RecordMatrix(prepared)
+    for party in PARTIES:
+        party_norm = normalize_party(party)
+        name_tokens = tokenize(party_norm["name"])
+        alias_tokens = [tokenize(alias) for alias in party_norm["aliases"]]
+        scores, exact = matrix.score(party_norm, name_tokens, alias_tokens)
+        for position, record in enumerate(prepared):
+            assert exact[position]
+            reference = evaluate_match(
+                party_norm, record.norm, "", name_tokens, record.name_tokens, alias_tokens, record.alias_tokens
+            )
+            assert reference is not None
+            assert reference["finalScore"] == min(100, int(round(min(1.0, scores[position]) * 100))), (party, record.key)
+
+
+def test_matching_is_identical_with_and_without_vector_scoring(monkeypatch):
+    monkeypatch.setattr(matcher, "VECTOR_MIN_RECORDS", 1)
+    parties = [dict(party, Role="Debtor", index=i) for i, party in enumerate(PARTIES)]
+    results = []
+    for vector in (False, True):
+        result = matching(parties, {}, [prepare_record(record) for record in RECORDS], _Config(vector))
+        result.pop("timeflagged")
+        results.append(result)
+    assert results[0] == results[1]
+    assert results[0]["matches"]
+
+
+def test_token_dictionary_ids_score_like_local_interning():
+    local = [prepare_record(record) for record in RECORDS]
+    tokens = TokenDictionary(prepared_token_vocabulary(local))
+    encoded = [prepare_record(record, tokens) for record in RECORDS]
+    assert list(encoded[0].name_ids) == sorted(tokens.ids[token] for token in set(encoded[0].name_tokens))
+    local_matrix, shared_matrix = RecordMatrix(local), RecordMatrix(encoded)
+    assert shared_matrix.tokens is tokens.ids
+    for party in PARTIES:
+        party_norm = normalize_party(party)
+        name_tokens = tokenize(party_norm["name"])
+        alias_tokens = [tokenize(alias) for alias in party_norm["aliases"]]
+        expected, _ = local_matrix.score(party_norm, name_tokens, alias_tokens)
+        actual, _ = shared_matrix.score(party_norm, name_tokens, alias_tokens)
+        assert expected.tolist() == actual.tolist()
+
+
+def test_encoded_records_hold_and_persist_token_ids_only():
+    local = [prepare_record(record) for record in RECORDS]
+    tokens = TokenDictionary(prepared_token_vocabulary(local))
+    for record, plain in zip(RECORDS, local):
+        payload = prepared_to_json(prepare_record(record, tokens))
+        _, name_ids, alias_ids, address_ids = json.loads(payload)
+        assert all(isinstance(token_id, int) for ids in [name_ids, *alias_ids, *address_ids] for token_id in ids)
+        restored = prepared_from_json(payload, tokens)
+        assert restored.name_tokens == plain.name_tokens
+        assert restored.alias_tokens == plain.alias_tokens
+        assert restored.address_tokens == plain.address_tokens
@@ -0,0 +1,62 @@
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+import database
+import engine
+import prefork
+
+
+@pytest.fixture()
+def arbiter(monkeypatch):
+    monkeypatch.setattr(prefork, "_uvicorn_config", lambda: None)
+    arbiter = prefork.Arbiter(sock=None, workers=2)
+    pids = itertools.count(100)
+    retired = []
+    monkeypatch.setattr(arbiter, "_spawn", lambda: arbiter.children.__setitem__(next(pids), arbiter.generation))
+    monkeypatch.setattr(arbiter, "_retire", retired.extend)
+    arbiter._spawn_generation()
+    arbiter.retired = retired
+    return arbiter
+
+
+def test_reload_replaces_the_generation_after_loading_shared_state(arbiter, monkeypatch):
+    loads = []
+    monkeypatch.setattr(prefork, "_load_shared_state", lambda: loads.append(arbiter.generation))
+    arbiter.reload()
+    assert loads == [0]
+    assert arbiter.generation == 1
+    assert arbiter.children == {100: 0, 101: 0, 102: 1, 103: 1}
+    assert arbiter.retired == [100, 101]
+
+
+def test_failed_reload_keeps_the_current_generation_serving(arbiter, monkeypatch, caplog):
+    def broken():
+        raise RuntimeError("index verification failed")
+
+    monkeypatch.setattr(prefork, "_load_shared_state", broken)
+    arbiter.reload()
+    assert arbiter.generation == 0
+    assert arbiter.children == {100: 0, 101: 0}
+    assert arbiter.retired == []
+    assert "reload failed" in caplog.text
+
+
+def test_refresh_in_a_prefork_worker_leaves_the_snapshot_to_the_parent(tmp_path, monkeypatch):
+    paths = SimpleNamespace(DB_PATH=tmp_path / "sanctions.db")
+    monkeypatch.setattr(database, "cfg", SimpleNamespace(paths=paths))
+    monkeypatch.setattr(engine, "cfg", SimpleNamespace(paths=paths, screening=SimpleNamespace(REFRESH_WORKERS=1)))
+    rows = [{"list_name": "UN", "list_id": "1", "full_name": "Example Person"}]
+    monkeypatch.setattr(engine, "load_lists", lambda workers, force: ({"UN consolidated": list(rows)}, {"UN consolidated": {}}))
+    rebuilds = []
+    monkeypatch.setattr(engine, "refresh_snapshot_async", lambda: rebuilds.append(True))
+
+    monkeypatch.setenv(prefork.PARENT_ENV, "1")
+    assert engine.refresh_lists() == 1
+    assert rebuilds == []
+
+    monkeypatch.delenv(prefork.PARENT_ENV)
+    assert engine.refresh_lists() == 1
+    assert rebuilds == [True]
+    database.reset_read_connections()
@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+import engine
+from resultcache import ResultCache, ingest_hash
+
+RESPONSE = {"responseCode": "OK", "riskSummary": {"level": "no risk", "time": "2020-01-01T00:00:00Z"}, "matches": []}
+
+
+def test_hits_keep_the_decision_and_refresh_the_timestamp(tmp_path):
+    cache = ResultCache(max_bytes=1 << 20, directory=tmp_path)
+    key = cache.key(ingest_hash(b"<Document/>"), 1)
+    assert key != cache.key(ingest_hash(b"<Document/>"), 2)
+    assert cache.get(key) is None
+
+    cache.put(key, RESPONSE)
+    hit = cache.get(key)
+    assert hit["responseCode"] == "OK" and hit["matches"] == []
+    assert hit["riskSummary"]["time"] != RESPONSE["riskSummary"]["time"]
+
+    restarted = ResultCache(max_bytes=1 << 20, directory=tmp_path)
+    assert restarted.get(key)["riskSummary"]["level"] == "no risk"
+    stats = cache.stats()
+    assert (stats["misses"], stats["memory_hits"], restarted.stats()["disk_hits"]) == (1, 1, 1)
+
+
+def test_memory_is_bounded_by_stored_bytes():
+    cache = ResultCache(max_bytes=250)
+    keys = [cache.key(ingest_hash(str(i).encode()), 1) for i in range(3)]
+    for key in keys:
+        cache.put(key, RESPONSE)
+    assert cache.stats()["bytes"] <= 250
+    assert cache.stats()["evictions"] >= 1
+    assert cache.get(keys[0]) is None and cache.get(keys[-1]) is not None
+
+
+def test_responses_are_keyed_on_the_snapshot_screened_against(monkeypatch):
+    cache = ResultCache(max_bytes=1 << 20)
+    snapshot = SimpleNamespace(build_version=7)
+    monkeypatch.setattr(engine, "result_cache", cache)
+    monkeypatch.setattr(engine.cfg.screening, "RESULT_CACHE", True)
+    monkeypatch.setattr(engine.cfg.screening, "USE_SNAPSHOT", True)
+    monkeypatch.setattr(engine.cfg.screening, "AUDIT", False)
+    monkeypatch.setattr(engine, "get_snapshot", lambda: snapshot)
+    monkeypatch.setattr(engine, "get_build_version", lambda: 8)
+    monkeypatch.setattr(engine, "summarize_parties", lambda results, config: {})
+    monkeypatch.setattr(engine, "submitresponse", lambda *args: dict(RESPONSE))
+    message_hash = ingest_hash(b"<Document/>")
+
+    slot, cached = engine._cached_response(message_hash)
+    assert cached is None and slot == (cache.key(message_hash, 7), 7)
+    engine._finish_response(message_hash, slot, {"metadata": {}}, [], {}, [])
+    assert cache.get(cache.key(message_hash, 7)) is not None
+
+    # The new snapshot was swapped in while the message was screened: nothing is stored.
+    other = ingest_hash(b"<Document><Other/></Document>")
+    slot, _ = engine._cached_response(other)
+    snapshot.build_version = 8
+    engine._finish_response(other, slot, {"metadata": {}}, [], {}, [])
+    assert cache.get(slot[0]) is None and cache.get(cache.key(other, 8)) is None
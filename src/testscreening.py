@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+import pytest
+
+import database
+import readLog
+import screening
+from listload import spill_rows
+
+
+@pytest.fixture()
+def meta_db(tmp_path, monkeypatch):
+    paths = SimpleNamespace(DB_PATH=tmp_path / "sanctions.db", DATA_DIR=tmp_path)
+    monkeypatch.setattr(database, "cfg", SimpleNamespace(paths=paths))
+    monkeypatch.setattr(readLog, "cfg", SimpleNamespace(paths=paths))
+    database.createdatabase([{"list_name": "UN", "list_id": "1", "full_name": "Example Person"}])
+    screening.invalidate_lists_used()
+    yield tmp_path
+    screening.invalidate_lists_used()
+    database.reset_read_connections()
+
+
+def test_lists_used_comes_from_sanctions_meta_and_is_cached(meta_db, monkeypatch):
+    (meta_db / "UNlog.txt").write_text("2025-10-01T00:00:00+00:00\n2025-10-06T00:00:00+00:00\n", encoding="utf-8")
+    rows = [{"list_name": "UN", "list_id": "1", "full_name": "Example Person"}]
+    spilled, content_hash = spill_rows(iter(rows))
+    entries = screening.list_refresh_entries({"UN consolidated": {"rows": len(spilled), "contentHash": content_hash, "error": None}})
+    database.createdatabase(spilled, list_metadata=entries)
+
+    meta = database.get_list_metadata()["UN consolidated"]
+    assert meta["rows"] == 1 and meta["contentHash"].startswith("sha256:")
+    assert meta["lastRefreshedAt"] == "2025-10-06T00:00:00+00:00"
+
+    reads = []
+    monkeypatch.setattr(screening, "readLogFiles", lambda name: reads.append(name) or "N/A")
+    first = screening._build_lists_used()
+    assert next(item for item in first if item["name"] == "UN consolidated")["lastRefreshedAt"] == meta["lastRefreshedAt"]
+    reads.clear()
+    assert screening._build_lists_used() == first
+    assert reads == []
+
+
+def test_rebuild_publishes_list_metadata_with_the_build_version(meta_db, monkeypatch):
+    (meta_db / "UNlog.txt").write_text("2025-10-01T00:00:00+00:00\n", encoding="utf-8")
+    screening._build_lists_used()
+    (meta_db / "UNlog.txt").write_text("2025-10-06T00:00:00+00:00\n", encoding="utf-8")
+    rows = [{"list_name": "UN", "list_id": "1", "full_name": "Example Person"}]
+    spilled, content_hash = spill_rows(iter(rows))
+    spilled.discard()
+    entries = screening.list_refresh_entries({"UN consolidated": {"rows": 1, "contentHash": content_hash}})
+
+    published = []
+    write_build_version = database._write_build_version
+
+    def observe(cur, version):
+        cur.execute("SELECT value FROM sanctions_meta WHERE key = ?", (database.LIST_META_PREFIX + "UN consolidated",))
+        published.append((cur.fetchone() is not None, version))
+        write_build_version(cur, version)
+
+    monkeypatch.setattr(database, "_write_build_version", observe)
+    version = database.get_build_version()
+    database.createdatabase(rows, list_metadata=entries)
+    assert published == [(True, version + 1)]
+    used = next(item for item in screening._build_lists_used() if item["name"] == "UN consolidated")
+    assert used["lastRefreshedAt"] == "2025-10-06T00:00:00+00:00"
+
+
+def test_touched_metadata_reaches_workers_that_cached_the_old_value(meta_db):
+    (meta_db / "UNlog.txt").write_text("2025-10-01T00:00:00+00:00\n", encoding="utf-8")
+    rows = [{"list_name": "UN", "list_id": "1", "full_name": "Example Person"}]
+    database.createdatabase(rows, list_metadata=screening.list_refresh_entries({"UN consolidated": {"rows": 1}}))
+    before = next(item for item in screening._build_lists_used() if item["name"] == "UN consolidated")
+    assert before["lastRefreshedAt"] == "2025-10-01T00:00:00+00:00"
+
+    # Another worker re-checks the source; this process's cache is not invalidated.
+    (meta_db / "UNlog.txt").write_text("2025-10-06T00:00:00+00:00\n", encoding="utf-8")
+    cached = screening._lists_used_cache
+    screening.touch_list_refresh(["UN consolidated"])
+    screening._lists_used_cache = cached
+    after = next(item for item in screening._build_lists_used() if item["name"] == "UN consolidated")
+    assert after["lastRefreshedAt"] == "2025-10-06T00:00:00+00:00"
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import pytest
+
+import database
+import snapshot
+
+RECORDS = [
+    {"list_name": "UN", "list_id": "SYi.001", "full_name": "Bashar al-Assad", "aliases": ["Bashar Hafez al-Assad"]},
+    {"list_name": "UK", "list_id": "RUS1446", "first_name": "Vladimir", "middle_name": "Vladimirovich", "last_name": "Putin"},
+    {"list_name": "OFAC", "list_id": "7001", "full_name": "Mohammad Abdul Rahman", "primary_address_value": "14 Al-Rashid Street"},
+    {"list_name": "OFAC", "list_id": "7002", "full_name": "Abdul Basit Mohammed", "aliases": ["Abu Basit"]},
+    {"list_name": "OFAC", "list_id": "100", "full_name": "Rosneft Trading S.A.", "primary_address_value": "Rue du Rhone 14"},
+    {"list_name": "CA", "list_id": "1", "first_name": "Ivan", "last_name": "Petrov", "primary_address_value": "Rashid Avenue 2"},
+    {"list_name": "EU", "list_id": "EU.9", "full_name": "Société Générale d'Équipement", "aliases": ["SGE"]},
+]
+
+QUERIES = [
+    "Bashar Assad",
+    "Vladim Putin",
+    "Mohamm Abdul",
+    "Bashar al-Assad",
+    "Rosneft Trading S.A.",
+    "Societe Generale",
+    "Ivan",
+    {"field": "address", "value": "Al-Rashid"},
+    {"field": "address", "value": "Rue du Rh"},
+]
+
+
+@pytest.fixture()
+def sanctions_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "cfg", SimpleNamespace(paths=SimpleNamespace(DB_PATH=tmp_path / "sanctions.db")))
+    database.createdatabase(RECORDS)
+    yield snapshot.build_snapshot()
+    database.reset_read_connections()
+
+
+def _fts_keys(queries):
+    return [(record[0], record[1]) for record in database.returnDetails2_fts_multi(queries, None, 500)]
+
+
+def test_snapshot_candidates_contain_fts_candidates(sanctions_snapshot):
+    assert len(sanctions_snapshot) == len(RECORDS)
+    for query in QUERIES:
+        expected = _fts_keys([query])
+        found = [record.key for record in sanctions_snapshot.candidates([query])]
+        assert expected, query
+        assert set(expected) <= set(found), query
+    assert {record.key for record in sanctions_snapshot.candidates(QUERIES)} >= set(_fts_keys(QUERIES))
+
+
+def test_snapshot_prefix_matching_splits_hyphenated_names(sanctions_snapshot):
+    assert [record.key for record in sanctions_snapshot.candidates(["Bashar Assad"])] == [("UN", "SYi.001")]
+    assert [record.key for record in sanctions_snapshot.candidates(["Vladim Putin"])] == [("UK", "RUS1446")]
+    assert {record.key for record in sanctions_snapshot.candidates(["Mohamm Abdul"])} == {("OFAC", "7001"), ("OFAC", "7002")}
+
+
+def test_snapshot_applies_the_frequent_prefix_cap_like_fts(sanctions_snapshot, monkeypatch):
+    monkeypatch.setattr(database, "NAME_TOKEN_MAX_POSTINGS", 1)
+    results = {}
+    for query in ["Mohamm Basit", "Rosneft Trading S A", "Abdul"]:
+        results[query] = _fts_keys([query])
+        assert [record.key for record in sanctions_snapshot.candidates([query], max_postings=1)] == results[query], query
+    assert results == {"Mohamm Basit": [("OFAC", "7002")], "Rosneft Trading S A": [("OFAC", "100")], "Abdul": []}
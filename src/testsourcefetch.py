@@ -0,0 +1,76 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+import sourcefetch
+
+
+class _Source(BaseHTTPRequestHandler):
+    body = b"<list>v1</list>"
+    etag = '"v1"'
+    requests = []
+
+    def do_GET(self):
+        type(self).requests.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", self.etag)
+        self.send_header("Last-Modified", "Wed, 01 Oct 2025 00:00:00 GMT")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    monkeypatch.setattr(sourcefetch, "cfg", SimpleNamespace(
+        paths=SimpleNamespace(DATA_DIR=tmp_path, SOURCE_CACHE_DIR=tmp_path / "sources")))
+    _Source.body, _Source.etag, _Source.requests = b"<list>v1</list>", '"v1"', []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Source)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/list.xml"
+    server.shutdown()
+    server.server_close()
+
+
+def test_conditional_request_reuses_the_stored_download(source, tmp_path):
+    first = sourcefetch.fetch_source("T", source, "Tlog.txt")
+    assert first.changed and first.content == b"<list>v1</list>" and first.etag == '"v1"'
+
+    second = sourcefetch.fetch_source("T", source, "Tlog.txt")
+    assert _Source.requests[-1]["If-None-Match"] == '"v1"'
+    assert second.not_modified and not second.changed
+    assert second.content == first.content and second.content_hash == first.content_hash
+    assert len((tmp_path / "Tlog.txt").read_text().splitlines()) == 2
+
+    offline = sourcefetch.fetch_source("T", source, "Tlog.txt", revalidate=False)
+    assert offline.content == first.content and len(_Source.requests) == 2
+
+
+def test_new_etag_with_identical_bytes_is_not_a_change(source):
+    first = sourcefetch.fetch_source("T", source, "Tlog.txt")
+    _Source.etag = '"v1-regenerated"'
+    same = sourcefetch.fetch_source("T", source, "Tlog.txt")
+    assert not same.changed and not same.not_modified and same.etag == '"v1-regenerated"'
+
+    _Source.body, _Source.etag = b"<list>v2</list>", '"v2"'
+    updated = sourcefetch.fetch_source("T", source, "Tlog.txt")
+    assert updated.changed and updated.content == b"<list>v2</list>"
+    assert updated.content_hash != first.content_hash
+
+
+def test_failed_request_falls_back_to_the_stored_download(source):
+    sourcefetch.fetch_source("T", source, "Tlog.txt")
+    dead = "http://127.0.0.1:9/list.xml"
+    stale = sourcefetch.fetch_source("T", dead, "Tlog.txt", timeout=2)
+    assert stale.stale and stale.content == b"<list>v1</list>"
+    with pytest.raises(Exception):
+        sourcefetch.fetch_source("missing", dead, "Tlog.txt", timeout=2)
@@ -0,0 +1,51 @@
+import asyncio
+import threading
+
+import pytest
+
+from workpool import DeadlineExceeded, PoolSaturated, WorkPool
+
+
+def test_admission_is_bounded_and_slots_free_up():
+    release = threading.Event()
+
+    async def scenario():
+        pool = WorkPool(workers=1, queue_size=1, timeout_ms=0)
+        running = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(PoolSaturated):
+            await pool.run(release.wait)
+        release.set()
+        assert await asyncio.gather(*running) == [True, True]
+        assert await pool.run(len, "abc") == 3
+        return pool.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["admitted"], stats["rejected"], stats["peak"], stats["in_flight"]) == (3, 1, 2, 0)
+
+
+def test_deadline_expires_running_and_queued_work():
+    release = threading.Event()
+
+    async def scenario():
+        pool = WorkPool(workers=1, queue_size=5, timeout_ms=50)
+        running = asyncio.ensure_future(pool.run(release.wait))
+        queued = asyncio.ensure_future(pool.run(len, "never started"))
+        for task in (running, queued):
+            with pytest.raises(DeadlineExceeded):
+                await task
+        release.set()
+        return pool.stats()
+
+    assert asyncio.run(scenario())["expired"] == 2
+
+
+def test_failures_from_concurrent_workers_are_all_counted():
+    async def scenario():
+        pool = WorkPool(workers=8, queue_size=200, timeout_ms=0)
+        results = await asyncio.gather(*(pool.run(int, "x") for _ in range(200)), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        return pool.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["failed"], stats["in_flight"]) == (200, 0)
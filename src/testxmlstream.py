@@ -0,0 +1,191 @@
+import io
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import pytest
+
+from xmlstream import detached, iter_entries
+from OFACload import OFAC_CONS_XML, OFAC_extract, OFAC_extract_stream
+from UNload import UN_extract, UN_extract_stream
+from CAload import CA_extract, CA_extract_stream
+from EUCFSLload import EU_extract, EU_extract_stream
+from SECOload import SECO_extract, SECO_extract_stream
+from UKload import UK_extract, UK_extract_stream
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+# Small lists in each publisher's layout, for the sources with no bundled copy.
+# The SECO targets come before the programs and places they refer to.
+SECO_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<swiss-sanctions-list date="2025-10-01">
+  <target ssid="10">
+    <sanctions-set-id>1</sanctions-set-id>
+    <modification enactment-date="2022-03-01" publication-date="2022-03-02" effective-date="2022-03-03"/>
+    <individual sex="male">
+      <identity ssid="11" main="true">
+        <name name-type="primary-name" lang="eng" quality="good">
+          <name-part name-part-type="given-name"><value>Ivan</value></name-part>
+          <name-part name-part-type="father-name"><value>Ivanovich</value></name-part>
+          <name-part name-part-type="family-name">
+            <value><spelling-variant>Petrov</spelling-variant><spelling-variant>Petroff</spelling-variant></value>
+          </name-part>
+        </name>
+        <name name-type="alias"><name-part name-part-type="whole-name"><value>Vanya</value></name-part></name>
+        <nationality><country iso-code="ru">Russia</country></nationality>
+        <day-month-year day="1" month="2" year="1970"/>
+        <place-of-birth place-id="100"/>
+        <address place-id="101"><address-details>Lenina 1</address-details><zip-code>101000</zip-code></address>
+        <identification-document document-type="passport"><number>P123</number><issuer>RU</issuer></identification-document>
+      </identity>
+    </individual>
+    <justification>Member of the board.</justification>
+    <other-information>Contact: info@example.com, +41 22 123 45 67</other-information>
+    <generic-attribute name="email">ivan@example.com</generic-attribute>
+  </target>
+  <target ssid="20">
+    <sanctions-set-id>2</sanctions-set-id>
+    <entity>
+      <identity main="true">
+        <name name-type="primary-name"><name-part name-part-type="whole-name"><value>Example Trading LLC</value></name-part></name>
+        <address place-id="101"><p-o-box>PO Box 5</p-o-box></address>
+      </identity>
+    </entity>
+  </target>
+  <target ssid="30">
+    <sanctions-set-id>1</sanctions-set-id>
+    <object type="vessel">
+      <identity><name><name-part name-part-type="whole-name"><value>Sea Star</value></name-part></name></identity>
+    </object>
+  </target>
+  <sanctions-program ssid="P1" version-date="2024-01-01">
+    <program-name lang="eng">Measures relating to Ukraine</program-name>
+    <sanctions-set ssid="1">Annex 8</sanctions-set>
+    <sanctions-set ssid="2"></sanctions-set>
+    <origin>EU</origin>
+  </sanctions-program>
+  <place ssid="100"><location>Moscow</location><country iso-code="ru">Russia</country></place>
+  <place ssid="101"><location>Moscow</location><area>Central</area><country iso-code="RU">Russia</country></place>
+</swiss-sanctions-list>
+"""
+
+EU_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<export xmlns="http://eu.europa.ec/fpi/fsd/export" generationDate="2025-10-01T00:00:00">
+  <sanctionEntity designationDate="2022-02-23" euReferenceNumber="EU.1.1" logicalId="1">
+    <remark>Head of the board.</remark>
+    <regulation regulationType="amendment" organisationType="council" publicationDate="2022-02-23"
+                entryIntoForceDate="2022-02-23" numberTitle="2022/261" programme="UKR" logicalId="10">
+      <publicationUrl>https://eur-lex.europa.eu/example</publicationUrl>
+    </regulation>
+    <subjectType code="person" classificationCode="P"/>
+    <nameAlias firstName="Ivan" middleName="Ivanovich" lastName="Petrov" wholeName="Ivan Ivanovich Petrov"
+               gender="M" nameLanguage="EN" strong="true" function="Director" logicalId="11"/>
+    <nameAlias wholeName="Vanya Petrov" strong="false" logicalId="12"/>
+    <citizenship countryIso2Code="RU" countryDescription="RUSSIAN FEDERATION" region="">
+      <regulationSummary publicationDate="2022-02-23" numberTitle="2022/261" publicationUrl="https://eur-lex.europa.eu/example"/>
+    </citizenship>
+    <birthdate birthdate="1970-02-01" dayOfMonth="1" monthOfYear="2" year="1970" city="Moscow"
+               countryIso2Code="RU" countryDescription="RUSSIAN FEDERATION" calendarType="GREGORIAN"/>
+    <address city="Moscow" street="Lenina 1" poBox="5" zipCode="101000" region="Central"
+             countryIso2Code="RU" countryDescription="RUSSIAN FEDERATION"/>
+    <identification>
+      <documentation type="passport" number="P123" countryIso2Code="RU" countryDescription="RUSSIAN FEDERATION"/>
+    </identification>
+    <contactInfo><email>ivan@example.com</email><phone>+7 495 000 00 00</phone></contactInfo>
+  </sanctionEntity>
+  <sanctionEntity euReferenceNumber="" logicalId="2">
+    <subjectType code="enterprise" classificationCode="E"/>
+    <nameAlias wholeName="Example Trading LLC" strong="true"/>
+    <address city="Minsk" countryIso2Code="BY" countryDescription="BELARUS"/>
+  </sanctionEntity>
+  <sanctionEntity euReferenceNumber="" logicalId="">
+    <nameAlias wholeName="No identifier" strong="true"/>
+  </sanctionEntity>
+</export>
+"""
+
+UK_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<ArrayOfFinancialSanctionsTarget>
+  <Designation>
+    <LastUpdated>2025-01-01</LastUpdated>
+    <DateDesignated>2022-03-15</DateDesignated>
+    <UniqueID>RUS0001</UniqueID>
+    <OFSIGroupID>15000</OFSIGroupID>
+    <RegimeName>Russia</RegimeName>
+    <IndividualEntityShip>Individual</IndividualEntityShip>
+    <DesignationSource>UK</DesignationSource>
+    <SanctionsImposed>Asset freeze</SanctionsImposed>
+    <SanctionsImposedIndicators><AssetFreeze>true</AssetFreeze><TravelBan>false</TravelBan></SanctionsImposedIndicators>
+    <OtherInformation>Director of Example Trading LLC.</OtherInformation>
+    <UKStatementofReasons>Involved in destabilising Ukraine.</UKStatementofReasons>
+    <Names>
+      <Name><Name1>Vanya</Name1><Name6>Petrov</Name6><NameType>Alias</NameType></Name>
+      <Name><Name1>Ivan</Name1><Name2>Ivanovich</Name2><Name6>Petrov</Name6><NameType>Primary Name</NameType></Name>
+    </Names>
+    <NonLatinNames><NonLatinName><NameNonLatinScript>Иван Петров</NameNonLatinScript></NonLatinName></NonLatinNames>
+    <Addresses>
+      <Address><AddressLine1>Lenina 1</AddressLine1><AddressLine4>Moscow</AddressLine4><AddressPostalCode>101000</AddressPostalCode><AddressCountry>Russia</AddressCountry></Address>
+      <Address><AddressLine1>PO Box 5</AddressLine1><AddressCountry>Belarus</AddressCountry></Address>
+    </Addresses>
+    <EmailAddresses><EmailAddress>ivan@example.com</EmailAddress></EmailAddresses>
+    <PhoneNumbers><PhoneNumber>+7 495 000 00 00</PhoneNumber></PhoneNumbers>
+    <Positions><Position>Director</Position></Positions>
+    <IndividualDetails><Individual>
+      <DOBs><DOB>01/02/1970</DOB></DOBs>
+      <Genders><Gender>Male</Gender></Genders>
+      <BirthDetails><Location><TownOfBirth>Moscow</TownOfBirth><CountryOfBirth>Russia</CountryOfBirth></Location></BirthDetails>
+    </Individual></IndividualDetails>
+  </Designation>
+  <Designation>
+    <UniqueID>RUS0002</UniqueID>
+    <RegimeName>Russia</RegimeName>
+    <IndividualEntityShip>Entity</IndividualEntityShip>
+    <Names><Name><Name6>Example Trading LLC</Name6><NameType>Primary Name</NameType></Name></Names>
+  </Designation>
+  <Designation><Names><Name><Name6>No identifier</Name6></Name></Names></Designation>
+</ArrayOfFinancialSanctionsTarget>
+""".encode("utf-8")
+
+
+def test_entries_are_dropped_once_consumed():
+    doc = b"<list><meta>x</meta><group><e id='1'><e id='inner'/></e><e id='2'/></group></list>"
+    seen = []
+    for element, ancestors in iter_entries(io.BytesIO(doc), ("e",)):
+        seen.append((element.get("id"), [a.tag for a in ancestors], len(element)))
+        root = detached(ancestors, element)
+        assert [e.get("id") for e in root.iter("e")][0] == element.get("id")
+        # Earlier entries and <meta> are gone; iterparse may already hold the next entry.
+        assert ancestors[0].find("meta") is None
+        assert [e.get("id") for e in ancestors[-1]][0] == element.get("id")
+    assert seen == [("1", ["list", "group"], 1), ("2", ["list", "group"], 0)]
+
+
+@pytest.mark.parametrize("filename, extract, extract_stream", [
+    (OFAC_CONS_XML, OFAC_extract, OFAC_extract_stream),
+    ("UN.06.10.25.xml", UN_extract, UN_extract_stream),
+    ("CA.22.09.25.xml", CA_extract, CA_extract_stream),
+])
+def test_streaming_extract_matches_tree_extract(filename, extract, extract_stream):
+    path = DATA_DIR / filename
+    assert list(extract_stream(str(path))) == extract(ET.parse(str(path)).getroot())
+
+
+@pytest.mark.parametrize("document, extract, extract_stream, records", [
+    (SECO_XML, SECO_extract, SECO_extract_stream, 3),
+    (EU_XML, EU_extract, EU_extract_stream, 2),
+    (UK_XML, UK_extract, UK_extract_stream, 2),
+], ids=["SECO", "EU", "UK"])
+def test_streaming_extract_matches_tree_extract_on_small_lists(tmp_path, document, extract, extract_stream, records):
+    path = tmp_path / "list.xml"
+    path.write_bytes(document)
+    expected = extract(ET.parse(str(path)).getroot())
+    assert len(expected) == records
+    assert list(extract_stream(str(path))) == expected
+    assert list(extract_stream(io.BytesIO(document))) == expected
+
+
+def test_seco_stream_resolves_programs_and_places_listed_after_the_targets():
+    records = {record["SECO_ssid"]: record for record in SECO_extract_stream(io.BytesIO(SECO_XML))}
+    assert records["10"]["sanctions_program_name"] == "Measures relating to Ukraine"
+    assert records["10"]["place_of_birth_text"] == "Moscow, Russia"
+    assert records["20"]["sanctions_program_name"] == "Measures relating to Ukraine"
+    assert records["30"]["classification"] == "Vessel"
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from config import get_config
+
+cfg = get_config()
+
+
+class PoolSaturated(Exception):
+    """Every worker is busy and the admission queue is full."""
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed before its screening finished."""
+
+
+def _run_before(deadline: Optional[float], fn: Callable, *args):
+    # Wall clock, so the check also holds in a worker process.
+    if deadline is not None and time.time() > deadline:
+        raise DeadlineExceeded("deadline passed while queued")
+    return fn(*args)
+
+
+class WorkPool:
+    """
+    The executor screening requests run on, instead of the event loop or
+    Starlette's shared threadpool. At most workers + queue_size calls are
+    admitted at once; past that run() raises PoolSaturated immediately, so a
+    burst is turned away instead of queueing without bound. Each call has a
+    deadline of timeout_ms: run() raises DeadlineExceeded when it passes, and
+    work that is still queued by then is dropped rather than started.
+
+    Threads suit SQLite-bound screening and share this process's caches and
+    snapshot; with processes=True calls go to spawn-started worker processes,
+    which take CPU-bound parsing and scoring off the GIL at the cost of their
+    own caches and snapshot.
+    """
+
+    def __init__(self, workers: int, queue_size: int, timeout_ms: int, processes: bool = False):
+        self.workers = max(1, int(workers))
+        self.queue_size = max(0, int(queue_size))
+        self.timeout = int(timeout_ms) / 1000.0 if timeout_ms and int(timeout_ms) > 0 else None
+        self.processes = bool(processes)
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.peak = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.expired = 0
+        self.failed = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.processes:
+                        self._executor = ProcessPoolExecutor(
+                            self.workers, mp_context=multiprocessing.get_context("spawn")
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="screening")
+        return self._executor
+
+    def _release(self, future: Future) -> None:
+        failed = not future.cancelled() and future.exception() is not None
+        with self._lock:
+            self._in_flight -= 1
+            if failed:
+                self.failed += 1
+
+    def _expire(self) -> None:
+        with self._lock:
+            self.expired += 1
+
+    async def run(self, fn: Callable, *args) -> Any:
+        with self._lock:
+            if self._in_flight >= self.workers + self.queue_size:
+                self.rejected += 1
+                raise PoolSaturated("screening queue is full")
+            self._in_flight += 1
+            self.admitted += 1
+            self.peak = max(self.peak, self._in_flight)
+        deadline = time.time() + self.timeout if self.timeout is not None else None
+        try:
+            future = self._get_executor().submit(_run_before, deadline, fn, *args)
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+        # The slot is held until the work itself ends, even if the caller gave up on it.
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            self._expire()
+            raise DeadlineExceeded(f"no result within {self.timeout:g}s") from None
+        except DeadlineExceeded:
+            self._expire()
+            raise
+
+    def reset(self) -> None:
+        """Replace worker processes, e.g. after a list refresh, so they load the new build."""
+        if not self.processes:
+            return
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": "processes" if self.processes else "threads",
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "timeout_ms": int(self.timeout * 1000) if self.timeout is not None else None,
+                "in_flight": self._in_flight,
+                "peak": self.peak,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "expired": self.expired,
+                "failed": self.failed,
+            }
+
+
+screening_pool = WorkPool(
+    cfg.screening.SCREEN_WORKERS,
+    cfg.screening.SCREEN_QUEUE_SIZE,
+    cfg.screening.SCREEN_TIMEOUT_MS,
+    cfg.screening.SCREEN_PROCESSES,
+)
+
+
+def screening_pool_stats() -> Dict[str, Any]:
+    return screening_pool.stats()
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import xml.etree.ElementTree as ET
+from typing import Iterable, Iterator, List, Tuple
+
+
+def _local(tag) -> str:
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+def iter_entries(source, tags: Iterable[str]) -> Iterator[Tuple[ET.Element, List[ET.Element]]]:
+    """
+    iterparse `source` (a path or binary file object) and yield (element,
+    ancestors) for every element whose local name is in `tags`, once its end
+    tag has been read; ancestors are the open elements above it, root first.
+    An entry nested inside another entry is part of the outer one, not an
+    entry of its own. When the consumer resumes, the entry is cleared and
+    removed from its parent, and so is every other completed element outside
+    an entry, so memory holds one entry plus the open ancestors however long
+    the document is.
+    """
+    tags = set(tags)
+    stack: List[ET.Element] = []
+    open_entries = 0
+    for event, element in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            stack.append(element)
+            if _local(element.tag) in tags:
+                open_entries += 1
+            continue
+        stack.pop()
+        if open_entries and _local(element.tag) in tags:
+            open_entries -= 1
+            if open_entries:
+                continue
+            yield element, stack
+        elif open_entries:
+            continue
+        if stack:
+            stack[-1].remove(element)
+        element.clear()
+
+
+def detached(ancestors: List[ET.Element], *elements: ET.Element) -> ET.Element:
+    """
+    A copy of the ancestor chain (tags and attributes only) holding just
+    `elements`, so an extract function written against the whole document
+    can be run on one entry at a time.
+    """
+    root = parent = None
+    for ancestor in ancestors:
+        node = ET.Element(ancestor.tag, dict(ancestor.attrib))
+        if parent is None:
+            root = node
+        else:
+            parent.append(node)
+        parent = node
+    if parent is None:
+        raise ValueError("an entry needs at least the document root above it")
+    parent.extend(elements)
+    return root